@@ -9,6 +9,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from services.supabase_client import get_supabase_client
+from services.data_service import get_data_service
 
 # Configuración de página
 st.set_page_config(
@@ -42,18 +43,9 @@ supabase = get_supabase_client()
 
 def get_current_month_expenses():
     """Obtener gastos del mes actual."""
-    today = datetime.now()
-    first_day = today.replace(day=1).strftime('%Y-%m-%d')
-
-    response = supabase.table('transactions')\
-        .select('*')\
-        .gte('date', first_day)\
-        .order('date', desc=True)\
-        .execute()
-
-    if response.data:
-        return pd.DataFrame(response.data)
-    return pd.DataFrame()
+    first_day = datetime.now().date().replace(day=1)
+    # Cacheado en DataService hasta que cambien los datos
+    return get_data_service().get_transactions(shape='summary', since=first_day)
 
 
 def get_budget_for_month(year_month):
@@ -115,7 +107,7 @@ def show_expenses_by_card(df):
         st.info("No hay transacciones para mostrar")
         return
 
-    expenses_by_card = df.groupby('card_name')['amount'].sum().reset_index()
+    expenses_by_card = df.groupby('card_name', observed=True)['amount'].sum().reset_index()
 
     fig = px.bar(
         expenses_by_card,
@@ -0,0 +1 @@
+# Dashboard Benchmarks
@@ -0,0 +1,297 @@
+"""
+Benchmark de escalabilidad de la persistencia local y de CuotasService.
+
+Genera gastos manuales y cuotas propagadas con MockDataGenerator para cada
+tamaño pedido, los guarda en una carpeta temporal y mide las operaciones que
+usa el dashboard (operaciones/segundo y pico de memoria de Python). Las
+lecturas se miden en "frío", con una instancia nueva del storage.
+
+Uso (desde dashboard/):
+    python -m benchmarks.storage_benchmark
+    python -m benchmarks.storage_benchmark --tamanos 1000,10000 --backends json,sqlite
+    python -m benchmarks.storage_benchmark --guardar-baseline benchmarks/baseline.json
+    python -m benchmarks.storage_benchmark --baseline benchmarks/baseline.json
+
+Con --baseline, sale con código 1 si alguna operación quedó más de
+--tolerancia por debajo de las ops/s de referencia. Si una operación tarda más
+de --limite-segundos, no se prueban tamaños mayores para ese backend.
+
+benchmarks/baseline.json es la referencia para 1k y 10k registros (los
+tamaños que tardan segundos); las ops/s dependen de la máquina, así que hay
+que regenerarlo al cambiar de entorno.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from services.cuotas_service import CuotasService
+from services.local_storage import LocalStorage, pa
+from services.mock_data import MockDataGenerator
+from services.sqlite_storage import SQLiteStorage
+
+
+TAMANOS_DEFAULT = [1_000, 10_000, 100_000, 1_000_000]
+BACKENDS = {
+    'json': lambda data_dir: LocalStorage(data_dir=data_dir),
+    'parquet': lambda data_dir: LocalStorage(formato='parquet', data_dir=data_dir),
+    'sqlite': lambda data_dir: SQLiteStorage(data_dir=data_dir),
+}
+
+# Operaciones puntuales (alta individual, marcar, etc.): no escalan con N
+MAX_OPS_PUNTUALES = 1_000
+CONSULTAS_PERIODO = 200
+CONSULTAS_SUELDO = 10_000
+
+
+class Escenario:
+    """
+    Una corrida completa sobre un backend y un tamaño, en una carpeta temporal.
+
+    Cada paso devuelve la cantidad de unidades procesadas (registros, consultas)
+    para calcular ops/s.
+    """
+
+    def __init__(self, backend: str, tamano: int, data_dir: Path, semilla: int = 42):
+        self.backend = backend
+        self.tamano = tamano
+        self.data_dir = data_dir
+        self.storage = BACKENDS[backend](data_dir)
+
+        random.seed(semilla)
+        generador = MockDataGenerator()
+        self.gastos = generador.generate_gastos_manuales(tamano)
+        self.gastos_sueltos = generador.generate_gastos_manuales(min(tamano, MAX_OPS_PUNTUALES))
+        self.cuotas = generador.generate_cuotas_propagadas(tamano)
+        self.sueldos = generador.generate_sueldos(120)
+
+        self.transacciones = generador.generate_transactions(min(tamano, MAX_OPS_PUNTUALES)).to_dict('records')
+        for trans in self.transacciones:
+            total = random.choice([3, 6, 12])
+            trans['installments'] = f"{random.randint(1, total - 1)}/{total}"
+
+        self.periodos = sorted({c['period'] for c in self.cuotas} | {g['period'] for g in self.gastos})
+        self.a_marcar = random.sample(self.cuotas, min(tamano, MAX_OPS_PUNTUALES))
+
+    def pasos(self) -> List[tuple]:
+        return [
+            ('save_gastos_manuales_bulk', self.save_gastos_manuales_bulk),
+            ('save_gasto_manual', self.save_gasto_manual),
+            ('load_gastos_manuales', self.load_gastos_manuales),
+            ('save_cuotas_propagadas_bulk', self.save_cuotas_propagadas_bulk),
+            ('load_cuotas_propagadas', self.load_cuotas_propagadas),
+            ('get_cuotas_por_periodo', self.get_cuotas_por_periodo),
+            ('marcar_cuota_como_real', self.marcar_cuota_como_real),
+            ('procesar_transacciones_importadas', self.procesar_transacciones_importadas),
+            ('save_sueldo', self.save_sueldo),
+            ('get_sueldo_vigente', self.get_sueldo_vigente),
+        ]
+
+    def _reabrir(self):
+        """Instancia nueva sobre los mismos archivos: sin caches en memoria."""
+        self.storage.cerrar()
+        self.storage = BACKENDS[self.backend](self.data_dir)
+
+    def cerrar(self):
+        self.storage.cerrar()
+
+    # --- Pasos ---
+    def save_gastos_manuales_bulk(self) -> int:
+        return self.storage.save_gastos_manuales_bulk(self.gastos)
+
+    def save_gasto_manual(self) -> int:
+        for gasto in self.gastos_sueltos:
+            self.storage.save_gasto_manual(gasto)
+        return len(self.gastos_sueltos)
+
+    def load_gastos_manuales(self) -> int:
+        self._reabrir()
+        return len(self.storage.load_gastos_manuales())
+
+    def save_cuotas_propagadas_bulk(self) -> int:
+        return self.storage.save_cuotas_propagadas_bulk(self.cuotas)
+
+    def load_cuotas_propagadas(self) -> int:
+        self._reabrir()
+        return len(self.storage.load_cuotas_propagadas())
+
+    def get_cuotas_por_periodo(self) -> int:
+        self._reabrir()
+        for i in range(CONSULTAS_PERIODO):
+            self.storage.get_cuotas_por_periodo(self.periodos[i % len(self.periodos)])
+        return CONSULTAS_PERIODO
+
+    def marcar_cuota_como_real(self) -> int:
+        for cuota in self.a_marcar:
+            self.storage.marcar_cuota_como_real(cuota['original_id'], cuota['period'])
+        return len(self.a_marcar)
+
+    def procesar_transacciones_importadas(self) -> int:
+        CuotasService(self.storage).procesar_transacciones_importadas(self.transacciones, self.periodos[-1])
+        return len(self.transacciones)
+
+    def save_sueldo(self) -> int:
+        for period, amount in self.sueldos.items():
+            self.storage.save_sueldo(period, amount)
+        return len(self.sueldos)
+
+    def get_sueldo_vigente(self) -> int:
+        for i in range(CONSULTAS_SUELDO):
+            self.storage.get_sueldo_vigente(self.periodos[i % len(self.periodos)])
+        return CONSULTAS_SUELDO
+
+
+def correr_escenario(backend: str, tamano: int, medir_memoria: bool) -> List[Dict[str, Any]]:
+    """
+    Correr todos los pasos de un escenario.
+
+    Los tiempos se toman sin tracemalloc (que agrega overhead); si se pide
+    memoria, el escenario se repite en otra carpeta temporal con tracemalloc activo.
+    """
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='gastos_bench_') as tmp:
+        escenario = Escenario(backend, tamano, Path(tmp))
+        try:
+            for nombre, paso in escenario.pasos():
+                inicio = time.perf_counter()
+                cantidad = paso()
+                segundos = time.perf_counter() - inicio
+                resultados.append({
+                    'backend': backend,
+                    'tamano': tamano,
+                    'operacion': nombre,
+                    'cantidad': cantidad,
+                    'segundos': segundos,
+                    'ops_por_seg': cantidad / segundos if segundos > 0 else float('inf'),
+                    'pico_mb': None,
+                })
+        finally:
+            escenario.cerrar()
+
+    if medir_memoria:
+        with tempfile.TemporaryDirectory(prefix='gastos_bench_') as tmp:
+            escenario = Escenario(backend, tamano, Path(tmp))
+            tracemalloc.start()
+            try:
+                for resultado, (_, paso) in zip(resultados, escenario.pasos()):
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+                    paso()
+                    resultado['pico_mb'] = (tracemalloc.get_traced_memory()[1] - base) / 1024 ** 2
+            finally:
+                tracemalloc.stop()
+                escenario.cerrar()
+
+    return resultados
+
+
+def correr(backends: List[str], tamanos: List[int], medir_memoria: bool,
+           limite_segundos: float, log: Callable[[str], None] = print) -> pd.DataFrame:
+    """Correr la matriz backend × tamaño, cortando cada backend en el tamaño donde deja de escalar."""
+    resultados = []
+    for backend in backends:
+        for tamano in sorted(tamanos):
+            log(f"⏱️  {backend} / {tamano:,} registros...")
+            try:
+                parciales = correr_escenario(backend, tamano, medir_memoria)
+            except MemoryError:
+                log(f"⚠️  {backend}: sin memoria con {tamano:,} registros, no se prueban tamaños mayores")
+                break
+            resultados.extend(parciales)
+
+            lento = max(parciales, key=lambda r: r['segundos'])
+            if lento['segundos'] > limite_segundos:
+                log(f"⚠️  {backend}: {lento['operacion']} tardó {lento['segundos']:.1f}s con "
+                    f"{tamano:,} registros, no se prueban tamaños mayores")
+                break
+
+    return pd.DataFrame(resultados)
+
+
+# --- Baseline ---
+def a_baseline(df: pd.DataFrame) -> Dict[str, Any]:
+    """Resultados -> {backend: {tamaño: {operación: ops/s}}}."""
+    baseline: Dict[str, Any] = {}
+    for fila in df.itertuples():
+        baseline.setdefault(fila.backend, {}).setdefault(str(fila.tamano), {})[fila.operacion] = round(fila.ops_por_seg, 2)
+    return baseline
+
+
+def comparar_con_baseline(df: pd.DataFrame, baseline: Dict[str, Any], tolerancia: float) -> pd.DataFrame:
+    """Filas cuyo ops/s cayó más de `tolerancia` (fracción) respecto del baseline."""
+    regresiones = []
+    for fila in df.itertuples():
+        referencia = baseline.get(fila.backend, {}).get(str(fila.tamano), {}).get(fila.operacion)
+        if referencia and fila.ops_por_seg < referencia * (1 - tolerancia):
+            regresiones.append({
+                'backend': fila.backend,
+                'tamano': fila.tamano,
+                'operacion': fila.operacion,
+                'baseline_ops_por_seg': referencia,
+                'ops_por_seg': round(fila.ops_por_seg, 2),
+                'cambio': f"{fila.ops_por_seg / referencia - 1:+.0%}",
+            })
+    return pd.DataFrame(regresiones)
+
+
+def _lista(valor: str, tipo: Callable = str) -> List:
+    return [tipo(v.strip().replace('_', '')) if tipo is int else tipo(v.strip()) for v in valor.split(',') if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de escalabilidad del storage local")
+    parser.add_argument('--tamanos', type=lambda v: _lista(v, int), default=TAMANOS_DEFAULT,
+                        help="Cantidades de registros, separadas por coma (default: 1000,10000,100000,1000000)")
+    parser.add_argument('--backends', type=_lista, default=['json', 'parquet', 'sqlite'],
+                        help="Backends a medir: json, parquet, sqlite")
+    parser.add_argument('--sin-memoria', action='store_true',
+                        help="No medir el pico de memoria (evita correr cada escenario dos veces)")
+    parser.add_argument('--limite-segundos', type=float, default=120.0,
+                        help="Si una operación tarda más que esto, no probar tamaños mayores en ese backend")
+    parser.add_argument('--baseline', type=Path, help="JSON de referencia contra el cual detectar regresiones")
+    parser.add_argument('--tolerancia', type=float, default=0.4,
+                        help="Caída de ops/s tolerada respecto del baseline (default: 0.4 = 40%%)")
+    parser.add_argument('--guardar-baseline', type=Path, help="Guardar los resultados como nuevo baseline")
+    args = parser.parse_args(argv)
+
+    backends = [b for b in args.backends if b in BACKENDS]
+    if 'parquet' in backends and pa is None:
+        print("⚠️  pyarrow no está instalado: se omite el backend parquet")
+        backends.remove('parquet')
+
+    df = correr(backends, args.tamanos, not args.sin_memoria, args.limite_segundos)
+    if df.empty:
+        print("Sin resultados")
+        return 1
+
+    tabla = df[['backend', 'tamano', 'operacion', 'cantidad', 'segundos', 'ops_por_seg', 'pico_mb']]
+    print()
+    print(tabla.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+
+    if args.guardar_baseline:
+        with open(args.guardar_baseline, 'w') as f:
+            json.dump(a_baseline(df), f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline guardado en {args.guardar_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regresiones = comparar_con_baseline(df, baseline, args.tolerancia)
+        if not regresiones.empty:
+            print(f"\n❌ Regresiones respecto de {args.baseline} (tolerancia {args.tolerancia:.0%}):")
+            print(regresiones.to_string(index=False))
+            return 1
+        print(f"\n✅ Sin regresiones respecto de {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
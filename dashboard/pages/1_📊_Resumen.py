@@ -5,6 +5,7 @@ from datetime import datetime, date
 from services.data_service import get_data_service
 from services.cuotas_service import get_cuotas_service
 from services.local_storage import get_local_storage
+from services.periodo import Periodo, a_meses, a_periodos, rango
 
 st.set_page_config(page_title="Dashboard", page_icon="📊", layout="wide")
 
@@ -16,7 +17,7 @@ def show_dashboard():
 
     # --- Load Data ---
     with st.spinner("Cargando datos..."):
-        df = service.get_transactions(limit=500)
+        df = service.get_transactions(shape='period_detail')
 
     # --- Sidebar Filters ---
     with st.sidebar:
@@ -31,8 +32,23 @@ def show_dashboard():
                 banks.insert(0, "Todos")
                 selected_bank = st.selectbox("Filtrar por Banco/Tarjeta", banks)
 
+        # Réplica local (GASTOS_REPLICA_LOCAL=1): cambios que todavía no llegaron a Supabase
+        sync_status = service.sync_status()
+        if sync_status is not None:
+            if sync_status['syncing']:
+                st.caption("🔄 Sincronizando con Supabase...")
+            elif sync_status['pending']:
+                st.caption(f"⏳ {sync_status['pending']} cambios pendientes de sincronizar")
+                if sync_status['last_error']:
+                    st.caption(f"⚠️ Sin conexión con Supabase: {sync_status['last_error']}")
+            else:
+                st.caption("✅ Sincronizado con Supabase")
+
     if df.empty:
-        st.info("No hay transacciones guardadas. Importá un resumen o cargá gastos.")
+        if sync_status is not None and sync_status['syncing']:
+            st.info("Descargando las transacciones de Supabase. Recargá la página en unos segundos.")
+        else:
+            st.info("No hay transacciones guardadas. Importá un resumen o cargá gastos.")
         return
 
     # Filter by bank only
@@ -49,8 +65,7 @@ def show_dashboard():
     st.markdown("### 💵 Sueldo Mensual")
 
     storage = get_local_storage()
-    current_date = datetime.now()
-    current_period = f"{current_date.year}-{current_date.month:02d}"
+    current_period = str(Periodo.actual())
     sueldo_vigente = storage.get_sueldo_vigente(current_period)
     sueldo_especifico = storage.load_sueldos().get(current_period, None)
 
@@ -130,23 +145,19 @@ def show_dashboard():
                 storage_gasto = get_local_storage()
 
                 month_num = next(m[1] for m in months if m[0] == selected_month_gasto)
-                period_gasto = f"{selected_year_gasto}-{month_num:02d}"
+                periodo_gasto = Periodo.de_anio_mes(selected_year_gasto, month_num)
+                period_gasto = str(periodo_gasto)
 
                 # Si se marcó replicar, crear gastos para todos los meses futuros
                 if replicar_futuro:
                     # Desde el mes seleccionado hasta diciembre del año siguiente
-                    end_year = selected_year_gasto + 1
-                    end_month = 12
+                    fin = Periodo.de_anio_mes(selected_year_gasto + 1, 12)
 
-                    current_year = selected_year_gasto
-                    current_month = month_num
-
-                    gastos_creados = 0
-                    while (current_year < end_year) or (current_year == end_year and current_month <= end_month):
-                        period = f"{current_year}-{current_month:02d}"
+                    nuevos_gastos = []
+                    for periodo in rango(periodo_gasto, fin):
                         nuevo_gasto = {
                             'id': str(uuid.uuid4()),
-                            'period': period,
+                            'period': str(periodo),
                             'date': date.today(),
                             'description': descripcion_rapida,
                             'amount': monto_rapido,
@@ -155,15 +166,9 @@ def show_dashboard():
                             'pagado': False,
                             'tipo': 'manual'
                         }
-                        storage_gasto.save_gasto_manual(nuevo_gasto)
-                        gastos_creados += 1
-
-                        # Siguiente mes
-                        current_month += 1
-                        if current_month > 12:
-                            current_month = 1
-                            current_year += 1
+                        nuevos_gastos.append(nuevo_gasto)
 
+                    gastos_creados = storage_gasto.save_gastos_manuales_bulk(nuevos_gastos)
                     st.success(f"✅ Gasto recurrente guardado! Se crearon {gastos_creados} gastos desde {selected_month_gasto} {selected_year_gasto}")
                 else:
                     # Solo crear el gasto para el mes seleccionado
@@ -195,7 +200,12 @@ def show_dashboard():
 
     # Obtener períodos de transacciones Y de cuotas propagadas
     cuotas_service = get_cuotas_service()
-    todas_cuotas = cuotas_service.get_todas_las_cuotas_activas()
+    compromiso_cuotas = cuotas_service.get_compromiso_por_periodo()
+
+    # Totales por período/moneda calculados en la base (adjusted_amount sobre amount)
+    period_totals = service.get_period_totals(bank=None if selected_bank == "Todos" else selected_bank)
+    totales_por_moneda = period_totals.groupby(['period', 'currency'])['total'].sum().to_dict()
+    cantidad_por_periodo = period_totals.groupby('period')['count'].sum().to_dict()
 
     # Agrupar por statement_period si existe, sino por fecha
     if 'statement_period' in filtered_df.columns:
@@ -203,10 +213,7 @@ def show_dashboard():
         periods_from_transactions = set(filtered_df['statement_period'].dropna().unique())
 
         # Agregar períodos de cuotas propagadas
-        if not todas_cuotas.empty:
-            periods_from_cuotas = set(todas_cuotas['period'].unique())
-        else:
-            periods_from_cuotas = set()
+        periods_from_cuotas = set(compromiso_cuotas['period'].unique())
 
         # Combinar ambos sets
         all_periods_set = periods_from_transactions | periods_from_cuotas
@@ -215,65 +222,52 @@ def show_dashboard():
         # Si hay transacciones sin statement_period, agruparlas por fecha
         no_period_df = filtered_df[filtered_df['statement_period'].isna()]
         if not no_period_df.empty:
-            no_period_df['month_year'] = pd.to_datetime(no_period_df['date']).dt.to_period('M')
-            old_periods = sorted(no_period_df['month_year'].unique(), reverse=True)
-            # Convertir a string para mezclar con periods
-            old_periods_str = [str(p) for p in old_periods]
+            old_periods_str = sorted(set(a_periodos(a_meses(no_period_df['date']))), reverse=True)
         else:
             old_periods_str = []
 
         all_periods = list(periods) + old_periods_str
     else:
         # Fallback: usar fecha de transacción
-        filtered_df['month_year'] = pd.to_datetime(filtered_df['date']).dt.to_period('M')
-        all_periods = [str(p) for p in sorted(filtered_df['month_year'].unique(), reverse=True)]
+        all_periods = sorted(set(a_periodos(a_meses(filtered_df['date']))), reverse=True)
 
-    month_translations = {
-        'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
-        'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
-        'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
-        'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-    }
+    # Mes de cada transacción ("YYYY-MM"), para las que no tienen statement_period
+    filtered_df['month_year'] = a_periodos(a_meses(filtered_df['date']), index=filtered_df.index)
+
+    # Sueldo vigente de todos los períodos en una sola consulta
+    sueldos_por_periodo = storage.get_sueldos_vigentes(all_periods)
+
+    # Compromiso de cuotas de los meses que vienen (tabla precalculada por período/moneda/banco)
+    compromiso_futuro = compromiso_cuotas[compromiso_cuotas['period'] > current_period]
+    if not compromiso_futuro.empty:
+        with st.expander(f"💳 Cuotas futuras comprometidas ({int(compromiso_futuro['cantidad'].sum())} cuotas)"):
+            tabla_compromiso = compromiso_futuro.pivot_table(
+                index='period', columns='currency', values='monto', aggfunc='sum', fill_value=0
+            )
+            st.dataframe(tabla_compromiso.style.format("$ {:,.0f}"), use_container_width=True)
 
     for period in all_periods:
         # Obtener transacciones del período
         if 'statement_period' in filtered_df.columns and period in periods:
             month_df = filtered_df[filtered_df['statement_period'] == period]
-            # Formatear nombre: "2024-12" -> "Diciembre 2024"
-            year, month_num = period.split('-')
-            month_names = ['', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                          'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-            month_name = f"{month_names[int(month_num)]} {year}"
         else:
             # Transacciones antiguas sin statement_period
-            month_df = filtered_df[filtered_df['month_year'].astype(str) == period]
-            # Formatear desde Period
-            period_obj = pd.Period(period)
-            month_name = period_obj.strftime('%B %Y').capitalize()
-            for eng, esp in month_translations.items():
-                month_name = month_name.replace(eng, esp)
+            month_df = filtered_df[filtered_df['month_year'] == period]
+        # Formatear nombre: "2024-12" -> "Diciembre 2024"
+        month_name = Periodo.desde(period).nombre()
 
         # Obtener cuotas propagadas para este período
         cuotas_periodo = cuotas_service.get_cuotas_para_periodo(period, incluir_encontradas=False)
 
         # Obtener gastos manuales para este período
         storage = get_local_storage()
-        gastos_manuales = storage.load_gastos_manuales()
-        gastos_manuales_periodo = [g for g in gastos_manuales if g.get('period') == period]
+        gastos_manuales_periodo = storage.get_gastos_manuales_por_periodo(period)
 
         # Calcular totales del mes (transacciones + cuotas + manuales)
-        # Transacciones: Usar adjusted_amount si existe y es válido, sino amount
-        def get_amount(row):
-            if pd.notna(row.get('adjusted_amount')) and row.get('adjusted_amount') != '':
-                try:
-                    return float(row.get('adjusted_amount'))
-                except:
-                    return float(row['amount'])
-            return float(row['amount'])
-
-        month_ars = sum(get_amount(row) for _, row in month_df[month_df['currency'] == 'ARS'].iterrows())
-        month_usd = sum(get_amount(row) for _, row in month_df[month_df['currency'] == 'USD'].iterrows())
-        month_count = len(month_df)
+        # Transacciones: agregados de get_period_totals
+        month_ars = totales_por_moneda.get((period, 'ARS'), 0.0)
+        month_usd = totales_por_moneda.get((period, 'USD'), 0.0)
+        month_count = cantidad_por_periodo.get(period, 0)
 
         # Cuotas: Usar adjusted_amount si existe
         def get_cuota_amount(c):
@@ -321,7 +315,7 @@ def show_dashboard():
         with col_expand:
             with st.expander(" - ".join(label_parts)):
                 # Obtener sueldo vigente para este período
-                sueldo_mes = storage.get_sueldo_vigente(period)
+                sueldo_mes = sueldos_por_periodo.get(period, 0.0)
                 disponible = sueldo_mes - total_ars
                 porcentaje_usado = (total_ars / sueldo_mes * 100) if sueldo_mes > 0 else 0
 
@@ -349,6 +343,39 @@ def show_dashboard():
                 # --- TRANSACCIONES DEL MES ---
                 st.markdown("#### 💳 Tarjetas y Débito (desde PDF)")
                 if not month_df.empty:
+                    # Acciones sobre varias transacciones a la vez (una sola request)
+                    with st.expander("⚡ Acciones masivas"):
+                        with st.form(key=f"form_bulk_{period}"):
+                            descripciones = dict(zip(
+                                month_df['id'],
+                                month_df['description'].astype(str) + " · $" + month_df['amount'].map(lambda x: f"{float(x):,.0f}")
+                            ))
+                            seleccionadas = st.multiselect(
+                                "Transacciones", options=list(descripciones), format_func=descripciones.get
+                            )
+                            accion = st.radio(
+                                "Acción", ["Cambiar categoría", "Anular (monto ajustado 0)", "Eliminar"], horizontal=True
+                            )
+                            nueva_categoria = st.text_input("Nueva categoría (si corresponde)")
+
+                            if st.form_submit_button("Aplicar", type="primary"):
+                                if not seleccionadas:
+                                    st.warning("Seleccioná al menos una transacción")
+                                elif accion == "Eliminar":
+                                    n = service.delete_transactions(seleccionadas)
+                                    st.success(f"{n} transacciones eliminadas")
+                                    st.rerun()
+                                elif accion == "Cambiar categoría" and not nueva_categoria.strip():
+                                    st.warning("Ingresá la nueva categoría")
+                                else:
+                                    cambios = (
+                                        {'category': nueva_categoria.strip()} if accion == "Cambiar categoría"
+                                        else {'adjusted_amount': 0}
+                                    )
+                                    n = service.update_transactions([{'id': t, **cambios} for t in seleccionadas])
+                                    st.success(f"{n} transacciones actualizadas")
+                                    st.rerun()
+
                     for idx, row in month_df.iterrows():
                         # Layout: Desc | Monto | Cuotas | Banco | Acciones (Edit/Delete)
                         col1, col2, col3, col4, col5, col6 = st.columns([5, 2, 1, 1, 0.5, 0.5])
@@ -486,7 +513,7 @@ def show_dashboard():
                         with col6:
                             # Botón Eliminar (Anular propagación específica)
                             if st.button("🗑️", key=f"btn_del_cuota_{c_unique_id}", help="Eliminar/Ocultar esta cuota"):
-                                if storage.delete_cuota_propagada(cuota.get('original_id'), period):
+                                if cuotas_service.eliminar_cuota(cuota.get('original_id'), period):
                                     st.success("Cuota eliminada de la vista")
                                     st.rerun()
                         
@@ -505,7 +532,7 @@ def show_dashboard():
                                 c1, c2 = st.columns(2)
                                 with c1:
                                     if st.form_submit_button("💾 Guardar", type="primary"):
-                                        storage.update_cuota_propagada(
+                                        cuotas_service.actualizar_cuota(
                                             cuota.get('original_id'),
                                             period,
                                             {
@@ -544,12 +571,7 @@ def show_dashboard():
                             if st.button("🗑️", key=f"delete_{gasto['id']}", help="Eliminar"):
                                 # Eliminar el gasto
                                 storage_delete = get_local_storage()
-                                gastos_all = storage_delete.load_gastos_manuales()
-                                gastos_all = [g for g in gastos_all if g['id'] != gasto['id']]
-                                # Guardar lista actualizada
-                                import json
-                                with open(storage_delete.gastos_manuales_file, 'w') as f:
-                                    json.dump(gastos_all, f, indent=2, default=storage_delete._serialize_date)
+                                storage_delete.delete_gasto_manual(gasto['id'])
                                 st.success("✅ Gasto eliminado")
                                 st.rerun()
 
@@ -592,10 +614,7 @@ def show_dashboard():
             with cols[idx % 5]:
                 # Formatear nombre del mes
                 try:
-                    year, month_num = period_oculto.split('-')
-                    month_names = ['', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                                  'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-                    month_name_oculto = f"{month_names[int(month_num)]} {year}"
+                    month_name_oculto = Periodo.desde(period_oculto).nombre()
                 except:
                     month_name_oculto = period_oculto
 
@@ -7,6 +7,7 @@ from pathlib import Path
 from datetime import datetime
 from services.data_service import get_data_service
 from services.cuotas_service import get_cuotas_service
+from services.periodo import Periodo
 
 # Agregar path al scraper para importar los parsers
 scraper_path = Path(__file__).parent.parent.parent / 'scraper'
@@ -348,7 +349,7 @@ def show_import_page():
 
                         # Construir statement_period
                         month_num = next(m[1] for m in months if m[0] == selected_month)
-                        statement_period = f"{selected_year}-{month_num:02d}"
+                        statement_period = str(Periodo.de_anio_mes(selected_year, month_num))
 
                         st.info(f"📅 Período del resumen: **{selected_month} {selected_year}**")
 
@@ -396,29 +397,31 @@ def show_import_page():
                         if st.button("💾 Guardar Transacciones", type="primary", use_container_width=True):
                             service = get_data_service()
                             cuotas_service = get_cuotas_service()
-                            count = 0
-                            transacciones_guardadas = []
-
-                            for _, row in edited_df.iterrows():
-                                data = row.to_dict()
-                                data['bank'] = selected_bank
-                                data['statement_period'] = statement_period  # Agregar período del resumen
-                                if service.add_manual_transaction(data):
-                                    count += 1
-                                    transacciones_guardadas.append(data)
+                            # Todo el resumen en una sola escritura (por lotes), ignorando duplicados
+                            a_guardar = edited_df.assign(bank=selected_bank, statement_period=statement_period)
+                            resultado = service.add_transactions_bulk(a_guardar)
+                            transacciones_guardadas = resultado[resultado['status'] == 'inserted'].drop(columns='status')
+                            count = len(transacciones_guardadas)
 
                             if count > 0:
-                                # Procesar cuotas: propagar a meses futuros
-                                cuotas_service.procesar_transacciones_importadas(
+                                # Procesar cuotas: conciliar con las proyectadas y propagar a meses futuros
+                                resultado_cuotas = cuotas_service.procesar_transacciones_importadas(
                                     transacciones_guardadas,
                                     statement_period
                                 )
 
                                 st.toast(f"✅ {count} transacciones guardadas en {selected_month} {selected_year}!", icon="🎉")
-                                st.success("🔄 Cuotas propagadas automáticamente a meses futuros")
+                                st.success(
+                                    f"🔄 {resultado_cuotas['compras_en_cuotas']} compras en cuotas propagadas a meses futuros · "
+                                    f"{resultado_cuotas['cuotas_conciliadas']} cuotas proyectadas encontradas en el resumen"
+                                )
                                 st.balloons()
                             else:
                                 st.warning("No se guardaron nuevas transacciones (posibles duplicados).")
+
+                            duplicadas = int((resultado['status'] == 'duplicate').sum())
+                            if count > 0 and duplicadas:
+                                st.info(f"ℹ️ {duplicadas} transacciones ya estaban cargadas y se omitieron.")
                             
                 else:
                     st.warning("⚠️ No pudimos detectar transacciones automáticamente.")
@@ -4,6 +4,7 @@ from datetime import datetime, date
 from services.data_service import get_data_service
 from services.cuotas_service import get_cuotas_service
 from services.local_storage import get_local_storage
+from services.periodo import Periodo
 
 st.set_page_config(page_title="Presupuesto", page_icon="💰", layout="wide")
 
@@ -37,7 +38,7 @@ def show_presupuesto():
         selected_year = st.selectbox("Año", options=years, index=2)  # Index 2 = año actual
 
     month_num = next(m[1] for m in months if m[0] == selected_month)
-    period = f"{selected_year}-{month_num:02d}"
+    period = str(Periodo.de_anio_mes(selected_year, month_num))
 
     st.markdown("---")
 
@@ -141,7 +142,7 @@ def show_presupuesto():
     storage = get_local_storage()
 
     # Obtener gastos de tarjetas para este período
-    df_tarjetas = service.get_transactions(limit=500)
+    df_tarjetas = service.get_transactions(shape='budget')
     if not df_tarjetas.empty and 'statement_period' in df_tarjetas.columns:
         gastos_tarjetas = df_tarjetas[df_tarjetas['statement_period'] == period]
         total_tarjetas = gastos_tarjetas[gastos_tarjetas['currency'] == 'ARS']['amount'].sum()
@@ -153,8 +154,7 @@ def show_presupuesto():
     total_cuotas_propagadas = sum(c['amount'] for c in cuotas_propagadas if c.get('currency') == 'ARS')
 
     # Obtener gastos manuales para este período
-    gastos_manuales_periodo = storage.load_gastos_manuales()
-    gastos_manuales_periodo = [g for g in gastos_manuales_periodo if g.get('period') == period]
+    gastos_manuales_periodo = storage.get_gastos_manuales_por_periodo(period)
 
     total_manuales = sum(g['amount'] for g in gastos_manuales_periodo)
     total_manuales_pagados = sum(g['amount'] for g in gastos_manuales_periodo if g.get('pagado', False))
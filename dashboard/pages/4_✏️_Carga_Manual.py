@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime, date
 import uuid
 from services.local_storage import get_local_storage
+from services.periodo import Periodo, rango
 
 st.set_page_config(page_title="Carga Manual", page_icon="✏️", layout="wide")
 
@@ -84,6 +85,7 @@ def show_manual_load():
     if st.button("💾 Guardar Todos los Gastos", type="primary", use_container_width=True):
         storage = get_local_storage()
         count = 0
+        nuevos_gastos = []
         
         # Iterar sobre las filas editadas
         for index, row in edited_df.iterrows():
@@ -107,42 +109,22 @@ def show_manual_load():
                 es_recurrente = row.get('recurrente', False)
                 
                 # Definir rango de periodos
-                year_start = fecha_obj.year
-                month_start = fecha_obj.month
-                
+                inicio = Periodo.desde(fecha_obj)
                 if es_recurrente:
                     # Hasta diciembre del año siguiente
-                    end_year = year_start + 1
-                    end_month = 12
+                    fin = Periodo.de_anio_mes(inicio.anio + 1, 12)
                 else:
                     # Solo una vez
-                    end_year = year_start
-                    end_month = month_start
-
-                current_year = year_start
-                current_month = month_start
-                
-                while (current_year < end_year) or (current_year == end_year and current_month <= end_month):
-                    # Calcular fecha para este periodo (mismo día o fin de mes)
-                    # Simplificación: Usamos el día 1 o la misma fecha original si es posible, 
-                    # pero `period` es lo importante. `date` se usa para ordenar.
-                    
-                    try:
-                        fecha_actual = date(current_year, current_month, fecha_obj.day)
-                    except ValueError:
-                        # Si el día no existe (ej: 31 de feb), usar el último día del mes
-                        if current_month == 12:
-                             fecha_actual = date(current_year, current_month, 31)
-                        else:
-                             # Truco: día 1 del mes siguiente menos 1 día
-                             # Pero simple fallback: día 28
-                             fecha_actual = date(current_year, current_month, 28)
+                    fin = inicio
 
-                    period = f"{current_year}-{current_month:02d}"
+                for periodo in rango(inicio, fin):
+                    # Misma fecha en cada mes (o el último día si no existe, ej: 31 de feb).
+                    # `period` es lo importante, `date` se usa para ordenar.
+                    fecha_actual = periodo.fecha(fecha_obj.day)
 
                     nuevo_gasto = {
                         'id': str(uuid.uuid4()),
-                        'period': period,
+                        'period': str(periodo),
                         'date': fecha_actual, 
                         'description': desc,
                         'amount': monto,
@@ -152,18 +134,12 @@ def show_manual_load():
                         'tipo': 'manual'
                     }
                     
-                    storage.save_gasto_manual(nuevo_gasto)
+                    nuevos_gastos.append(nuevo_gasto)
                     count += 1
-                    
-                    # Avanzar mes
-                    current_month += 1
-                    if current_month > 12:
-                        current_month = 1
-                        current_year += 1
-                    
-                    # Romper loop si no es recurrente (redundante con condición while pero seguro)
-                    if not es_recurrente:
-                        break
+
+        # Una sola escritura para todas las filas
+        if nuevos_gastos:
+            storage.save_gastos_manuales_bulk(nuevos_gastos)
         
         if count > 0:
             st.success(f"✅ Se guardaron {count} gastos correctamente.")
@@ -0,0 +1,140 @@
+"""
+Matcher difuso de líneas de cuotas entre resúmenes consecutivos.
+
+La misma compra aparece como "03/12" en un resumen y "04/12" en el siguiente,
+a veces con la descripción un poco distinta ("MERPAGO*ZARA" vs "ZARA ",
+acentos, espacios). En lugar de comparar cada línea nueva contra cada
+proyección (O(n·m)), se agrupan los candidatos en bloques por
+(banco, total de cuotas, n° de cuota, monto redondeado) y la similitud de
+descripciones se calcula solo dentro de cada bloque.
+"""
+from difflib import SequenceMatcher
+import numpy as np
+import pandas as pd
+
+
+# Prefijos de procesadores de pago que los bancos anteponen a la descripción
+PATRON_PREFIJO_PROCESADOR = r'^(?:MERPAGO|MERCADOPAGO|MP|PAYU|DLO|SQ|PAYPAL|PP)\s*\*\s*'
+# Marcas de cuota dentro de la descripción: "C.03/12", "CUOTA 3/12", "03/12"
+PATRON_CUOTA_EN_DESCRIPCION = r'\b(?:C(?:UOTA)?\.?\s*)?\d{1,2}\s*/\s*\d{1,2}\b'
+
+
+def normalizar_descripciones(descripciones: pd.Series) -> pd.Series:
+    """
+    Normalizar descripciones para compararlas entre resúmenes.
+
+    Mayúsculas, sin acentos, sin prefijo de procesador de pago ni marca de
+    cuota, y con solo letras/números separados por un espacio.
+    """
+    return (
+        descripciones.fillna('').astype(str).str.upper()
+        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+        .str.strip()
+        .str.replace(PATRON_PREFIJO_PROCESADOR, '', regex=True)
+        .str.replace(PATRON_CUOTA_EN_DESCRIPCION, ' ', regex=True)
+        .str.replace(r'[^A-Z0-9]+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+class CuotasMatcher:
+    """
+    Empareja líneas de cuotas importadas con cuotas proyectadas.
+
+    Args:
+        umbral_similitud: Similitud mínima de descripciones (0 a 1, difflib) para aceptar un par
+        paso_monto: Ancho de los baldes de monto. Cada línea se compara con su
+            balde y los vecinos, así que montos que difieren en menos de
+            `paso_monto` siempre caen en el mismo bloque.
+    """
+
+    COLUMNAS = ['description', 'bank', 'cuota_numero', 'cuota_total', 'amount']
+
+    def __init__(self, umbral_similitud: float = 0.8, paso_monto: float = 1.0):
+        self.umbral_similitud = umbral_similitud
+        self.paso_monto = paso_monto
+
+    def _preparar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Columnas de bloqueo y descripción normalizada; descarta filas sin cuota o monto."""
+        preparado = pd.DataFrame({
+            '_fila': np.arange(len(df)),
+            '_descripcion': normalizar_descripciones(df['description']).to_numpy(),
+            '_banco': df['bank'].fillna('').astype(str).str.strip().str.upper().to_numpy(),
+            '_cuota_numero': pd.to_numeric(df['cuota_numero'], errors='coerce').to_numpy(dtype=float),
+            '_cuota_total': pd.to_numeric(df['cuota_total'], errors='coerce').to_numpy(dtype=float),
+            '_monto': pd.to_numeric(df['amount'], errors='coerce').to_numpy(dtype=float),
+        }).dropna(subset=['_cuota_numero', '_cuota_total', '_monto'])
+        preparado['_balde'] = np.floor(preparado['_monto'] / self.paso_monto).astype('int64')
+        return preparado
+
+    def candidatos(self, lineas: pd.DataFrame, proyecciones: pd.DataFrame) -> pd.DataFrame:
+        """
+        Pares (línea, proyección) del mismo bloque, con su similitud de descripción.
+
+        El bloqueo es un hash join: cada línea se replica en su balde de monto y
+        los dos vecinos, y se cruza por (banco, n°/total de cuota, balde). El
+        costo crece con la cantidad de pares dentro de cada bloque, no con n·m.
+
+        Returns:
+            DataFrame con fila_linea, fila_proyeccion, similitud y diferencia_monto
+        """
+        columnas = ['fila_linea', 'fila_proyeccion', 'similitud', 'diferencia_monto']
+        if lineas.empty or proyecciones.empty:
+            return pd.DataFrame(columns=columnas)
+
+        izquierda = self._preparar(lineas)
+        derecha = self._preparar(proyecciones)
+        izquierda = pd.concat(
+            [izquierda.assign(_balde=izquierda['_balde'] + d) for d in (-1, 0, 1)], ignore_index=True
+        )
+
+        bloque = ['_banco', '_cuota_total', '_cuota_numero', '_balde']
+        pares = izquierda.merge(derecha, on=bloque, suffixes=('_l', '_p'))
+        pares['diferencia_monto'] = (pares['_monto_l'] - pares['_monto_p']).abs()
+        pares = pares[pares['diferencia_monto'] <= self.paso_monto]
+        if pares.empty:
+            return pd.DataFrame(columns=columnas)
+
+        pares['similitud'] = [
+            self.similitud(a, b) for a, b in zip(pares['_descripcion_l'], pares['_descripcion_p'])
+        ]
+        return pares.rename(columns={'_fila_l': 'fila_linea', '_fila_p': 'fila_proyeccion'})[columnas]
+
+    def similitud(self, a: str, b: str) -> float:
+        """Similitud de dos descripciones ya normalizadas (1.0 si son iguales)."""
+        if a == b:
+            return 1.0
+        matcher = SequenceMatcher(None, a, b, autojunk=False)
+        # quick_ratio es una cota superior barata: descarta pares sin chance
+        if matcher.quick_ratio() < self.umbral_similitud:
+            return 0.0
+        return matcher.ratio()
+
+    def emparejar(self, lineas: pd.DataFrame, proyecciones: pd.DataFrame) -> pd.DataFrame:
+        """
+        Emparejar 1 a 1 líneas importadas con proyecciones.
+
+        Args:
+            lineas: Líneas del resumen (columnas COLUMNAS)
+            proyecciones: Cuotas proyectadas abiertas del período (columnas COLUMNAS)
+
+        Returns:
+            DataFrame con fila_linea, fila_proyeccion (posiciones en cada input) y
+            similitud, de los pares que superan el umbral. Se asignan primero
+            los pares más parecidos; a igual similitud, en orden de aparición.
+        """
+        pares = self.candidatos(lineas, proyecciones)
+        pares = pares[pares['similitud'] >= self.umbral_similitud].sort_values(
+            ['similitud', 'diferencia_monto', 'fila_linea', 'fila_proyeccion'],
+            ascending=[False, True, True, True]
+        )
+
+        usadas_l, usadas_p, elegidos = set(), set(), []
+        for fila_l, fila_p, similitud in zip(pares['fila_linea'], pares['fila_proyeccion'], pares['similitud']):
+            if fila_l in usadas_l or fila_p in usadas_p:
+                continue
+            usadas_l.add(fila_l)
+            usadas_p.add(fila_p)
+            elegidos.append((int(fila_l), int(fila_p), float(similitud)))
+
+        return pd.DataFrame(elegidos, columns=['fila_linea', 'fila_proyeccion', 'similitud'])
@@ -1,18 +1,49 @@
 """
 Servicio para manejar la propagación inteligente de cuotas
 """
-from datetime import datetime, date
-from dateutil.relativedelta import relativedelta
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
 import pandas as pd
+from services.cuotas_matcher import CuotasMatcher
 from services.local_storage import get_local_storage
+from services.periodo import Periodo, a_meses, a_periodos
+
+
+def _df_a_registros(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame -> lista de dicts con tipos nativos y None en lugar de NaN (más rápido que to_dict)."""
+    df = df.astype(object).where(df.notna(), None)
+    columnas = list(df.columns)
+    return [dict(zip(columnas, fila)) for fila in zip(*(df[c].tolist() for c in columnas))]
 
 
 class CuotasService:
     """Maneja la lógica de cuotas y su propagación a meses futuros."""
 
-    def __init__(self):
-        self.storage = get_local_storage()
+    # Columnas de una cuota propagada (mismo formato que generar_cuotas_futuras)
+    COLUMNAS_CUOTA = [
+        'original_id', 'period', 'date', 'description', 'amount', 'currency',
+        'category', 'bank', 'installments', 'cuota_numero', 'cuota_total',
+        'es_propagada', 'encontrada_en_pdf'
+    ]
+
+    # Columnas de una compra en cuotas guardada en modo virtual
+    COLUMNAS_COMPRA = [
+        'original_id', 'period', 'cuota_actual', 'cuota_total', 'date', 'description',
+        'amount', 'currency', 'category', 'bank'
+    ]
+
+    def __init__(self, storage=None, modo: Optional[str] = None):
+        """
+        Args:
+            storage: Backend de persistencia (default: get_local_storage())
+            modo: "materializado" (una fila guardada por cuota futura) o "virtual"
+                (se guarda solo la compra y las cuotas se calculan al leer).
+                Default: variable de entorno GASTOS_CUOTAS_MODO, o "materializado".
+        """
+        self.storage = storage or get_local_storage()
+        self.matcher = CuotasMatcher()
+        self.modo = (modo or os.environ.get('GASTOS_CUOTAS_MODO') or 'materializado').lower()
 
     def parse_cuota(self, cuota_str: str) -> tuple:
         """
@@ -34,39 +65,37 @@ class CuotasService:
 
         return None, None
 
-    def propagar_cuotas_desde_transaccion(self, transaccion: Dict[str, Any], period: str):
+    def generar_cuotas_futuras(self, transaccion: Dict[str, Any], period: str) -> List[Dict[str, Any]]:
         """
-        Propagar una transacción con cuotas a los meses siguientes.
+        Generar (sin guardar) las cuotas futuras de una transacción con cuotas.
 
         Args:
             transaccion: Diccionario con la transacción original
             period: Período en formato "YYYY-MM" del resumen donde apareció
+
+        Returns:
+            Lista de cuotas propagadas, vacía si no quedan cuotas por venir
         """
         cuota_actual, cuota_total = self.parse_cuota(transaccion.get('installments', '1/1'))
 
         if cuota_actual is None or cuota_total is None:
-            return  # No es una cuota válida
+            return []  # No es una cuota válida
 
         # Calcular cuántas cuotas quedan por venir
         cuotas_restantes = cuota_total - cuota_actual
 
         if cuotas_restantes <= 0:
-            return  # Ya es la última cuota
+            return []  # Ya es la última cuota
 
-        # Obtener fecha del período
-        year, month = map(int, period.split('-'))
-        fecha_base = date(year, month, 1)
+        periodo_base = Periodo.desde(period)
 
         # Propagar a los meses siguientes
+        cuotas_futuras = []
         for i in range(1, cuotas_restantes + 1):
-            # Calcular mes siguiente
-            fecha_futura = fecha_base + relativedelta(months=i)
-            periodo_futuro = f"{fecha_futura.year}-{fecha_futura.month:02d}"
-
             # Crear cuota propagada
             cuota_futura = {
                 'original_id': transaccion.get('id'),
-                'period': periodo_futuro,
+                'period': str(periodo_base + i),
                 'date': transaccion.get('date'),
                 'description': transaccion.get('description'),
                 'amount': transaccion.get('amount'),
@@ -80,23 +109,310 @@ class CuotasService:
                 'encontrada_en_pdf': False
             }
 
-            # Guardar en storage
-            self.storage.save_cuota_propagada(cuota_futura)
+            cuotas_futuras.append(cuota_futura)
+
+        return cuotas_futuras
+
+    def propagar_cuotas_desde_transaccion(self, transaccion: Dict[str, Any], period: str):
+        """
+        Propagar una transacción con cuotas a los meses siguientes.
+
+        Args:
+            transaccion: Diccionario con la transacción original
+            period: Período en formato "YYYY-MM" del resumen donde apareció
+        """
+        cuotas_futuras = self.generar_cuotas_futuras(transaccion, period)
+        if cuotas_futuras:
+            # Una sola escritura para todas las cuotas de la compra
+            self.storage.save_cuotas_propagadas_bulk(cuotas_futuras)
+
+    def _compras_desde_transacciones(self, df: pd.DataFrame, period: str) -> pd.DataFrame:
+        """
+        Compras en cuotas de un resumen: una fila por transacción a la que le quedan cuotas.
+
+        `installments` se parsea con operaciones de strings ("3/12" -> 3, 12); lo
+        que no matchea (o "1/1", total <= 1) no es una cuota válida.
+
+        Returns:
+            DataFrame con columnas COLUMNAS_COMPRA
+        """
+        if df.empty or 'installments' not in df.columns:
+            return pd.DataFrame(columns=self.COLUMNAS_COMPRA)
+
+        actual, total = self._parsear_cuotas(df['installments'])
+        con_cuotas = ((total > 1) & (total > actual)).fillna(False).to_numpy(dtype=bool)
+
+        origen = df[con_cuotas].reset_index(drop=True)
+
+        def columna(nombre: str, default=None) -> pd.Series:
+            if nombre not in origen.columns:
+                return pd.Series([default] * len(origen), dtype=object)
+            return origen[nombre] if default is None else origen[nombre].fillna(default)
+
+        return pd.DataFrame({
+            'original_id': columna('id'),
+            'period': period,
+            'cuota_actual': actual[con_cuotas].astype(int).to_numpy(),
+            'cuota_total': total[con_cuotas].astype(int).to_numpy(),
+            'date': columna('date'),
+            'description': columna('description'),
+            'amount': columna('amount'),
+            'currency': columna('currency', 'ARS'),
+            'category': columna('category', 'Otros'),
+            'bank': columna('bank'),
+        }, columns=self.COLUMNAS_COMPRA)
+
+    @staticmethod
+    def _parsear_cuotas(installments: pd.Series) -> tuple:
+        """
+        Columna de strings "3/12" -> (Series cuota actual, Series cuota total), int64.
+
+        Lo que no matchea (None, '', texto) queda como 0/0, que no es una cuota válida.
+        """
+        partes = installments.astype('string').str.extract(r'^\s*([+-]?\d+)\s*/\s*([+-]?\d+)\s*$')
+        return tuple(
+            pd.to_numeric(partes[i], errors='coerce').fillna(0).astype('int64') for i in (0, 1)
+        )
+
+    def _proyectar(self, compras: pd.DataFrame, filas: np.ndarray, offset: np.ndarray) -> pd.DataFrame:
+        """
+        Cuotas futuras de `compras`: para cada i, la cuota `offset[i]` meses después
+        del período de la compra `filas[i]`.
+        """
+        periodos = a_periodos(a_meses(compras['period'])[filas] + offset)
+
+        origen = compras.iloc[filas].reset_index(drop=True)
+        cuota_numero = origen['cuota_actual'].to_numpy().astype(int) + offset
+        cuota_total = origen['cuota_total'].to_numpy().astype(int)
+
+        return pd.DataFrame({
+            'original_id': origen['original_id'],
+            'period': periodos,
+            'date': origen['date'],
+            'description': origen['description'],
+            'amount': origen['amount'],
+            'currency': origen['currency'],
+            'category': origen['category'],
+            'bank': origen['bank'],
+            'installments': pd.Series(cuota_numero).astype(str) + '/' + pd.Series(cuota_total).astype(str),
+            'cuota_numero': cuota_numero,
+            'cuota_total': cuota_total,
+            'es_propagada': True,
+            'encontrada_en_pdf': False
+        }, columns=self.COLUMNAS_CUOTA)
+
+    def _expandir(self, compras: pd.DataFrame) -> pd.DataFrame:
+        """Todas las cuotas futuras de `compras` (offset 1..restantes dentro de cada compra)."""
+        restantes = (compras['cuota_total'].to_numpy().astype(int) - compras['cuota_actual'].to_numpy().astype(int))
+        restantes = restantes.clip(min=0)
+        filas = np.repeat(np.arange(len(compras)), restantes)
+        inicio_grupo = np.repeat(np.cumsum(restantes) - restantes, restantes)
+        offset = np.arange(len(filas)) - inicio_grupo + 1
+        return self._proyectar(compras, filas, offset)
+
+    def propagar_cuotas_df(self, df: pd.DataFrame, period: str) -> pd.DataFrame:
+        """
+        Generar (sin guardar) las cuotas futuras de todo un resumen de una vez.
+
+        Equivalente vectorizado de `generar_cuotas_futuras`: parsea la columna
+        `installments` con operaciones de strings, repite cada compra tantas veces
+        como cuotas le quedan y calcula los períodos como offsets en meses.
+
+        Args:
+            df: Transacciones del resumen (columnas id, installments, date, description, amount, ...)
+            period: Período en formato "YYYY-MM" del resumen donde aparecieron
+
+        Returns:
+            DataFrame con una fila por cuota futura (columnas COLUMNAS_CUOTA)
+        """
+        compras = self._compras_desde_transacciones(df, period)
+        if compras.empty:
+            return pd.DataFrame(columns=self.COLUMNAS_CUOTA)
+        return self._expandir(compras)
+
+    def procesar_transacciones_importadas(self, transacciones: Union[List[Dict[str, Any]], pd.DataFrame],
+                                          period: str) -> Dict[str, int]:
+        """
+        Procesar transacciones recién importadas de un PDF (lista de dicts o DataFrame).
+
+        1. Conciliar las cuotas del resumen con las cuotas proyectadas para el período
+        2. Propagar a meses futuros las compras que no continúan una ya proyectada
+           (en modo virtual, solo guardar las compras)
 
-    def procesar_transacciones_importadas(self, transacciones: List[Dict[str, Any]], period: str):
+        Returns:
+            Dict con 'cuotas_conciliadas' y 'compras_en_cuotas' (compras del resumen propagadas a meses futuros)
         """
-        Procesar transacciones recién importadas de un PDF.
+        df = pd.DataFrame(transacciones)
+        conciliadas = self.conciliar_transacciones(df, period)
+
+        # Una cuota conciliada continúa una compra cuyas cuotas futuras ya están proyectadas
+        compras = self._compras_desde_transacciones(df[~conciliadas], period)
+        if not compras.empty:
+            if self.modo == 'virtual':
+                self.storage.save_compras_en_cuotas_bulk(_df_a_registros(compras))
+            else:
+                # Todas las cuotas futuras del resumen con una sola escritura
+                self.storage.save_cuotas_propagadas_bulk(_df_a_registros(self._expandir(compras)))
+
+        return {'cuotas_conciliadas': int(conciliadas.sum()), 'compras_en_cuotas': len(compras)}
 
-        1. Propagar cuotas a meses futuros
-        2. Marcar cuotas propagadas que ahora aparecieron en el PDF real
+    # --- Conciliación ---
+    def _cuotas_abiertas_df(self, period: str) -> pd.DataFrame:
+        """Cuotas proyectadas del período aún no encontradas en un PDF, con columna `virtual`."""
+        frames = []
+        materializadas = pd.DataFrame(self.storage.get_cuotas_por_periodo(period))
+        if not materializadas.empty:
+            frames.append(materializadas.assign(virtual=False))
+        if self.modo == 'virtual':
+            virtuales = self._cuotas_virtuales(period)
+            if not virtuales.empty:
+                frames.append(virtuales.assign(virtual=True))
+        if not frames:
+            return pd.DataFrame()
+
+        cuotas = pd.concat(frames, ignore_index=True).reindex(
+            columns=self.COLUMNAS_CUOTA + ['virtual']
+        )
+        encontradas = cuotas['encontrada_en_pdf'].fillna(False).astype(bool)
+        return cuotas[~encontradas].reset_index(drop=True)
+
+    def conciliar_transacciones(self, df: pd.DataFrame, period: str) -> np.ndarray:
         """
-        for trans in transacciones:
-            # Propagar cuotas futuras
-            self.propagar_cuotas_desde_transaccion(trans, period)
+        Marcar como reales las cuotas proyectadas del período que aparecen en el resumen importado.
+
+        Arma una tabla de cuotas abiertas del período y la empareja con todo el
+        resumen con CuotasMatcher: candidatos bloqueados por banco, n°/total de
+        cuota y monto, y similitud de descripción dentro de cada bloque (tolera
+        prefijos tipo "MERPAGO*", acentos y espacios). Las cuotas encontradas se
+        marcan con una sola escritura.
+
+        Returns:
+            Máscara booleana (alineada con `df`) de las transacciones conciliadas
+        """
+        conciliadas = np.zeros(len(df), dtype=bool)
+        if df.empty or 'installments' not in df.columns:
+            return conciliadas
+
+        abiertas = self._cuotas_abiertas_df(period)
+        if abiertas.empty:
+            return conciliadas
+
+        def columna(nombre: str) -> pd.Series:
+            return df[nombre] if nombre in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+
+        actual, total = self._parsear_cuotas(df['installments'])
+        lineas = pd.DataFrame({
+            'description': columna('description'),
+            'bank': columna('bank'),
+            'cuota_numero': actual,
+            'cuota_total': total,
+            'amount': columna('amount'),
+        })
+        pares = self.matcher.emparejar(lineas, abiertas)
+        if pares.empty:
+            return conciliadas
+
+        cruce = abiertas.iloc[pares['fila_proyeccion'].to_numpy()].assign(_fila=pares['fila_linea'].to_numpy())
+        virtual = cruce['virtual'].astype(bool)
+        materializadas = cruce.loc[~virtual, 'original_id'].tolist()
+        if materializadas:
+            self.storage.marcar_cuotas_como_reales_bulk(materializadas, period)
+        virtuales = cruce.loc[virtual, 'original_id'].tolist()
+        if virtuales:
+            self.storage.save_overrides_cuotas_bulk([
+                {'original_id': original_id, 'period': period, 'encontrada_en_pdf': True}
+                for original_id in virtuales
+            ])
+
+        conciliadas[cruce['_fila'].to_numpy()] = True
+        return conciliadas
+
+    # --- Modo virtual ---
+    def _cuotas_virtuales(self, period: Optional[str] = None) -> pd.DataFrame:
+        """
+        Proyectar las compras guardadas a cuotas, con los ajustes puntuales aplicados.
+
+        Args:
+            period: Si se indica, solo las cuotas de ese período (se calculan por
+                offset de meses sin expandir el resto)
+        """
+        compras = self.storage.load_compras_en_cuotas_df()
+        if compras.empty:
+            return pd.DataFrame(columns=self.COLUMNAS_CUOTA)
+        compras = compras.reindex(columns=self.COLUMNAS_COMPRA)
+
+        if period is None:
+            cuotas = self._expandir(compras)
+        else:
+            offset = Periodo.desde(period) - a_meses(compras['period'])
+            restantes = compras['cuota_total'].to_numpy().astype(int) - compras['cuota_actual'].to_numpy().astype(int)
+            filas = np.flatnonzero((offset >= 1) & (offset <= restantes))
+            cuotas = self._proyectar(compras, filas, offset[filas])
 
-            # Marcar si esta transacción era una cuota propagada
-            if trans.get('id'):
-                self.storage.marcar_cuota_como_real(trans['id'], period)
+        overrides = self.storage.get_overrides_cuotas(period)
+        if not overrides or cuotas.empty:
+            return cuotas
+
+        # Ajustes: tabla chica y dispersa, se aplica por clave original_id_período
+        ajustes = pd.DataFrame.from_dict(overrides, orient='index').drop(
+            columns=['key', 'original_id', 'period'], errors='ignore'
+        )
+        cuotas.index = cuotas['original_id'].astype(str) + '_' + cuotas['period']
+        comunes = cuotas.index.intersection(ajustes.index)
+        for col in ajustes.columns:
+            valores = ajustes.loc[comunes, col].dropna()
+            if not valores.empty:
+                if col not in cuotas.columns:
+                    cuotas[col] = None
+                cuotas[col] = cuotas[col].astype(object)
+                cuotas.loc[valores.index, col] = valores
+
+        if 'eliminada' in cuotas.columns:
+            cuotas = cuotas[~cuotas['eliminada'].fillna(False).astype(bool)].drop(columns='eliminada')
+        return cuotas.reset_index(drop=True)
+
+    def _existe_cuota_virtual(self, original_id: str, period: str) -> bool:
+        compra = self.storage.get_compra_en_cuotas(original_id)
+        if compra is None:
+            return False
+        offset = Periodo.desde(period) - Periodo.desde(compra['period'])
+        return 1 <= offset <= compra['cuota_total'] - compra['cuota_actual']
+
+    # --- Edición de cuotas (materializadas o virtuales) ---
+    def marcar_cuota_como_real(self, original_id: str, period: str):
+        """Marcar que una cuota ya apareció en un PDF real, para no contarla dos veces."""
+        if self.modo == 'virtual' and self._existe_cuota_virtual(original_id, period):
+            self.storage.save_override_cuota(original_id, period, {'encontrada_en_pdf': True})
+        else:
+            self.storage.marcar_cuota_como_real(original_id, period)
+
+    def actualizar_cuota(self, original_id: str, period: str, cambios: Dict[str, Any]) -> bool:
+        """
+        Actualizar una cuota de un período (notas, categoría, monto ajustado).
+
+        Returns:
+            False si la cuota no existe
+        """
+        if self.storage.update_cuota_propagada(original_id, period, cambios):
+            return True
+        if self.modo == 'virtual' and self._existe_cuota_virtual(original_id, period):
+            self.storage.save_override_cuota(original_id, period, cambios)
+            return True
+        return False
+
+    def eliminar_cuota(self, original_id: str, period: str) -> bool:
+        """
+        Eliminar (ocultar) solo la cuota de un período.
+
+        Returns:
+            False si la cuota no existe
+        """
+        if self.storage.delete_cuota_propagada(original_id, period):
+            return True
+        if self.modo == 'virtual' and self._existe_cuota_virtual(original_id, period):
+            self.storage.save_override_cuota(original_id, period, {'eliminada': True})
+            return True
+        return False
 
     def get_cuotas_para_periodo(self, period: str, incluir_encontradas: bool = False) -> List[Dict[str, Any]]:
         """
@@ -110,6 +426,9 @@ class CuotasService:
             Lista de cuotas para ese período
         """
         cuotas = self.storage.get_cuotas_por_periodo(period)
+        if self.modo == 'virtual':
+            # Las cuotas materializadas antes de pasar a modo virtual se siguen mostrando
+            cuotas = cuotas + _df_a_registros(self._cuotas_virtuales(period))
 
         if not incluir_encontradas:
             # Filtrar las que ya fueron encontradas en PDFs reales (para evitar duplicados)
@@ -122,15 +441,54 @@ class CuotasService:
         Obtener todas las cuotas propagadas que aún no fueron pagadas.
         Útil para ver el compromiso total de cuotas futuras.
         """
-        todas_cuotas = self.storage.load_cuotas_propagadas()
+        todas_cuotas = self.storage.load_cuotas_propagadas_df()
+        if self.modo == 'virtual':
+            virtuales = self._cuotas_virtuales()
+            frames = [df for df in (todas_cuotas, virtuales) if not df.empty]
+            todas_cuotas = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        if todas_cuotas.empty:
+            return pd.DataFrame()
 
         # Filtrar solo las que no fueron encontradas en PDFs (aún son proyecciones)
-        cuotas_pendientes = [c for c in todas_cuotas if not c.get('encontrada_en_pdf', False)]
+        if 'encontrada_en_pdf' in todas_cuotas.columns:
+            encontradas = todas_cuotas['encontrada_en_pdf'].fillna(False).astype(bool)
+            todas_cuotas = todas_cuotas[~encontradas].reset_index(drop=True)
 
-        if not cuotas_pendientes:
-            return pd.DataFrame()
+        return todas_cuotas
+
+    def get_compromiso_por_periodo(self) -> pd.DataFrame:
+        """
+        Compromiso de cuotas pendientes por (período, moneda, banco).
+
+        Lee la tabla que el storage mantiene al propagar, marcar, editar o
+        eliminar cuotas; en modo virtual le suma lo proyectado desde las compras.
+
+        Returns:
+            DataFrame con columnas period, currency, bank, monto y cantidad, ordenado por período
+        """
+        columnas = ['period', 'currency', 'bank', 'monto', 'cantidad']
+        compromiso = pd.DataFrame(self.storage.get_compromiso_por_periodo(), columns=columnas)
+
+        if self.modo == 'virtual':
+            virtuales = self._cuotas_virtuales()
+            if 'encontrada_en_pdf' in virtuales.columns:
+                virtuales = virtuales[~virtuales['encontrada_en_pdf'].fillna(False).astype(bool)]
+            if not virtuales.empty:
+                ajustado = pd.to_numeric(
+                    virtuales.get('adjusted_amount', pd.Series(index=virtuales.index, dtype=float)), errors='coerce'
+                )
+                virtuales = pd.DataFrame({
+                    'period': virtuales['period'].astype(str),
+                    'currency': virtuales['currency'].fillna('ARS').astype(str),
+                    'bank': virtuales['bank'].fillna('').astype(str),
+                    'monto': ajustado.fillna(pd.to_numeric(virtuales['amount'], errors='coerce')).fillna(0.0),
+                    'cantidad': 1
+                })
+                compromiso = pd.concat([compromiso, virtuales], ignore_index=True)
+                compromiso = compromiso.groupby(['period', 'currency', 'bank'], as_index=False)[['monto', 'cantidad']].sum()
 
-        return pd.DataFrame(cuotas_pendientes)
+        return compromiso.sort_values(['period', 'currency', 'bank']).reset_index(drop=True)
 
 
 # Singleton
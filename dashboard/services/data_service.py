@@ -1,8 +1,68 @@
+import os
+import threading
+import time
+import uuid
 import pandas as pd
 import streamlit as st
 from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 from services.supabase_client import get_supabase_client
 from services.mock_data import MockDataGenerator
+from services.periodo import a_meses, a_periodos
+from services.replica_local import ReplicaTransacciones
+
+# Columns that identify a transaction for duplicate detection: the unique_transaction
+# key, enforced with NULLS NOT DISTINCT by database/migration_unique_transactions.sql.
+# user_id is filled in by the column default (auth.uid()) on insert.
+DEDUP_COLUMNS = ['user_id', 'bank', 'card_name', 'date', 'description', 'amount']
+
+# Named query shapes: the columns each page reads and the dtype they get on arrival.
+# 'date' -> datetime.date objects, None -> left as returned (free text).
+# Low-cardinality labels become categoricals; every shape keeps (id, date) for paging.
+TRANSACTION_SHAPES = {
+    'summary': {
+        'id': None, 'date': 'date', 'description': None, 'amount': 'float64',
+        'currency': 'category', 'bank': 'category', 'card_name': 'category', 'category': 'category',
+    },
+    'period_detail': {
+        'id': None, 'date': 'date', 'description': None, 'amount': 'float64', 'adjusted_amount': 'float64',
+        'currency': 'category', 'bank': 'category', 'category': 'category', 'installments': None,
+        'notes': None, 'statement_period': 'category',
+    },
+    'budget': {
+        'id': None, 'date': 'date', 'amount': 'float64', 'adjusted_amount': 'float64',
+        'currency': 'category', 'statement_period': 'category',
+    },
+}
+
+# Columns kept in the local replica: everything the shapes read, plus the sync watermark
+REPLICA_COLUMNS = list(dict.fromkeys(
+    [col for shape in TRANSACTION_SHAPES.values() for col in shape] + ['updated_at']
+))
+
+# Columns that get_period_totals aggregates over
+PERIOD_TOTALS_COLUMNS = ['statement_period', 'date', 'currency', 'bank', 'amount', 'adjusted_amount']
+
+
+def select_clause(shape: Optional[str]) -> str:
+    """PostgREST select list for a query shape ('*' when no shape is given)."""
+    return '*' if shape is None else ','.join(TRANSACTION_SHAPES[shape])
+
+
+def apply_shape(df: pd.DataFrame, shape: Optional[str]) -> pd.DataFrame:
+    """Project `df` to the shape's columns (those present) and cast them to the shape's dtypes."""
+    if shape is None or df.empty:
+        return df
+    dtypes = {col: dtype for col, dtype in TRANSACTION_SHAPES[shape].items() if col in df.columns}
+    df = df[list(dtypes)].copy()
+    for col, dtype in dtypes.items():
+        if dtype == 'date':
+            df[col] = pd.to_datetime(df[col]).dt.date
+        elif dtype == 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif dtype is not None:
+            df[col] = df[col].astype(dtype)
+    return df
 
 class DataService:
     """
@@ -10,10 +70,90 @@ class DataService:
     Abstracts the source (Supabase or Mock).
     """
 
+    # Rows per multi-row insert request (keeps payloads well under PostgREST limits)
+    BULK_CHUNK_SIZE = 500
+    # Ids per `in_('id', ...)` filter (they travel in the URL, so keep it short)
+    ID_CHUNK_SIZE = 200
+    # Seconds a cached Supabase read is reused (covers edits made outside this app)
+    CACHE_TTL_SECONDS = 300
+    # Offline-first mode: seconds between background syncs (writes wake it up sooner)
+    SYNC_INTERVAL_SECONDS = 30
+    # Offline-first mode: seconds a read on a never-synced replica waits for the first sync
+    FIRST_SYNC_TIMEOUT_SECONDS = 5
+
     def __init__(self, use_mock: bool = False):
         self.use_mock = use_mock
         self.mock_generator = MockDataGenerator()
         self.supabase = get_supabase_client()
+        # Query cache: key -> (data version it was read at, expiry, DataFrame)
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        # Data version: inserts/deletes bump the row version, updates only the
+        # columns they touch ('*' tracks "any column" for unshaped reads)
+        self._row_version = 0
+        self._column_versions = {}
+        # Local replica of `transactions` (REPLICA_COLUMNS, indexed by id), kept
+        # current by sync_transactions with updated_at / deleted_at watermarks
+        self._replica = None
+        self._watermark = None
+        self._tombstone_watermark = None
+        self._tombstones_available = True
+        # update_transactions_bulk RPC (database/migration_update_transactions_bulk.sql)
+        self._bulk_update_available = True
+        self._replica_lock = threading.Lock()
+        # Offline-first mode (GASTOS_REPLICA_LOCAL=1): reads and writes go to a
+        # SQLite replica; a background thread pushes queued writes and pulls changes
+        self.local_replica = None
+        if not use_mock and self.supabase is not None and os.environ.get('GASTOS_REPLICA_LOCAL') == '1':
+            self.local_replica = ReplicaTransacciones(REPLICA_COLUMNS)
+            self._watermark = self.local_replica.get_estado('watermark')
+            self._tombstone_watermark = self.local_replica.get_estado('tombstone_watermark')
+            self._sync_lock = threading.Lock()
+            self._sync_wakeup = threading.Event()
+            self._first_sync_attempted = threading.Event()
+            self._sync_stopped = False
+            self._sync_thread = threading.Thread(target=self._sync_loop, name='replica-sync', daemon=True)
+            self._sync_thread.start()
+
+    # --- Query cache ---
+    def _data_version(self, columns: Optional[Iterable[str]]) -> Tuple:
+        """Version of the data a read over `columns` depends on (None = all columns)."""
+        columns = ['*'] if columns is None else columns
+        return (self._row_version,) + tuple(self._column_versions.get(c, 0) for c in columns)
+
+    def _cached(self, key: Tuple, columns: Optional[Iterable[str]], load: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Return the cached result for `key`, or call `load` and cache it.
+
+        An entry is reused while it's younger than CACHE_TTL_SECONDS and no
+        write since it was read touched its rows or `columns`. Failed loads
+        raise and are not cached.
+        """
+        columns = None if columns is None else list(columns)
+        with self._cache_lock:
+            version = self._data_version(columns)
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+                return entry[2].copy()
+        df = load()
+        with self._cache_lock:
+            self._cache[key] = (version, time.monotonic() + self.CACHE_TTL_SECONDS, df)
+        return df.copy()
+
+    def _bump_rows(self):
+        """Rows were inserted or deleted: every cached read is stale."""
+        with self._cache_lock:
+            self._row_version += 1
+
+    def _bump_columns(self, columns: Iterable[str]):
+        """Rows were updated: only reads that include `columns` are stale."""
+        with self._cache_lock:
+            for col in list(columns) + ['*']:
+                self._column_versions[col] = self._column_versions.get(col, 0) + 1
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
 
     def _serialize_for_supabase(self, data: dict) -> dict:
         """Convert Python objects to JSON-serializable formats for Supabase."""
@@ -23,73 +163,484 @@ class DataService:
                 serialized[key] = value.isoformat()
         return serialized
 
-    def get_transactions(self, limit: int = 100) -> pd.DataFrame:
-        """
-        Fetch transactions.
-        """
-        # Fallback: Force mock if usage is requested OR supabase is missing
-        should_use_mock = self.use_mock or (self.supabase is None)
-        
+    def _serialize_frame_for_supabase(self, df: pd.DataFrame) -> list:
+        """Convert a whole DataFrame to JSON-serializable records (ISO dates, None for NaN)."""
+        df = df.astype(object).where(df.notna(), None)
+        for col in df.columns:
+            values = df[col]
+            if values.map(lambda v: isinstance(v, (date, datetime))).any():
+                df[col] = values.map(lambda v: v.isoformat() if isinstance(v, (date, datetime)) else v)
+        columns = list(df.columns)
+        return [dict(zip(columns, row)) for row in zip(*(df[c].tolist() for c in columns))]
+
+    def _use_mock_for_reads(self) -> bool:
+        """Reads fall back to mock data when requested or when Supabase is missing."""
         if not self.use_mock and self.supabase is None:
             st.warning("⚠️ No se detectaron credenciales de Supabase. Usando modo Mock.", icon="⚠️")
+        return self.use_mock or (self.supabase is None)
+
+    # --- Mock store ---
+    # Session state holds the mock table plus a set of duplicate fingerprints and
+    # a buffer of rows added since the last read. Inserts are O(1); the buffer is
+    # concatenated and sorted once, on the next read.
+    @staticmethod
+    def _fingerprint(txn_date, description, amount) -> tuple:
+        """Duplicate key: (date, description, amount in cents)."""
+        cents = None if pd.isna(amount) else int(round(float(amount) * 100))
+        return str(txn_date)[:10], str(description), cents
+
+    @staticmethod
+    def _fingerprints(df: pd.DataFrame) -> list:
+        """_fingerprint for every row of `df`, computed column-wise."""
+        cents = (pd.to_numeric(df['amount'], errors='coerce') * 100).round().astype('Int64')
+        return list(zip(
+            df['date'].astype(str).str[:10],
+            df['description'].astype(str),
+            (None if pd.isna(c) else int(c) for c in cents),
+        ))
+
+    def _mock_store(self) -> pd.DataFrame:
+        """Mock transactions, newest first, with any buffered rows merged in."""
+        if 'mock_transactions' not in st.session_state:
+            # Initialize with empty data (user wants only imported data)
+            st.session_state.mock_transactions = self.mock_generator.generate_transactions(count=0)
+        buffer = st.session_state.get('mock_buffer')
+        if buffer:
+            st.session_state.mock_transactions = pd.concat(
+                [pd.DataFrame(buffer), st.session_state.mock_transactions], ignore_index=True
+            ).sort_values('date', ascending=False, kind='stable')
+            st.session_state.mock_buffer = []
+        return st.session_state.mock_transactions
+
+    def _mock_fingerprints(self) -> set:
+        """Fingerprints of every stored and buffered mock row (built on first use)."""
+        if 'mock_fingerprints' not in st.session_state:
+            df = self._mock_store()
+            st.session_state.mock_fingerprints = set(self._fingerprints(df)) if not df.empty else set()
+        return st.session_state.mock_fingerprints
+
+    def _typed_transactions(self, data, shape: Optional[str] = None) -> pd.DataFrame:
+        """Build a DataFrame from Supabase rows with the dashboard's column types."""
+        df = pd.DataFrame(data)
+        if df.empty or shape is not None:
+            return apply_shape(df, shape)
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date']).dt.date
+        for col in ('amount', 'adjusted_amount'):
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        return df
+
+    def iter_transactions(self, chunk_size: int = 1000, shape: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream all transactions, newest first, in chunks of `chunk_size` rows.
+
+        `shape` names one of TRANSACTION_SHAPES to fetch only those columns
+        (all columns when None).
+
+        Uses a keyset cursor on (date, id): each request asks for the rows that
+        sort after the last one already returned, so pages stay cheap (index
+        range scan, no OFFSET) and rows inserted meanwhile can't shift the pages.
+        """
+        if self._use_mock_for_reads() or self.local_replica is not None:
+            if self.local_replica is not None:
+                df = self._read_replica(None, None, None, chunk_size)
+            else:
+                df = self._mock_store()
+            for start in range(0, len(df), chunk_size):
+                yield apply_shape(df.iloc[start:start + chunk_size], shape)
+            return
 
-        if should_use_mock:
-            # Cache mock data in session state to persist between re-runs
-            if 'mock_transactions' not in st.session_state:
-                # Initialize with empty data (user wants only imported data)
-                st.session_state.mock_transactions = self.mock_generator.generate_transactions(count=0)
-            return st.session_state.mock_transactions
-        
-        # Else: Fetch from Supabase
         try:
-            response = self.supabase.table('transactions').select('*').order('date', desc=True).limit(limit).execute()
+            yield from self._fetch_pages(chunk_size, shape)
+        except Exception as e:
+            st.error(f"Error fetching data from Supabase: {e}")
+
+    def _fetch_pages(self, chunk_size: int, shape: Optional[str], since: Optional[date] = None,
+                     columns: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Keyset pagination over Supabase for iter_transactions (errors propagate)."""
+        last_date, last_id = None, None
+        while True:
+            query = self.supabase.table('transactions').select(columns or select_clause(shape))
+            if since is not None:
+                query = query.gte('date', since.isoformat())
+            if last_date is not None:
+                query = query.or_(f"date.lt.{last_date},and(date.eq.{last_date},id.lt.{last_id})")
+            response = query.order('date', desc=True).order('id', desc=True).limit(chunk_size).execute()
             data = response.data
             if not data:
-                return pd.DataFrame()
-            
-            df = pd.DataFrame(data)
-            # Ensure correct types
-            df['date'] = pd.to_datetime(df['date']).dt.date
-            df['amount'] = df['amount'].astype(float)
-            return df
+                return
+            yield self._typed_transactions(data, shape)
+            if len(data) < chunk_size:
+                return
+            last_date, last_id = data[-1]['date'], data[-1]['id']
+
+    def assemble_transactions(self, chunks: Iterable[pd.DataFrame], limit: Optional[int] = None) -> pd.DataFrame:
+        """Concatenate chunks from iter_transactions into one DataFrame, stopping after `limit` rows."""
+        frames, total = [], 0
+        for chunk in chunks:
+            frames.append(chunk)
+            total += len(chunk)
+            if limit is not None and total >= limit:
+                break
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        return df if limit is None else df.head(limit)
+
+    def get_transactions(self, limit: Optional[int] = None, chunk_size: int = 1000,
+                         shape: Optional[str] = None, since: Optional[date] = None) -> pd.DataFrame:
+        """
+        Fetch transactions, newest first.
+
+        Without `limit` the whole history is returned. `shape` selects a named
+        column set from TRANSACTION_SHAPES (e.g. 'period_detail' for the
+        Resumen page; all REPLICA_COLUMNS when None) and `since` keeps only
+        transactions from that date on.
+
+        Reads come from the local replica, brought up to date with a delta
+        sync (sync_transactions), and are cached per (shape, limit, since)
+        until a write touches them.
+        """
+        if self._use_mock_for_reads():
+            # Mock data lives in session state to persist between re-runs
+            df = self._mock_store()
+            if since is not None and not df.empty:
+                df = df[pd.to_datetime(df['date']) >= pd.Timestamp(since)]
+            return apply_shape(df if limit is None else df.head(limit), shape)
+
+        try:
+            return self._cached(
+                ('transactions', shape, limit, since),
+                None if shape is None else TRANSACTION_SHAPES[shape],
+                lambda: self._read_replica(shape, limit, since, chunk_size)
+            )
         except Exception as e:
             st.error(f"Error fetching data from Supabase: {e}")
             return pd.DataFrame()
 
+    # --- Local replica (delta sync) ---
+    def sync_transactions(self, chunk_size: int = 1000) -> pd.DataFrame:
+        """
+        Bring the local replica of `transactions` up to date and return it.
+
+        The first call downloads the table once (REPLICA_COLUMNS, paged by
+        keyset). Later calls only pull rows with updated_at at or after the
+        last watermark and merge them by id. Deleted rows are read from the
+        transactions_tombstones table (database/migration_transactions_tombstones.sql)
+        or, if it doesn't exist, found by diffing against the current id set.
+        """
+        select = ','.join(REPLICA_COLUMNS)
+        with self._replica_lock:
+            if self._replica is None:
+                tombstone_watermark = self._latest_tombstone()
+                frames = [f for f in self._fetch_pages(chunk_size, None, columns=select) if not f.empty]
+                replica = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=REPLICA_COLUMNS)
+                self._replica = replica.set_index('id', drop=False)
+                self._tombstone_watermark = tombstone_watermark
+            else:
+                changed = self._fetch_changed(chunk_size, select)
+                if not changed.empty:
+                    changed = changed.set_index('id', drop=False)
+                    kept = self._replica[~self._replica.index.isin(changed.index)]
+                    self._replica = pd.concat([kept, changed]) if not kept.empty else changed
+                deleted = self._fetch_deleted_ids(chunk_size, self._replica.index)
+                if deleted:
+                    self._replica = self._replica[~self._replica.index.isin(deleted)]
+
+            if not self._replica.empty:
+                self._watermark = pd.to_datetime(self._replica['updated_at'], utc=True, format='ISO8601').max().isoformat()
+            return self._replica
+
+    def _fetch_changed(self, chunk_size: int, select: str) -> pd.DataFrame:
+        """Rows with updated_at >= watermark, paged by keyset on (updated_at, id).
+
+        `gte` rather than `gt`: rows committed late with the same timestamp as
+        the watermark are read again, which is harmless since merging is by id.
+        """
+        frames, last = [], None
+        while True:
+            query = self.supabase.table('transactions').select(select)
+            if self._watermark is not None:
+                query = query.gte('updated_at', self._watermark)
+            if last is not None:
+                query = query.or_(f"updated_at.gt.{last[0]},and(updated_at.eq.{last[0]},id.gt.{last[1]})")
+            data = query.order('updated_at').order('id').limit(chunk_size).execute().data
+            if not data:
+                break
+            frames.append(self._typed_transactions(data))
+            if len(data) < chunk_size:
+                break
+            last = (data[-1]['updated_at'], data[-1]['id'])
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _latest_tombstone(self) -> Optional[str]:
+        """deleted_at of the newest tombstone (None if there are none or the table is missing)."""
+        if not self._tombstones_available:
+            return None
+        try:
+            data = self.supabase.table('transactions_tombstones').select('deleted_at')\
+                .order('deleted_at', desc=True).limit(1).execute().data
+        except Exception:
+            self._tombstones_available = False
+            return None
+        return data[0]['deleted_at'] if data else None
+
+    def _fetch_deleted_ids(self, chunk_size: int, known_ids: Iterable[str]) -> set:
+        """Ids deleted since the last sync: tombstones if available, else a diff against `known_ids`.
+
+        Tombstones are paged by keyset on (deleted_at, id) like `_fetch_changed`,
+        so PostgREST's max-rows cap can't truncate them; the watermark only
+        moves once every page has been read.
+        """
+        if self._tombstones_available:
+            try:
+                deleted, last = set(), None
+                while True:
+                    query = self.supabase.table('transactions_tombstones').select('id,deleted_at')
+                    if self._tombstone_watermark is not None:
+                        query = query.gte('deleted_at', self._tombstone_watermark)
+                    if last is not None:
+                        query = query.or_(f"deleted_at.gt.{last[0]},and(deleted_at.eq.{last[0]},id.gt.{last[1]})")
+                    data = query.order('deleted_at').order('id').limit(chunk_size).execute().data
+                    if not data:
+                        break
+                    deleted.update(row['id'] for row in data)
+                    last = (data[-1]['deleted_at'], data[-1]['id'])
+                    if len(data) < chunk_size:
+                        break
+                if last is not None:
+                    self._tombstone_watermark = last[0]
+                return deleted
+            except Exception:
+                self._tombstones_available = False
+
+        # Fallback: compare against the full id list (ids only, paged by id)
+        ids, last_id = set(), None
+        while True:
+            query = self.supabase.table('transactions').select('id')
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            data = query.order('id').limit(chunk_size * 10).execute().data
+            if not data:
+                break
+            ids.update(row['id'] for row in data)
+            if len(data) < chunk_size * 10:
+                break
+            last_id = data[-1]['id']
+        return set(known_ids) - ids
+
+    def _read_replica(self, shape: Optional[str], limit: Optional[int], since: Optional[date],
+                      chunk_size: int) -> pd.DataFrame:
+        """get_transactions over the synced replica: filter, newest first, project to `shape`."""
+        if self.local_replica is not None:
+            if self.local_replica.get_estado('ultima_sincronizacion') is None:
+                # Never synced: give the sync thread's first attempt a moment to fill it.
+                # If it takes longer, serve what's there (sync_status() reports 'syncing');
+                # merging the download bumps the row version, so this read isn't cached past it
+                self._first_sync_attempted.wait(self.FIRST_SYNC_TIMEOUT_SECONDS)
+            df = self.local_replica.leer()
+        else:
+            df = self.sync_transactions(chunk_size).reset_index(drop=True)
+        if df.empty:
+            return pd.DataFrame()
+        if since is not None:
+            df = df[pd.to_datetime(df['date']) >= pd.Timestamp(since)]
+        df = df.sort_values(['date', 'id'], ascending=False, ignore_index=True)
+        if limit is not None:
+            df = df.head(limit)
+        return apply_shape(df, shape) if shape is not None else df.drop(columns='updated_at')
+
+    # --- Offline-first local replica (GASTOS_REPLICA_LOCAL=1) ---
+    def sync_local_replica(self, chunk_size: int = 1000):
+        """Push the queued local writes to Supabase, then pull remote changes (errors propagate)."""
+        with self._sync_lock:
+            try:
+                self._flush_outbox()
+            finally:
+                # Pull even if a queued write keeps failing; pending writes are re-applied on top
+                self._pull_into_local_replica(chunk_size)
+
+    def _flush_outbox(self):
+        """
+        Send the outbound queue to Supabase in order.
+
+        Consecutive inserts are merged into upserts of up to BULK_CHUNK_SIZE
+        rows. Every operation is idempotent (inserts ignore DEDUP_COLUMNS
+        conflicts), so a batch that fails halfway is simply resent. On error
+        the flush stops there to keep later operations behind it.
+        """
+        replica = self.local_replica
+        while True:
+            pending = replica.pendientes(limite=self.BULK_CHUNK_SIZE)
+            if not pending:
+                return
+            seqs, op, payload = [pending[0][0]], pending[0][1], pending[0][2]
+            if op == 'insert':
+                payload = list(payload)
+                for seq, next_op, rows in pending[1:]:
+                    # One upsert needs the same keys in every row
+                    if (next_op != 'insert' or len(payload) + len(rows) > self.BULK_CHUNK_SIZE
+                            or any(r.keys() != payload[0].keys() for r in rows)):
+                        break
+                    seqs.append(seq)
+                    payload.extend(rows)
+            try:
+                rejected = self._push_operation(op, payload)
+            except Exception as e:
+                replica.registrar_error(seqs[0], str(e))
+                raise
+            replica.confirmar(seqs)
+            if rejected:
+                # Already in Supabase under another id: drop the local copy, the pull brings theirs
+                replica.aplicar_remotos(pd.DataFrame(), rejected)
+                self._bump_rows()
+
+    def _push_operation(self, op: str, payload) -> List[str]:
+        """Apply one queued operation in Supabase; returns the ids of inserts rejected as duplicates."""
+        table = self.supabase.table('transactions')
+        if op == 'insert':
+            response = table.upsert(
+                payload, on_conflict=','.join(DEDUP_COLUMNS), ignore_duplicates=True
+            ).execute()
+            inserted_ids = {row['id'] for row in (response.data or [])}
+            return [row['id'] for row in payload if row['id'] not in inserted_ids]
+        ids = payload['ids'] if op == 'update' else payload
+        for start in range(0, len(ids), self.ID_CHUNK_SIZE):
+            chunk = ids[start:start + self.ID_CHUNK_SIZE]
+            if op == 'update':
+                self.supabase.table('transactions').update(payload['valores']).in_('id', chunk).execute()
+            else:
+                self.supabase.table('transactions').delete().in_('id', chunk).execute()
+        return []
+
+    def _pull_into_local_replica(self, chunk_size: int):
+        """Merge rows changed or deleted in Supabase since the persisted watermarks."""
+        replica = self.local_replica
+        first_sync = replica.get_estado('ultima_sincronizacion') is None
+        if first_sync:
+            self._tombstone_watermark = self._latest_tombstone()
+        changed = self._fetch_changed(chunk_size, ','.join(REPLICA_COLUMNS))
+        deleted = set() if first_sync else self._fetch_deleted_ids(chunk_size, replica.ids())
+        if not changed.empty or deleted:
+            replica.aplicar_remotos(changed, deleted)
+            self._bump_rows()
+        if not changed.empty:
+            self._watermark = pd.to_datetime(changed['updated_at'], utc=True, format='ISO8601').max().isoformat()
+            replica.set_estado('watermark', self._watermark)
+        replica.set_estado('tombstone_watermark', self._tombstone_watermark)
+        replica.set_estado('ultima_sincronizacion', datetime.now().isoformat())
+
+    def _sync_loop(self):
+        """Background thread: sync every SYNC_INTERVAL_SECONDS, or right after a local write."""
+        while not self._sync_stopped:
+            self._sync_wakeup.clear()
+            try:
+                self.sync_local_replica()
+            except Exception:
+                pass  # Offline or Supabase error: the queue keeps everything, retry next round
+            self._first_sync_attempted.set()
+            self._sync_wakeup.wait(self.SYNC_INTERVAL_SECONDS)
+
+    def _local_write_done(self, columns: Optional[Iterable[str]] = None):
+        """Invalidate cached reads and wake the sync thread after a local write."""
+        if columns is None:
+            self._bump_rows()
+        else:
+            self._bump_columns(columns)
+        self._sync_wakeup.set()
+
+    def sync_status(self) -> Optional[dict]:
+        """Local replica state for the UI (None when offline-first mode is off).
+
+        'syncing' is True until the first sync attempt finishes (reads meanwhile
+        may come back empty or stale).
+        """
+        if self.local_replica is None:
+            return None
+        return {
+            'syncing': not self._first_sync_attempted.is_set(),
+            'pending': self.local_replica.cantidad_pendientes(),
+            'last_error': self.local_replica.ultimo_error(),
+            'last_sync': self.local_replica.get_estado('ultima_sincronizacion'),
+        }
+
+    def close(self):
+        """Stop the sync thread and close the local replica."""
+        if self.local_replica is not None:
+            self._sync_stopped = True
+            self._sync_wakeup.set()
+            self._sync_thread.join()
+            self.local_replica.cerrar()
+
+    def get_period_totals(self, bank: Optional[str] = None) -> pd.DataFrame:
+        """
+        Totals per statement period, currency and bank, computed server-side.
+
+        Uses the get_period_totals RPC (database/migration_period_totals.sql),
+        which sums adjusted_amount when present and amount otherwise. Rows
+        without statement_period are grouped by the month of their date.
+
+        Returns:
+            DataFrame with period, currency, bank, total and count.
+        """
+        columns = ['period', 'currency', 'bank', 'total', 'count']
+        if self._use_mock_for_reads() or self.local_replica is not None:
+            df = self._mock_store() if self.local_replica is None else self._read_replica(None, None, None, 1000)
+            if df.empty:
+                return pd.DataFrame(columns=columns)
+            if bank is not None:
+                df = df[df['bank'] == bank]
+            amount = pd.to_numeric(df['amount'], errors='coerce')
+            if 'adjusted_amount' in df.columns:
+                amount = pd.to_numeric(df['adjusted_amount'], errors='coerce').fillna(amount)
+            month = a_periodos(a_meses(df['date']), index=df.index)
+            period = df['statement_period'].fillna(month) if 'statement_period' in df.columns else month
+            totals = pd.DataFrame({
+                'period': period, 'currency': df['currency'], 'bank': df['bank'], 'amount': amount
+            }).groupby(['period', 'currency', 'bank'], dropna=False)['amount'].agg(total='sum', count='size')
+            return totals.reset_index()[columns]
+
+        def load() -> pd.DataFrame:
+            response = self.supabase.rpc('get_period_totals', {'p_bank': bank}).execute()
+            df = pd.DataFrame(response.data or [], columns=columns)
+            df['total'] = pd.to_numeric(df['total'], errors='coerce').astype(float)
+            df['count'] = pd.to_numeric(df['count'], errors='coerce').fillna(0).astype(int)
+            return df
+
+        try:
+            return self._cached(('period_totals', bank), PERIOD_TOTALS_COLUMNS, load)
+        except Exception as e:
+            st.error(f"Error fetching totals from Supabase: {e}")
+            return pd.DataFrame(columns=columns)
+
     def add_manual_transaction(self, data: dict):
         """
         Add a manual transaction.
         Returns True if successful, False if duplicate/error.
         Modifies data dict in-place to add 'id' field.
         """
-        import uuid
-
         if self.use_mock:
-            # Add to local session state mock
-            if 'mock_transactions' not in st.session_state:
-                # Initialize if not present (e.g. user went straight to import)
-                st.session_state.mock_transactions = self.mock_generator.generate_transactions(count=0)
-
-            # Check for duplicates (same date, description, amount)
-            current_df = st.session_state.mock_transactions
-            if not current_df.empty:
-                # Ensure date comparison works (both should be date objects or comparable)
-                # data['date'] comes from PDF parser as date object.
-                duplicate_mask = (
-                    (current_df['date'] == data['date']) &
-                    (current_df['description'] == data['description']) &
-                    (abs(current_df['amount'] - data['amount']) < 0.01) # Float tolerance
-                )
-                if not current_df[duplicate_mask].empty:
-                    return False # Skip duplicate
+            # Check for duplicates (same date, description, amount in cents)
+            fingerprints = self._mock_fingerprints()
+            fingerprint = self._fingerprint(data['date'], data['description'], data['amount'])
+            if fingerprint in fingerprints:
+                return False # Skip duplicate
 
             # Add ID
             data['id'] = str(uuid.uuid4())
-            # Add to dataframe
-            new_row = pd.DataFrame([data])
-            st.session_state.mock_transactions = pd.concat([new_row, st.session_state.mock_transactions], ignore_index=True)
-            st.session_state.mock_transactions = st.session_state.mock_transactions.sort_values('date', ascending=False)
+            # Buffered: merged into the dataframe on the next read
+            fingerprints.add(fingerprint)
+            st.session_state.setdefault('mock_buffer', []).append(dict(data))
             return True
+        elif self.local_replica is not None:
+            if 'id' not in data or data['id'] is None:
+                data['id'] = str(uuid.uuid4())
+            inserted = self.local_replica.insertar([data])[0]
+            if inserted:
+                self._local_write_done()
+            return inserted
         else:
             try:
                 # Generate ID before inserting (Supabase auto-generates, but we need it for cuotas)
@@ -105,59 +656,231 @@ class DataService:
                     if 'id' in response.data[0]:
                         data['id'] = response.data[0]['id']
 
-                return True
+                self._bump_rows()
                 return True
             except Exception as e:
                 st.error(f"Error inserting to Supabase: {e}")
                 return False
 
+    def add_transactions_bulk(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add many transactions at once (e.g. a whole imported statement).
+
+        Rows are sent in chunks of BULK_CHUNK_SIZE as multi-row upserts that
+        ignore conflicts on DEDUP_COLUMNS, so a 150-line statement is a single
+        request and re-importing it inserts nothing.
+
+        Returns a copy of `df` with an 'id' for every row and a 'status' column:
+        'inserted', 'duplicate' (already stored, or repeated within `df`) or
+        'error' (its chunk failed).
+        """
+        result = df.copy().reset_index(drop=True)
+        if 'id' not in result.columns:
+            result['id'] = None
+        missing_id = result['id'].isna()
+        result.loc[missing_id, 'id'] = [str(uuid.uuid4()) for _ in range(int(missing_id.sum()))]
+        result['status'] = 'duplicate'
+        if result.empty:
+            return result
+
+        if self.use_mock:
+            return self._add_transactions_bulk_mock(result)
+        if self.local_replica is not None:
+            is_new = self.local_replica.insertar(result.drop(columns='status').to_dict('records'))
+            result.loc[is_new, 'status'] = 'inserted'
+            if any(is_new):
+                self._local_write_done()
+            return result
+
+        records = self._serialize_frame_for_supabase(result.drop(columns='status'))
+        for start in range(0, len(records), self.BULK_CHUNK_SIZE):
+            chunk = records[start:start + self.BULK_CHUNK_SIZE]
+            try:
+                response = self.supabase.table('transactions').upsert(
+                    chunk, on_conflict=','.join(DEDUP_COLUMNS), ignore_duplicates=True
+                ).execute()
+            except Exception as e:
+                st.error(f"Error inserting to Supabase: {e}")
+                result.loc[start:start + len(chunk) - 1, 'status'] = 'error'
+                continue
+            # Only the rows actually inserted come back; the rest were conflicts
+            inserted_ids = {row['id'] for row in (response.data or [])}
+            rows = result.index[start:start + len(chunk)]
+            result.loc[rows[result.loc[rows, 'id'].isin(inserted_ids)], 'status'] = 'inserted'
+
+        if (result['status'] == 'inserted').any():
+            self._bump_rows()
+        return result
+
+    def _add_transactions_bulk_mock(self, result: pd.DataFrame) -> pd.DataFrame:
+        """Mock version of add_transactions_bulk: set lookups for duplicates, one concat and sort."""
+        fingerprints = self._mock_fingerprints()
+        is_new = []
+        for fingerprint in self._fingerprints(result):
+            is_new.append(fingerprint not in fingerprints)
+            fingerprints.add(fingerprint)
+        result.loc[is_new, 'status'] = 'inserted'
+
+        new_rows = result[is_new].drop(columns='status')
+        if not new_rows.empty:
+            st.session_state.setdefault('mock_buffer', []).extend(new_rows.to_dict('records'))
+            self._mock_store()
+        return result
+
     def update_transaction(self, transaction_id: str, updates: dict) -> bool:
         """
         Update a transaction in Supabase (or mock).
         """
+        return self.update_transactions([{'id': transaction_id, **updates}]) > 0
+
+    def update_transactions(self, changes: List[dict]) -> int:
+        """
+        Update many transactions at once.
+
+        Args:
+            changes: One dict per transaction with its 'id' and the fields to set.
+
+        Changes that set the same values (e.g. a bulk recategorization or
+        zeroing several shared expenses) go out as a single
+        `update(values).in_('id', ids)` request, in chunks of ID_CHUNK_SIZE ids.
+        Changes with different values per transaction go out together through
+        the update_transactions_bulk RPC, BULK_CHUNK_SIZE per request (or, if
+        the function isn't deployed, one update per distinct set of values).
+
+        Returns:
+            Number of transactions actually updated: rows Supabase reports as
+            changed (ids that don't exist or aren't visible to the user don't
+            count), rows changed in the local replica or in the mock store.
+        """
+        changes = [c for c in changes if c.get('id') is not None and len(c) > 1]
+        if not changes:
+            return 0
+
         if self.use_mock:
-            # Update in local session state mock
-            if 'mock_transactions' in st.session_state:
-                df = st.session_state.mock_transactions
-                if not df.empty and 'id' in df.columns:
-                    # Find and update
-                    mask = df['id'] == transaction_id
-                    if mask.any():
-                        for key, value in updates.items():
-                             df.loc[mask, key] = value
-                        st.session_state.mock_transactions = df
-                        return True
-            return False
-        else:
+            df = self._mock_store()
+            if df.empty or 'id' not in df.columns:
+                return 0
+            # Column by column: {id: value} for the transactions that set it
+            values_by_column = {}
+            for change in changes:
+                for key, value in change.items():
+                    if key != 'id':
+                        values_by_column.setdefault(key, {})[change['id']] = value
+            for key, values in values_by_column.items():
+                mask = df['id'].isin(values.keys())
+                if key not in df.columns:
+                    df[key] = None
+                df.loc[mask, key] = df.loc[mask, 'id'].map(values)
+            st.session_state.mock_transactions = df
+            if {'date', 'description', 'amount'} & set(values_by_column):
+                st.session_state.pop('mock_fingerprints', None)  # rebuilt on next insert
+            return int(df['id'].isin({c['id'] for c in changes}).sum())
+
+        # Group transactions that receive identical values
+        groups = {}
+        for change in changes:
+            values = {k: v for k, v in change.items() if k != 'id'}
+            key = tuple(sorted((k, repr(v)) for k, v in values.items()))
+            groups.setdefault(key, (values, []))[1].append(change['id'])
+
+        if self.local_replica is not None:
+            updated = sum(self.local_replica.actualizar(values, ids) for values, ids in groups.values())
+            self._local_write_done({k for values, _ in groups.values() for k in values})
+            return updated
+
+        updated = 0
+        try:
+            rpc_updated = self._update_transactions_rpc(changes) if len(groups) > 1 else None
+            if rpc_updated is not None:
+                updated = rpc_updated
+            else:
+                for values, ids in groups.values():
+                    serialized = self._serialize_for_supabase(values)
+                    for start in range(0, len(ids), self.ID_CHUNK_SIZE):
+                        chunk = ids[start:start + self.ID_CHUNK_SIZE]
+                        response = self.supabase.table('transactions').update(serialized).in_('id', chunk).execute()
+                        updated += len(response.data or [])
+        except Exception as e:
+            st.error(f"Error updating Supabase: {e}")
+        finally:
+            # Also after a partial failure: earlier requests may have gone through
+            self._bump_columns({k for values, _ in groups.values() for k in values})
+        return updated
+
+    def _update_transactions_rpc(self, changes: List[dict]) -> Optional[int]:
+        """
+        Send `changes` through the update_transactions_bulk RPC, BULK_CHUNK_SIZE per request.
+
+        Returns the rows updated, or None if the function isn't deployed
+        (database/migration_update_transactions_bulk.sql).
+        """
+        if not self._bulk_update_available:
+            return None
+        updated = 0
+        for start in range(0, len(changes), self.BULK_CHUNK_SIZE):
+            chunk = [self._serialize_for_supabase(c) for c in changes[start:start + self.BULK_CHUNK_SIZE]]
             try:
-                # Update in Supabase
-                self.supabase.table('transactions').update(updates).eq('id', transaction_id).execute()
-                return True
-            except Exception as e:
-                st.error(f"Error updating Supabase: {e}")
-                return False
+                response = self.supabase.rpc('update_transactions_bulk', {'changes': chunk}).execute()
+            except Exception:
+                if start > 0:
+                    raise
+                self._bulk_update_available = False
+                return None
+            updated += int(response.data or 0)
+        return updated
 
     def delete_transaction(self, transaction_id: str) -> bool:
         """
         Delete a transaction from Supabase (or mock).
         """
+        return self.delete_transactions([transaction_id]) > 0
+
+    def delete_transactions(self, ids: List[str]) -> int:
+        """
+        Delete many transactions with `delete().in_('id', ids)` (chunks of ID_CHUNK_SIZE).
+
+        Returns the number of transactions deleted (mock) or sent (Supabase).
+        """
+        ids = list(dict.fromkeys(i for i in ids if i is not None))
+        if not ids:
+            return 0
+
         if self.use_mock:
-            if 'mock_transactions' in st.session_state:
-                df = st.session_state.mock_transactions
-                if not df.empty and 'id' in df.columns:
-                    st.session_state.mock_transactions = df[df['id'] != transaction_id]
-                    return True
-            return False
-        else:
-            try:
-                self.supabase.table('transactions').delete().eq('id', transaction_id).execute()
-                return True
-            except Exception as e:
-                st.error(f"Error deleting from Supabase: {e}")
-                return False
+            df = self._mock_store()
+            if df.empty or 'id' not in df.columns:
+                return 0
+            mask = df['id'].isin(ids)
+            if 'mock_fingerprints' in st.session_state:
+                st.session_state.mock_fingerprints.difference_update(self._fingerprints(df[mask]))
+            st.session_state.mock_transactions = df[~mask]
+            return int(mask.sum())
+
+        if self.local_replica is not None:
+            deleted = self.local_replica.eliminar(ids)
+            self._local_write_done()
+            return deleted
+
+        deleted = 0
+        try:
+            for start in range(0, len(ids), self.ID_CHUNK_SIZE):
+                chunk = ids[start:start + self.ID_CHUNK_SIZE]
+                self.supabase.table('transactions').delete().in_('id', chunk).execute()
+                deleted += len(chunk)
+        except Exception as e:
+            st.error(f"Error deleting from Supabase: {e}")
+        finally:
+            if deleted:
+                self._bump_rows()
+        return deleted
+
+@st.cache_resource
+def _shared_data_service(use_mock: bool) -> DataService:
+    """One DataService (and its query cache) per mode, shared by all pages and reruns."""
+    return DataService(use_mock=use_mock)
+
 
 def get_data_service():
     """Factory to get data service based on config."""
     # Use Supabase by default (no mock mode)
     use_mock = st.session_state.get('use_mock_data', False)
-    return DataService(use_mock=use_mock)
+    return _shared_data_service(use_mock)
@@ -1,23 +1,876 @@
 """
 Sistema de persistencia local para datos del dashboard
 """
+import bisect
 import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, date
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Iterable, Optional
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Formato parquet opcional
+    pa = None
+    pq = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin locks entre procesos, solo entre threads
+    fcntl = None
+
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+# Archivos de una partición de cuotas: 2025-03.json, 2025-03.parquet, 2025-03.journal.jsonl
+PATRON_PARTICION = re.compile(r'^\d{4}-\d{2}\.(?:json|parquet|journal\.jsonl)$')
+
+
+def _firma_archivo(path: Path) -> Optional[tuple]:
+    """(mtime_ns, size) de un archivo, o None si no existe. Sirve para validar caches."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _firma_json(firma: tuple) -> list:
+    """Firma de una ColeccionJournal (snapshot, journal) en la forma en que queda guardada en JSON."""
+    return [list(f) if f is not None else None for f in firma]
+
+
+@contextmanager
+def _reemplazo_atomico(path: Path):
+    """
+    Escribir un archivo vía temporal + rename atómico.
+    Los lectores ven siempre la versión anterior completa o la nueva completa.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        yield Path(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def _escribir_json_atomico(path: Path, data: Any, **kwargs):
+    with _reemplazo_atomico(path) as tmp_file:
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, **kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class BloqueoArchivo:
+    """
+    Lock advisory entre procesos (flock sobre un archivo `.lock`), reentrante
+    dentro del proceso. Solo lo toman los escritores: los lectores no bloquean
+    y validan su lectura con la firma (mtime, tamaño) de los archivos.
+    """
+
+    def __init__(self, lock_file: Path, lock: Optional[threading.RLock] = None):
+        self.lock_file = lock_file
+        self._lock = lock or threading.RLock()
+        self._fd = None
+        self._nivel = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._nivel == 0:
+                self._fd = open(self.lock_file, 'a')
+                if fcntl is not None:
+                    fcntl.flock(self._fd.fileno(), fcntl.LOCK_EX)
+            self._nivel += 1
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        if self._nivel == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd.fileno(), fcntl.LOCK_UN)
+            self._fd.close()
+            self._fd = None
+        self._lock.release()
+
+
+class ColeccionJournal:
+    """
+    Colección de registros persistida como snapshot JSON + journal append-only.
+
+    Cada alta, modificación o baja se agrega como una línea JSON al journal,
+    así que una escritura cuesta O(1) de I/O sin importar el tamaño del archivo.
+    Al cargar se lee el snapshot y se re-aplica el journal encima. Cuando el
+    journal acumula `umbral_compactacion` operaciones, un thread en segundo
+    plano lo vuelca al snapshot y lo trunca.
+
+    Las operaciones son idempotentes (alta/modificación/baja por clave), por lo
+    que re-aplicar un journal ya volcado al snapshot no cambia el resultado.
+
+    El resultado parseado queda en memoria mientras no cambien el mtime ni el
+    tamaño del snapshot y del journal. Las escrituras propias se aplican sobre
+    esa copia en memoria (y sobre los índices secundarios de `campos_indexados`)
+    en lugar de invalidarla, así que buscar por clave o por campo indexado es O(1).
+
+    Concurrencia (varias sesiones o procesos sobre el mismo data/): los
+    escritores se serializan con un BloqueoArchivo y, antes de escribir,
+    re-sincronizan el estado en memoria si otro proceso cambió los archivos.
+    Los lectores no toman el lock: releen si la firma cambió durante la lectura.
+    """
+
+    def __init__(
+        self,
+        snapshot_file: Path,
+        clave_fn: Callable[[Dict[str, Any]], Optional[str]],
+        serializar: Callable[[Any], Any],
+        deserializar: Callable[[Dict[str, Any]], Dict[str, Any]],
+        campos_indexados: Iterable[str] = (),
+        umbral_compactacion: int = 500
+    ):
+        self.snapshot_file = snapshot_file
+        self.journal_file = snapshot_file.with_suffix('.journal.jsonl')
+        self.clave_fn = clave_fn
+        self.serializar = serializar
+        self.deserializar = deserializar
+        self.campos_indexados = tuple(campos_indexados)
+        self.umbral_compactacion = umbral_compactacion
+
+        self._lock = threading.RLock()
+        self._bloqueo = BloqueoArchivo(snapshot_file.with_name(snapshot_file.name + '.lock'), self._lock)
+        self._ops_pendientes = None  # Se calcula al primer uso
+        self._compactando = False
+        self._hilo_compactacion = None
+
+        # Estado en memoria, válido mientras los archivos tengan esta firma
+        self._firma_cache = None
+        self._registros = None  # clave -> registro
+        self._indices = None  # campo -> valor -> set(claves)
+        # (firma antes, firma después) de la última compactación: mismo contenido
+        self._ultima_compactacion = None
+
+    # --- Lectura ---
+    def _leer_snapshot(self) -> List[Dict[str, Any]]:
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, 'r') as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError:
+                    return []
+        return []
+
+    def _leer_journal(self) -> List[Dict[str, Any]]:
+        ops = []
+        if self.journal_file.exists():
+            with open(self.journal_file, 'r') as f:
+                for linea in f:
+                    linea = linea.strip()
+                    if not linea:
+                        continue
+                    try:
+                        ops.append(json.loads(linea))
+                    except json.JSONDecodeError:
+                        # Línea truncada (ej: proceso cortado a mitad de escritura)
+                        continue
+        return ops
+
+    def _clave(self, registro: Dict[str, Any], posicion: int) -> str:
+        clave = self.clave_fn(registro)
+        # Registros viejos sin clave: no perderlos al re-aplicar el journal
+        return clave if clave is not None else f"_sin_clave_{posicion}"
+
+    def _indexar(self, clave: str, registro: Dict[str, Any], campos: Iterable[str] = None):
+        # dict como "set ordenado": los resultados salen en orden de alta
+        for campo in campos if campos is not None else self.campos_indexados:
+            self._indices[campo].setdefault(registro.get(campo), {})[clave] = None
+
+    def _desindexar(self, clave: str, registro: Dict[str, Any], campos: Iterable[str] = None):
+        for campo in campos if campos is not None else self.campos_indexados:
+            claves = self._indices[campo].get(registro.get(campo))
+            if claves is not None:
+                claves.pop(clave, None)
+                if not claves:
+                    del self._indices[campo][registro.get(campo)]
+
+    def _aplicar(self, op: Dict[str, Any]):
+        """Aplicar una operación del journal al estado en memoria."""
+        tipo = op.get('op')
+        if tipo == 'add':
+            registro = self.deserializar(dict(op['data']))
+            clave = self._clave(registro, len(self._registros))
+            if clave in self._registros:
+                self._desindexar(clave, self._registros[clave])
+            self._registros[clave] = registro
+            self._indexar(clave, registro)
+        elif tipo == 'update':
+            registro = self._registros.get(op.get('id'))
+            if registro is not None:
+                cambios = self.deserializar(dict(op['data']))
+                campos = [c for c in self.campos_indexados if c in cambios and cambios[c] != registro.get(c)]
+                self._desindexar(op['id'], registro, campos)
+                registro.update(cambios)
+                self._indexar(op['id'], registro, campos)
+        elif tipo == 'delete':
+            registro = self._registros.pop(op.get('id'), None)
+            if registro is not None:
+                self._desindexar(op['id'], registro)
+
+    def _firma(self) -> tuple:
+        return (_firma_archivo(self.snapshot_file), _firma_archivo(self.journal_file))
+
+    def _recargar(self, firma: tuple, reintentos: int = 5):
+        for _ in range(reintentos):
+            self._registros = {}
+            self._indices = {campo: {} for campo in self.campos_indexados}
+            for i, registro in enumerate(self._leer_snapshot()):
+                registro = self.deserializar(registro)
+                clave = self._clave(registro, i)
+                self._registros[clave] = registro
+
+            for clave, registro in self._registros.items():
+                self._indexar(clave, registro)
+
+            ops = self._leer_journal()
+            for op in ops:
+                self._aplicar(op)
+
+            # Control optimista: si un escritor (ej: una compactación) cambió los
+            # archivos mientras leíamos, la lectura puede estar mezclada: releer
+            firma_final = self._firma()
+            if firma_final == firma:
+                break
+            firma = firma_final
+
+        self._ops_pendientes = len(ops)
+        self._firma_cache = firma
+
+    def cargar(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Cargar la colección como dict ordenado clave -> registro.
+
+        Devuelve el objeto en memoria: los llamadores no deben modificarlo.
+        """
+        with self._lock:
+            firma = self._firma()
+            if self._registros is None or self._firma_cache != firma:
+                self._recargar(firma)
+            return self._registros
+
+    def buscar(self, campo: str, valor: Any) -> List[Dict[str, Any]]:
+        """Registros cuyo `campo` (uno de `campos_indexados`) vale `valor`."""
+        with self._lock:
+            registros = self.cargar()
+            return [registros[clave] for clave in self._indices[campo].get(valor, ())]
+
+    # --- Escritura ---
+    def _agregar_ops(self, ops: List[Dict[str, Any]]):
+        """Agregar operaciones al journal. Llamar con `self._bloqueo` tomado y el estado sincronizado."""
+        if not ops:
+            return
+
+        lineas = ''.join(json.dumps(op, default=self.serializar) + '\n' for op in ops)
+
+        # Una sola escritura por lote
+        with open(self.journal_file, 'a') as f:
+            f.write(lineas)
+            f.flush()
+            journal = os.fstat(f.fileno())
+
+        for op in ops:
+            self._aplicar(op)
+        # Bajo el bloqueo el snapshot no cambia: la firma nueva es la del journal recién escrito
+        self._firma_cache = (self._firma_cache[0], (journal.st_mtime_ns, journal.st_size))
+
+        self._ops_pendientes += len(ops)
+        if self._ops_pendientes >= self.umbral_compactacion and not self._compactando:
+            self._compactando = True
+            self._hilo_compactacion = threading.Thread(target=self._compactar_en_segundo_plano, daemon=True)
+            self._hilo_compactacion.start()
+
+    def agregar(self, registros: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Agregar registros nuevos (alta), descartando claves existentes o repetidas.
+
+        El chequeo de duplicados y la escritura ocurren bajo el mismo lock, así
+        que dos sesiones que importan lo mismo a la vez no duplican registros.
+
+        Returns:
+            Registros efectivamente agregados
+        """
+        with self._bloqueo:
+            existentes = self.cargar()  # Re-sincroniza si otro proceso escribió
+            nuevos = {}
+            for registro in registros:
+                clave = self.clave_fn(registro)
+                if clave not in existentes and clave not in nuevos:
+                    nuevos[clave] = registro
+
+            self._agregar_ops([{'op': 'add', 'data': r} for r in nuevos.values()])
+            return list(nuevos.values())
+
+    def actualizar(self, clave: str, cambios: Dict[str, Any]) -> bool:
+        """Actualizar campos de un registro existente. Devuelve False si no existe."""
+        with self._bloqueo:
+            if clave not in self.cargar():
+                return False
+            self._agregar_ops([{'op': 'update', 'id': clave, 'data': cambios}])
+            return True
+
+    def actualizar_muchos(self, cambios: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Actualizar varios registros (clave -> cambios) con una sola escritura.
+
+        Returns:
+            Cantidad de registros actualizados (se ignoran las claves que no existen)
+        """
+        with self._bloqueo:
+            existentes = self.cargar()
+            ops = [
+                {'op': 'update', 'id': clave, 'data': datos}
+                for clave, datos in cambios.items() if clave in existentes
+            ]
+            self._agregar_ops(ops)
+            return len(ops)
+
+    def eliminar(self, clave: str) -> bool:
+        """Eliminar un registro. Devuelve False si no existe."""
+        with self._bloqueo:
+            if clave not in self.cargar():
+                return False
+            self._agregar_ops([{'op': 'delete', 'id': clave}])
+            return True
+
+    # --- Compactación ---
+    def compactar(self):
+        """Volcar snapshot + journal a un snapshot nuevo y truncar el journal."""
+        with self._bloqueo:
+            registros = self.cargar()
+            firma_previa = self._firma_cache
+            self._escribir_snapshot(list(registros.values()))
+
+            # Si se corta acá, re-aplicar el journal sobre el snapshot nuevo es inocuo
+            open(self.journal_file, 'w').close()
+            self._ops_pendientes = 0
+            # El contenido no cambió: solo actualizar la firma
+            self._firma_cache = self._firma()
+            self._ultima_compactacion = (firma_previa, self._firma_cache)
+
+    def _escribir_snapshot(self, registros: List[Dict[str, Any]]):
+        _escribir_json_atomico(self.snapshot_file, registros, default=self.serializar)
+
+    def _compactar_en_segundo_plano(self):
+        try:
+            self.compactar()
+        finally:
+            self._compactando = False
+
+    def esperar_compactacion(self):
+        """Esperar a que termine la compactación en segundo plano, si hay una en curso."""
+        hilo = self._hilo_compactacion
+        if hilo is not None:
+            hilo.join()
+
+    def cargar_df(self) -> pd.DataFrame:
+        """Cargar la colección como DataFrame."""
+        return pd.DataFrame(list(self.cargar().values()))
+
+
+class ColeccionParquet(ColeccionJournal):
+    """
+    ColeccionJournal con snapshot columnar en Parquet en lugar de JSON.
+
+    Las fechas se guardan como date32 y los montos como float64. `cargar_df`
+    lee el snapshot directo a un DataFrame con tipos de pyarrow, sin pasar por
+    dicts ni `datetime.fromisoformat` por fila; si hay journal pendiente, lo
+    re-aplica en memoria y deja el volcado a la compactación. El journal sigue
+    siendo JSON-lines.
+
+    Los montos se validan al escribir: '' o None son null, y cualquier otro
+    valor no numérico es un ValueError (no se guarda como NaN).
+    """
+
+    COLUMNAS_NUMERICAS = ('amount', 'adjusted_amount')
+
+    def _leer_snapshot(self) -> List[Dict[str, Any]]:
+        if not self.snapshot_file.exists():
+            # Pasaje desde el formato JSON: se lee el snapshot viejo hasta la próxima compactación
+            json_file = self.snapshot_file.with_suffix('.json')
+            if json_file.exists():
+                with open(json_file, 'r') as f:
+                    return json.load(f)
+            return []
+
+        # Parquet completa con nulls las columnas que un registro no tenía
+        return [
+            {k: v for k, v in fila.items() if v is not None}
+            for fila in pq.read_table(self.snapshot_file).to_pylist()
+        ]
+
+    def _a_numero(self, col: str, valor: Any) -> Optional[float]:
+        """Monto como float: '' o None (o NaN) -> None; otro valor no numérico -> ValueError."""
+        if valor is None or (isinstance(valor, str) and not valor.strip()):
+            return None
+        try:
+            numero = float(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f"{self.snapshot_file.stem}: valor no numérico en '{col}': {valor!r}") from None
+        return None if numero != numero else numero
+
+    def _agregar_ops(self, ops: List[Dict[str, Any]]):
+        # Validar antes de escribir: un monto inválido en el journal haría fallar cada compactación
+        for op in ops:
+            datos = op.get('data') or {}
+            for col in self.COLUMNAS_NUMERICAS:
+                if col in datos:
+                    self._a_numero(col, datos[col])
+        super()._agregar_ops(ops)
+
+    def _tabla(self, registros: List[Dict[str, Any]]) -> pa.Table:
+        df = pd.DataFrame(registros)
+        for col in self.COLUMNAS_NUMERICAS:
+            if col in df.columns:
+                df[col] = pd.Series([self._a_numero(col, v) for v in df[col]], index=df.index, dtype='float64')
+
+        columnas = {}
+        for col in df.columns:
+            try:
+                columnas[col] = pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Columna con tipos mezclados: guardarla como texto
+                columnas[col] = pa.array([None if pd.isna(v) else str(v) for v in df[col]])
+        return pa.table(columnas)
+
+    def _escribir_snapshot(self, registros: List[Dict[str, Any]]):
+        tabla = self._tabla(registros)
+        with _reemplazo_atomico(self.snapshot_file) as tmp_file:
+            pq.write_table(tabla, tmp_file)
+
+    def cargar_df(self) -> pd.DataFrame:
+        """
+        Cargar la colección como DataFrame tipado.
+
+        Sin journal pendiente se lee el Parquet directo. Si hay journal (o solo
+        queda el snapshot JSON de antes del pasaje), se re-aplica en memoria
+        sobre el snapshot y se convierte con los mismos tipos, sin escribir nada.
+        """
+        snapshot, journal = self._firma()
+        if snapshot is not None and (journal is None or journal[1] == 0):
+            # El snapshot se reemplaza atómicamente: leerlo no necesita lock
+            return pd.read_parquet(self.snapshot_file, dtype_backend='pyarrow')
+
+        registros = list(self.cargar().values())
+        if not registros:
+            return pd.DataFrame()
+        return self._tabla(registros).to_pandas(types_mapper=pd.ArrowDtype)
+
+
+class CuotasParticionadas:
+    """
+    Cuotas propagadas particionadas por período en disco.
+
+    Cada período "YYYY-MM" es una ColeccionJournal propia (`cuotas/2025-03.json`
+    + su journal). Leer un mes abre solo su partición, y propagar una compra
+    escribe solo en las particiones de los meses que toca.
+
+    Los períodos se listan desde los archivos de cuotas/. Por período se lleva
+    un resumen: cantidad de cuotas y compromiso por (moneda, banco), es decir
+    monto y cantidad de las cuotas aún no encontradas en un PDF. Cada alta,
+    cambio o baja suma su diferencia al resumen en memoria, sin tocar el disco.
+
+    Cada resumen guarda la firma (mtime, tamaño) de su partición. El manifest
+    (`cuotas/manifest.json`) se vuelca cada `umbral_volcado` cambios; al leerlo,
+    un resumen cuya firma ya no coincide con la de la partición (otro proceso
+    la escribió, o este se cortó sin volcar) se recalcula desde la partición.
+    Así el manifest no se reescribe en cada escritura y nunca queda desfasado.
+    """
+
+    umbral_volcado = 500
+
+    def __init__(self, cuotas_dir: Path, nueva_particion: Callable[[Path], ColeccionJournal]):
+        # nueva_particion recibe la ruta sin extensión (cuotas/2025-03) y define el formato
+        self.cuotas_dir = cuotas_dir
+        self.cuotas_dir.mkdir(exist_ok=True)
+        self.manifest_file = self.cuotas_dir / 'manifest.json'
+        self._nueva_particion = nueva_particion
+
+        self._lock = threading.RLock()
+        self._bloqueo_manifest = BloqueoArchivo(self.cuotas_dir / 'manifest.json.lock', self._lock)
+        self._particiones: Dict[str, ColeccionJournal] = {}
+        self._cache_manifest = None  # (firma, manifest)
+        # Resúmenes vigentes en este proceso (período -> resumen) y cambios aún no volcados
+        self._resumenes: Dict[str, Dict[str, Any]] = {}
+        self._sin_volcar = 0
+
+    # --- Manifest ---
+    def _leer_manifest(self) -> Dict[str, Any]:
+        firma = _firma_archivo(self.manifest_file)
+        if firma is None:
+            return {'periodos': {}}
+        if self._cache_manifest is not None and self._cache_manifest[0] == firma:
+            return self._cache_manifest[1]
+
+        with open(self.manifest_file, 'r') as f:
+            try:
+                manifest = json.load(f)
+            except json.JSONDecodeError:
+                manifest = {'periodos': {}}
+        self._cache_manifest = (firma, manifest)
+        return manifest
+
+    def _escribir_manifest(self, manifest: Dict[str, Any]):
+        _escribir_json_atomico(self.manifest_file, manifest, indent=2, sort_keys=True)
+        self._cache_manifest = (_firma_archivo(self.manifest_file), manifest)
+
+    def volcar_manifest(self):
+        """Guardar en manifest.json los resúmenes de este proceso que siguen vigentes."""
+        if not self._sin_volcar:
+            return
+        with self._bloqueo_manifest:
+            periodos = {
+                period: resumen
+                for period, resumen in self._leer_manifest().get('periodos', {}).items()
+                if isinstance(resumen, dict)  # Formato anterior (solo cantidad): se recalcula
+            }
+            for period in list(self._resumenes):
+                # Si otro proceso escribió la partición después, nuestro resumen ya no vale
+                resumen = self._resumen_en_memoria(period, self.particion(period)._firma())
+                if resumen is not None:
+                    periodos[period] = dict(
+                        resumen, firma=_firma_json(resumen['firma']), compromiso=dict(resumen['compromiso'])
+                    )
+            self._escribir_manifest({'periodos': periodos})
+            self._sin_volcar = 0
+
+    def _anotar_cambio(self):
+        self._sin_volcar += 1
+        if self._sin_volcar >= self.umbral_volcado:
+            self.volcar_manifest()
+
+    # --- Resumen por período ---
+    def _calcular_resumen(self, period: str) -> Dict[str, Any]:
+        """Cantidad y compromiso de un período recorriendo su partición."""
+        particion = self.particion(period)
+        registros = particion.cargar()
+        deltas: Dict[str, List[float]] = {}
+        for cuota in registros.values():
+            self._sumar_aporte(deltas, cuota, 1)
+        return {
+            'firma': particion._firma_cache,
+            'cuotas': len(registros),
+            'compromiso': {
+                clave: {'monto': round(monto, 2), 'cantidad': cantidad}
+                for clave, (monto, cantidad) in deltas.items() if cantidad > 0
+            },
+        }
+
+    def _resumen_en_memoria(self, period: str, firma: tuple) -> Optional[Dict[str, Any]]:
+        """Resumen de este proceso si sigue valiendo para la firma `firma` de la partición."""
+        resumen = self._resumenes.get(period)
+        if resumen is None or resumen['firma'] == firma:
+            return resumen
+        compactacion = self.particion(period)._ultima_compactacion
+        if compactacion == (resumen['firma'], firma):
+            # Una compactación cambia la firma pero no el contenido
+            resumen['firma'] = firma
+            return resumen
+        return None
+
+    def _resumen(self, period: str, firma: Optional[tuple] = None) -> Dict[str, Any]:
+        """
+        Resumen vigente de un período: el de memoria o el del manifest si su
+        firma coincide con la de la partición (`firma`, o leída del disco); si no, se recalcula.
+        En memoria la firma es una tupla, como en ColeccionJournal; en el manifest, listas.
+        """
+        if firma is None:
+            firma = self.particion(period)._firma()
+        resumen = self._resumen_en_memoria(period, firma)
+        if resumen is None:
+            resumen = self._leer_manifest().get('periodos', {}).get(period)
+            if isinstance(resumen, dict) and resumen.get('firma') == _firma_json(firma):
+                # Copia propia: las escrituras modifican el resumen en memoria
+                resumen = dict(resumen, firma=firma, compromiso=dict(resumen['compromiso']))
+            else:
+                resumen = self._calcular_resumen(period)
+                self._anotar_cambio()
+            self._resumenes[period] = resumen
+        return resumen
+
+    def _aplicar_deltas(self, particion: ColeccionJournal, resumen: Dict[str, Any], cuotas: int,
+                        deltas: Dict[str, List[float]]):
+        """Sumar una escritura al resumen (propio de este proceso) con la firma actual de la partición."""
+        rollup = resumen['compromiso']
+        for clave, (monto, cantidad) in deltas.items():
+            if not monto and not cantidad:
+                continue
+            fila = rollup.get(clave, {'monto': 0.0, 'cantidad': 0})
+            fila = {'monto': round(fila['monto'] + monto, 2), 'cantidad': fila['cantidad'] + cantidad}
+            if fila['cantidad'] > 0:
+                rollup[clave] = fila
+            else:
+                rollup.pop(clave, None)
+        resumen['cuotas'] += cuotas
+        resumen['firma'] = particion._firma_cache
+        self._anotar_cambio()
+
+    def periodos(self) -> List[str]:
+        """Períodos con al menos una cuota, ordenados."""
+        return [period for period in sorted(self._periodos_en_disco()) if self._resumen(period)['cuotas'] > 0]
+
+    def _periodos_en_disco(self) -> set:
+        """Períodos con archivos de partición (snapshot o journal) en cuotas/."""
+        return {
+            archivo.name[:7] for archivo in self.cuotas_dir.iterdir()
+            if PATRON_PARTICION.match(archivo.name)
+        }
+
+    # --- Compromiso por período ---
+    @staticmethod
+    def _aporte(cuota: Optional[Dict[str, Any]]) -> Optional[tuple]:
+        """(clave moneda|banco, monto) con que una cuota suma al compromiso de su período, o None."""
+        if cuota is None or cuota.get('encontrada_en_pdf'):
+            return None
+        try:
+            monto = float(cuota['adjusted_amount'])
+        except (KeyError, TypeError, ValueError):
+            try:
+                monto = float(cuota.get('amount') or 0)
+            except (TypeError, ValueError):
+                monto = 0.0
+        if monto != monto:  # NaN
+            monto = 0.0
+        return f"{cuota.get('currency') or 'ARS'}|{cuota.get('bank') or ''}", monto
+
+    def _sumar_aporte(self, deltas: Dict[str, List[float]], cuota: Optional[Dict[str, Any]], signo: int):
+        aporte = self._aporte(cuota)
+        if aporte is not None:
+            delta = deltas.setdefault(aporte[0], [0.0, 0])
+            delta[0] += signo * aporte[1]
+            delta[1] += signo
+
+    def compromiso(self) -> Dict[str, Dict[str, Any]]:
+        """Compromiso por "período|moneda|banco" -> {'monto', 'cantidad'} de las cuotas pendientes."""
+        resultado = {}
+        for period in self.periodos():
+            for clave, fila in self._resumen(period)['compromiso'].items():
+                resultado[f"{period}|{clave}"] = fila
+        return resultado
+
+    # --- Particiones ---
+    def particion(self, period: str) -> ColeccionJournal:
+        """ColeccionJournal de un período (no toca el disco hasta la primera escritura)."""
+        with self._lock:
+            if period not in self._particiones:
+                self._particiones[period] = self._nueva_particion(self.cuotas_dir / period)
+            return self._particiones[period]
+
+    def cargar_periodo(self, period: str) -> Dict[str, Dict[str, Any]]:
+        """Cuotas de un período como dict clave -> cuota (vacío si no hay partición)."""
+        return self.particion(period).cargar()
+
+    def cargar_todas(self) -> List[Dict[str, Any]]:
+        """Todas las cuotas, en orden de período."""
+        cuotas = []
+        for period in self.periodos():
+            cuotas.extend(self.particion(period).cargar().values())
+        return cuotas
+
+    def cargar_todas_df(self) -> pd.DataFrame:
+        """Todas las cuotas como un único DataFrame."""
+        frames = [self.particion(period).cargar_df() for period in self.periodos()]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    # --- Escritura ---
+    # Bajo el lock de la partición: cargar() la deja sincronizada, así que su
+    # _firma_cache es la firma actual y el resumen se actualiza sin releer nada.
+    def agregar(self, cuotas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Agregar cuotas nuevas (descartando claves existentes), con una escritura por partición.
+
+        Returns:
+            Cuotas efectivamente agregadas
+        """
+        por_periodo: Dict[str, List[Dict[str, Any]]] = {}
+        for cuota in cuotas:
+            por_periodo.setdefault(cuota['period'], []).append(cuota)
+
+        agregadas = []
+        for period, lote in por_periodo.items():
+            particion = self.particion(period)
+            with particion._bloqueo:
+                particion.cargar()
+                resumen = self._resumen(period, particion._firma_cache)
+                nuevas = particion.agregar(lote)
+                if nuevas:
+                    deltas: Dict[str, List[float]] = {}
+                    for cuota in nuevas:
+                        self._sumar_aporte(deltas, cuota, 1)
+                    self._aplicar_deltas(particion, resumen, len(nuevas), deltas)
+            agregadas.extend(nuevas)
+        return agregadas
+
+    def actualizar(self, period: str, clave: str, cambios: Dict[str, Any]) -> bool:
+        """Actualizar campos de una cuota existente. Devuelve False si no existe."""
+        return self.actualizar_muchos(period, {clave: cambios}) > 0
+
+    def actualizar_muchos(self, period: str, cambios: Dict[str, Dict[str, Any]]) -> int:
+        """Actualizar varias cuotas de un mismo período con una sola escritura."""
+        if not cambios:
+            return 0
+        particion = self.particion(period)
+        deltas: Dict[str, List[float]] = {}
+        # Aporte antes y después: la diferencia va al compromiso
+        with particion._bloqueo:
+            registros = particion.cargar()
+            resumen = self._resumen(period, particion._firma_cache)
+            ops = [
+                {'op': 'update', 'id': clave, 'data': datos}
+                for clave, datos in cambios.items() if clave in registros
+            ]
+            if ops:
+                for op in ops:
+                    self._sumar_aporte(deltas, registros[op['id']], -1)
+                # La partición ya está sincronizada: escribir sin volver a cargarla
+                particion._agregar_ops(ops)
+                # Los registros se actualizan en memoria: no hace falta recargar
+                for op in ops:
+                    self._sumar_aporte(deltas, registros[op['id']], 1)
+                self._aplicar_deltas(particion, resumen, 0, deltas)
+        return len(ops)
+
+    def eliminar(self, period: str, clave: str) -> bool:
+        """Eliminar una cuota. Devuelve False si no existe."""
+        particion = self.particion(period)
+        deltas: Dict[str, List[float]] = {}
+        with particion._bloqueo:
+            cuota = particion.cargar().get(clave)
+            resumen = self._resumen(period, particion._firma_cache)
+            if not particion.eliminar(clave):
+                return False
+            self._sumar_aporte(deltas, cuota, -1)
+            self._aplicar_deltas(particion, resumen, -1, deltas)
+        return True
+
+    def esperar_compactaciones(self):
+        """Esperar las compactaciones en segundo plano de todas las particiones abiertas."""
+        with self._lock:
+            particiones = list(self._particiones.values())
+        for particion in particiones:
+            particion.esperar_compactacion()
+
+    def migrar_archivo_unico(self, legacy: ColeccionJournal):
+        """
+        Repartir un `cuotas_propagadas.json` (+ journal) viejo en particiones.
+        Los archivos originales quedan renombrados con sufijo `.migrado`.
+
+        Las cuotas sin período no se pueden ubicar en una partición: se saltean
+        y quedan solo en el archivo `.migrado`.
+        """
+        with self._bloqueo_manifest:
+            por_periodo: Dict[str, List[Dict[str, Any]]] = {}
+            for clave, cuota in legacy.cargar().items():
+                if not cuota.get('period'):
+                    continue
+                cuota['key'] = clave
+                por_periodo.setdefault(cuota['period'], []).append(cuota)
+
+            for period, lote in por_periodo.items():
+                self.particion(period)._escribir_snapshot(lote)
+                self._resumenes[period] = self._calcular_resumen(period)
+                self._sin_volcar += 1
+            self.volcar_manifest()
+
+            for archivo in (legacy.snapshot_file, legacy.journal_file):
+                if archivo.exists():
+                    os.replace(archivo, archivo.with_name(archivo.name + '.migrado'))
 
 class LocalStorage:
-    """Maneja la persistencia local de datos."""
+    """
+    Maneja la persistencia local de datos.
 
-    def __init__(self):
-        self.data_dir = Path(__file__).parent.parent / 'data'
+    Args:
+        formato: "json" (default) o "parquet" para los snapshots de gastos
+            manuales y cuotas. Parquet requiere pyarrow.
+        data_dir: Carpeta de datos (default: dashboard/data)
+    """
+
+    def __init__(self, formato: str = 'json', data_dir: Optional[Path] = None):
+        if formato == 'parquet' and pa is None:
+            raise ImportError("El formato parquet requiere pyarrow (pip install pyarrow)")
+        self.formato = formato
+        self._clase_coleccion = ColeccionParquet if formato == 'parquet' else ColeccionJournal
+        extension = '.parquet' if formato == 'parquet' else '.json'
+
+        self.data_dir = Path(data_dir) if data_dir else DATA_DIR
         self.data_dir.mkdir(exist_ok=True)
 
         self.sueldos_file = self.data_dir / 'sueldos.json'
-        self.gastos_manuales_file = self.data_dir / 'gastos_manuales.json'
-        self.cuotas_file = self.data_dir / 'cuotas_propagadas.json'
+        self.gastos_manuales_file = self.data_dir / f'gastos_manuales{extension}'
+        self.cuotas_dir = self.data_dir / 'cuotas'
+
+        self._cache_sueldos = None  # (firma, sueldos)
+        self._linea_sueldos = None  # (sueldos, períodos ordenados, montos)
+
+        # Gastos manuales y cuotas crecen con cada import: se escriben vía journal
+        self.gastos_manuales = self._clase_coleccion(
+            self.gastos_manuales_file,
+            clave_fn=lambda g: g.get('id'),
+            serializar=self._serialize_date,
+            deserializar=self._deserializar_registro
+        )
+        self.cuotas = CuotasParticionadas(self.cuotas_dir, self._nueva_particion_cuotas)
+
+        # Modo virtual de cuotas: compras de origen + ajustes puntuales por período
+        self.compras_cuotas = self._clase_coleccion(
+            self.data_dir / f'compras_cuotas{extension}',
+            clave_fn=lambda c: c.get('original_id'),
+            serializar=self._serialize_date,
+            deserializar=self._deserializar_registro
+        )
+        self.cuotas_overrides = ColeccionJournal(
+            self.data_dir / 'cuotas_overrides.json',
+            clave_fn=self._clave_cuota,
+            serializar=self._serialize_date,
+            deserializar=self._deserializar_registro,
+            campos_indexados=('period',)
+        )
+
+        # Formato anterior: todas las cuotas en un único cuotas_propagadas.json
+        legacy_file = self.data_dir / 'cuotas_propagadas.json'
+        if not self.cuotas.manifest_file.exists() and (
+            legacy_file.exists() or legacy_file.with_suffix('.journal.jsonl').exists()
+        ):
+            self.cuotas.migrar_archivo_unico(ColeccionJournal(
+                legacy_file,
+                clave_fn=self._clave_cuota,
+                serializar=self._serialize_date,
+                deserializar=self._deserializar_registro
+            ))
+
+    def _nueva_particion_cuotas(self, ruta_base: Path) -> ColeccionJournal:
+        extension = '.parquet' if self.formato == 'parquet' else '.json'
+        return self._clase_coleccion(
+            ruta_base.with_suffix(extension),
+            clave_fn=self._clave_cuota,
+            serializar=self._serialize_date,
+            deserializar=self._deserializar_registro,
+            campos_indexados=('original_id',)
+        )
 
     def _serialize_date(self, obj):
         """Serializar fechas para JSON."""
@@ -32,21 +885,49 @@ class LocalStorage:
         except:
             return date_str
 
+    def _deserializar_registro(self, registro: Dict[str, Any]) -> Dict[str, Any]:
+        """Deserializar las fechas de un registro leído del snapshot o del journal."""
+        if isinstance(registro.get('date'), str):
+            registro['date'] = self._deserialize_date(registro['date'])
+        return registro
+
+    @staticmethod
+    def _clave_cuota(cuota: Dict[str, Any]) -> str:
+        """Clave única de una cuota propagada: original_id + período."""
+        return cuota.get('key') or f"{cuota.get('original_id')}_{cuota.get('period')}"
+
+    def cerrar(self):
+        """Esperar las escrituras en segundo plano (compactaciones) y volcar el manifest antes de soltar la instancia."""
+        self.gastos_manuales.esperar_compactacion()
+        self.cuotas.esperar_compactaciones()
+        self.compras_cuotas.esperar_compactacion()
+        self.cuotas_overrides.esperar_compactacion()
+        self.cuotas.volcar_manifest()
+
     # --- SUELDOS ---
     def save_sueldo(self, period: str, amount: float):
         """Guardar sueldo de un período."""
-        sueldos = self.load_sueldos()
-        sueldos[period] = amount
+        with BloqueoArchivo(self.sueldos_file.with_name('sueldos.json.lock')):
+            # Releer bajo lock: otra sesión pudo haber guardado otro sueldo
+            self._cache_sueldos = None
+            sueldos = dict(self.load_sueldos())
+            sueldos[period] = amount
 
-        with open(self.sueldos_file, 'w') as f:
-            json.dump(sueldos, f, indent=2)
+            _escribir_json_atomico(self.sueldos_file, sueldos, indent=2)
+            self._cache_sueldos = None
 
     def load_sueldos(self) -> Dict[str, float]:
-        """Cargar todos los sueldos guardados."""
-        if self.sueldos_file.exists():
-            with open(self.sueldos_file, 'r') as f:
-                return json.load(f)
-        return {}
+        """Cargar todos los sueldos guardados (cacheado por mtime/tamaño del archivo)."""
+        firma = _firma_archivo(self.sueldos_file)
+        if firma is None:
+            return {}
+        if self._cache_sueldos is not None and self._cache_sueldos[0] == firma:
+            return self._cache_sueldos[1]
+
+        with open(self.sueldos_file, 'r') as f:
+            sueldos = json.load(f)
+        self._cache_sueldos = (firma, sueldos)
+        return sueldos
 
     def get_sueldo_vigente(self, period: str) -> float:
         """
@@ -59,70 +940,94 @@ class LocalStorage:
         Returns:
             Sueldo vigente o 0 si no hay ninguno
         """
-        sueldos = self.load_sueldos()
+        periodos, montos = self._get_linea_sueldos()
 
-        # Si hay sueldo exacto para este período
-        if period in sueldos:
-            return sueldos[period]
+        # Último sueldo con período <= al pedido (comparar strings YYYY-MM funciona correctamente)
+        i = bisect.bisect_right(periodos, period)
+        return montos[i - 1] if i > 0 else 0.0
 
-        # Buscar el último sueldo anterior
-        all_periods = sorted(sueldos.keys(), reverse=True)
-        for p in all_periods:
-            if p < period:  # Comparación de strings YYYY-MM funciona correctamente
-                return sueldos[p]
+    def get_sueldos_vigentes(self, periods: List[str]) -> Dict[str, float]:
+        """
+        Obtener el sueldo vigente de varios períodos en una sola llamada.
 
-        return 0.0
+        Args:
+            periods: Lista de períodos en formato "YYYY-MM"
+
+        Returns:
+            Dict período -> sueldo vigente (0 si no hay ninguno)
+        """
+        periodos, montos = self._get_linea_sueldos()
+        if not periods:
+            return {}
+        if not periodos:
+            return {p: 0.0 for p in periods}
+
+        posiciones = np.searchsorted(np.array(periodos), np.array(periods, dtype=str), side='right') - 1
+        return {
+            p: (montos[i] if i >= 0 else 0.0)
+            for p, i in zip(periods, posiciones.tolist())
+        }
+
+    def _get_linea_sueldos(self) -> tuple:
+        """Línea de tiempo de sueldos (períodos ordenados + montos), recalculada solo si cambió el archivo."""
+        sueldos = self.load_sueldos()
+        if self._linea_sueldos is None or self._linea_sueldos[0] is not sueldos:
+            periodos = sorted(sueldos)
+            self._linea_sueldos = (sueldos, periodos, [sueldos[p] for p in periodos])
+        return self._linea_sueldos[1], self._linea_sueldos[2]
 
     # --- GASTOS MANUALES ---
     def save_gasto_manual(self, gasto: Dict[str, Any]):
         """Agregar un gasto manual."""
-        gastos = self.load_gastos_manuales()
-        gastos.append(gasto)
+        self.gastos_manuales.agregar([gasto])
+
+    def save_gastos_manuales_bulk(self, gastos: List[Dict[str, Any]]) -> int:
+        """
+        Agregar varios gastos manuales con una sola escritura.
+        Descarta los que ya existen (por id) o vienen repetidos en el lote.
 
-        with open(self.gastos_manuales_file, 'w') as f:
-            json.dump(gastos, f, indent=2, default=self._serialize_date)
+        Returns:
+            Cantidad de gastos guardados
+        """
+        return len(self.gastos_manuales.agregar(gastos))
 
     def load_gastos_manuales(self) -> List[Dict[str, Any]]:
-        """Cargar todos los gastos manuales."""
-        if self.gastos_manuales_file.exists():
-            with open(self.gastos_manuales_file, 'r') as f:
-                gastos = json.load(f)
-                # Deserializar fechas
-                for g in gastos:
-                    if 'date' in g:
-                        g['date'] = self._deserialize_date(g['date'])
-                return gastos
-        return []
+        """Cargar todos los gastos manuales (los registros vienen del cache: no modificarlos)."""
+        return list(self.gastos_manuales.cargar().values())
+
+    def load_gastos_manuales_df(self) -> pd.DataFrame:
+        """Cargar todos los gastos manuales como DataFrame."""
+        return self.gastos_manuales.cargar_df()
+
+    def get_gastos_manuales_por_periodo(self, period: str) -> List[Dict[str, Any]]:
+        """Obtener gastos manuales de un período específico."""
+        return [g for g in self.load_gastos_manuales() if g.get('period') == period]
 
     def update_gasto_manual(self, gasto_id: str, updates: Dict[str, Any]):
         """Actualizar un gasto manual (ej: marcar como pagado)."""
-        gastos = self.load_gastos_manuales()
-
-        for gasto in gastos:
-            if gasto['id'] == gasto_id:
-                gasto.update(updates)
-                break
+        self.gastos_manuales.actualizar(gasto_id, updates)
 
-        with open(self.gastos_manuales_file, 'w') as f:
-            json.dump(gastos, f, indent=2, default=self._serialize_date)
+    def delete_gasto_manual(self, gasto_id: str):
+        """Eliminar un gasto manual."""
+        self.gastos_manuales.eliminar(gasto_id)
 
     # --- MESES OCULTOS ---
     def save_meses_ocultos(self, meses: set):
         """Guardar set de meses ocultos."""
         config_file = self.data_dir / 'config_dashboard.json'
-        # Cargar config existente
-        config = {}
-        if config_file.exists():
-            with open(config_file, 'r') as f:
-                try:
-                    config = json.load(f)
-                except:
-                    pass
+        with BloqueoArchivo(self.data_dir / 'config_dashboard.json.lock'):
+            # Cargar config existente
+            config = {}
+            if config_file.exists():
+                with open(config_file, 'r') as f:
+                    try:
+                        config = json.load(f)
+                    except:
+                        pass
 
-        config['meses_ocultos'] = list(meses)
+            config['meses_ocultos'] = list(meses)
 
-        with open(config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+            _escribir_json_atomico(config_file, config, indent=2)
 
     def load_meses_ocultos(self) -> set:
         """Cargar set de meses ocultos."""
@@ -139,96 +1044,159 @@ class LocalStorage:
     # --- CUOTAS PROPAGADAS ---
     def save_cuota_propagada(self, cuota: Dict[str, Any]):
         """Guardar una cuota propagada a un período futuro."""
-        cuotas = self.load_cuotas_propagadas()
+        self.save_cuotas_propagadas_bulk([cuota])
 
-        # Verificar que no exista duplicada
-        key = f"{cuota['original_id']}_{cuota['period']}"
-        if not any(c.get('key') == key for c in cuotas):
-            cuota['key'] = key
-            cuotas.append(cuota)
+    def save_cuotas_propagadas_bulk(self, cuotas: List[Dict[str, Any]]) -> int:
+        """
+        Guardar varias cuotas propagadas con una sola escritura.
+        Descarta las que ya existen (por original_id + período) o vienen repetidas en el lote.
 
-            with open(self.cuotas_file, 'w') as f:
-                json.dump(cuotas, f, indent=2, default=self._serialize_date)
+        Returns:
+            Cantidad de cuotas guardadas
+        """
+        for cuota in cuotas:
+            cuota['key'] = f"{cuota['original_id']}_{cuota['period']}"
+
+        return len(self.cuotas.agregar(cuotas))
 
     def load_cuotas_propagadas(self) -> List[Dict[str, Any]]:
-        """Cargar cuotas propagadas."""
-        if self.cuotas_file.exists():
-            with open(self.cuotas_file, 'r') as f:
-                cuotas = json.load(f)
-                # Deserializar fechas
-                for c in cuotas:
-                    if 'date' in c:
-                        c['date'] = self._deserialize_date(c['date'])
-                return cuotas
-        return []
+        """Cargar cuotas propagadas (los registros vienen del cache: no modificarlos)."""
+        return self.cuotas.cargar_todas()
+
+    def load_cuotas_propagadas_df(self) -> pd.DataFrame:
+        """Cargar cuotas propagadas como DataFrame (en modo parquet, directo desde disco)."""
+        return self.cuotas.cargar_todas_df()
 
     def get_cuotas_por_periodo(self, period: str) -> List[Dict[str, Any]]:
-        """Obtener cuotas de un período específico."""
-        cuotas = self.load_cuotas_propagadas()
-        return [c for c in cuotas if c['period'] == period]
+        """Obtener cuotas de un período específico (lee solo la partición del período)."""
+        return list(self.cuotas.cargar_periodo(period).values())
+
+    def get_cuotas_de_compra(self, original_id: str) -> List[Dict[str, Any]]:
+        """Obtener todas las cuotas propagadas de una misma compra."""
+        cuotas = []
+        for period in self.cuotas.periodos():
+            cuotas.extend(self.cuotas.particion(period).buscar('original_id', original_id))
+        return cuotas
 
     def marcar_cuota_como_real(self, original_id: str, period: str):
         """
         Marcar que una cuota propagada ya fue detectada en un PDF real.
         Esto evita duplicados cuando importamos el PDF del mes.
         """
-        cuotas = self.load_cuotas_propagadas()
-        key = f"{original_id}_{period}"
+        self.cuotas.actualizar(period, f"{original_id}_{period}", {'encontrada_en_pdf': True})
 
-        for cuota in cuotas:
-            if cuota.get('key') == key:
-                cuota['encontrada_en_pdf'] = True
-                break
+    def marcar_cuotas_como_reales_bulk(self, original_ids: Iterable[str], period: str) -> int:
+        """
+        Marcar varias cuotas de un período como encontradas en el PDF real, con una sola escritura.
 
-        with open(self.cuotas_file, 'w') as f:
-            json.dump(cuotas, f, indent=2, default=self._serialize_date)
+        Returns:
+            Cantidad de cuotas marcadas
+        """
+        return self.cuotas.actualizar_muchos(
+            period, {f"{original_id}_{period}": {'encontrada_en_pdf': True} for original_id in original_ids}
+        )
 
-    def update_cuota_propagada(self, original_id: str, period: str, updates: Dict[str, Any]):
+    def update_cuota_propagada(self, original_id: str, period: str, updates: Dict[str, Any]) -> bool:
         """
         Actualizar una cuota propagada (ej: agregar nota).
         Identificamos la cuota por original_id + period.
         """
-        cuotas = self.load_cuotas_propagadas()
-        key = f"{original_id}_{period}"
-        found = False
-
-        for cuota in cuotas:
-            # Chequear por key o por id+period
-            if cuota.get('key') == key or (cuota.get('original_id') == original_id and cuota.get('period') == period):
-                cuota.update(updates)
-                found = True
-                break
-
-        if found:
-            with open(self.cuotas_file, 'w') as f:
-                json.dump(cuotas, f, indent=2, default=self._serialize_date)
-            return True
-        return False
+        return self.cuotas.actualizar(period, f"{original_id}_{period}", updates)
 
     def delete_cuota_propagada(self, original_id: str, period: str) -> bool:
         """
         Eliminar una cuota propagada específica (ej: anular solo esta cuota).
         """
-        cuotas = self.load_cuotas_propagadas()
-        key = f"{original_id}_{period}"
-        initial_len = len(cuotas)
+        return self.cuotas.eliminar(period, f"{original_id}_{period}")
 
-        # Filtrar la cuota que coincida
-        cuotas = [c for c in cuotas if not (c.get('key') == key or (c.get('original_id') == original_id and c.get('period') == period))]
+    def get_compromiso_por_periodo(self) -> List[Dict[str, Any]]:
+        """
+        Compromiso de cuotas pendientes por (período, moneda, banco), precalculado.
 
-        if len(cuotas) < initial_len:
-            with open(self.cuotas_file, 'w') as f:
-                json.dump(cuotas, f, indent=2, default=self._serialize_date)
-            return True
-        return False
+        Returns:
+            Lista de dicts con period, currency, bank, monto y cantidad, ordenada por período
+        """
+        filas = []
+        for clave, valores in sorted(self.cuotas.compromiso().items()):
+            period, currency, bank = clave.split('|', 2)
+            filas.append({'period': period, 'currency': currency, 'bank': bank, **valores})
+        return filas
+
+    # --- COMPRAS EN CUOTAS (modo virtual) ---
+    def save_compras_en_cuotas_bulk(self, compras: List[Dict[str, Any]]) -> int:
+        """
+        Guardar compras en cuotas (origen de las proyecciones virtuales) con una sola escritura.
+        Descarta las que ya existen (por original_id).
+
+        Returns:
+            Cantidad de compras guardadas
+        """
+        return len(self.compras_cuotas.agregar(compras))
+
+    def load_compras_en_cuotas(self) -> List[Dict[str, Any]]:
+        """Cargar compras en cuotas (los registros vienen del cache: no modificarlos)."""
+        return list(self.compras_cuotas.cargar().values())
+
+    def load_compras_en_cuotas_df(self) -> pd.DataFrame:
+        """Cargar compras en cuotas como DataFrame."""
+        return self.compras_cuotas.cargar_df()
+
+    def get_compra_en_cuotas(self, original_id: str) -> Optional[Dict[str, Any]]:
+        """Obtener una compra en cuotas por id, o None si no existe."""
+        return self.compras_cuotas.cargar().get(original_id)
+
+    def get_overrides_cuotas(self, period: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Ajustes puntuales (monto, notas, baja) de cuotas virtuales, por clave original_id_período.
+
+        Args:
+            period: Si se indica, solo los ajustes de ese período
+        """
+        if period is None:
+            return self.cuotas_overrides.cargar()
+        return {o['key']: o for o in self.cuotas_overrides.buscar('period', period)}
+
+    def save_override_cuota(self, original_id: str, period: str, cambios: Dict[str, Any]):
+        """Guardar (o combinar con el existente) el ajuste de una cuota virtual."""
+        self.save_overrides_cuotas_bulk([{'original_id': original_id, 'period': period, **cambios}])
+
+    def save_overrides_cuotas_bulk(self, overrides: List[Dict[str, Any]]):
+        """
+        Guardar varios ajustes de cuotas virtuales (cada uno con original_id, period y los cambios).
+        Los que ya existen se combinan con el ajuste anterior.
+        """
+        registros = {}
+        for override in overrides:
+            key = f"{override['original_id']}_{override['period']}"
+            registros.setdefault(key, {'key': key}).update(override)
+
+        agregados = {o['key'] for o in self.cuotas_overrides.agregar(registros.values())}
+        self.cuotas_overrides.actualizar_muchos({
+            key: {k: v for k, v in registro.items() if k not in ('key', 'original_id', 'period')}
+            for key, registro in registros.items() if key not in agregados
+        })
 
 
 # Singleton
 _storage = None
 
 def get_local_storage() -> LocalStorage:
-    """Obtener instancia de LocalStorage."""
+    """
+    Obtener instancia de LocalStorage.
+
+    El backend se elige con la variable de entorno GASTOS_STORAGE_BACKEND
+    ("json", "parquet" o "sqlite"). Sin variable, se usa SQLite si ya existe
+    data/gastos.db (ver `python -m services.sqlite_storage`) y JSON en caso
+    contrario. "parquet" cae a JSON si pyarrow no está instalado.
+    """
     global _storage
     if _storage is None:
-        _storage = LocalStorage()
+        backend = os.environ.get('GASTOS_STORAGE_BACKEND', '').lower()
+        if backend == 'sqlite' or (not backend and (DATA_DIR / 'gastos.db').exists()):
+            from services.sqlite_storage import SQLiteStorage
+            _storage = SQLiteStorage()
+        elif backend == 'parquet' and pa is not None:
+            _storage = LocalStorage(formato='parquet')
+        else:
+            _storage = LocalStorage()
     return _storage
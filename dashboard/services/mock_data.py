@@ -2,6 +2,7 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 import uuid
+from services.periodo import Periodo
 
 class MockDataGenerator:
     """
@@ -100,6 +101,92 @@ class MockDataGenerator:
             
         return df
 
+    def _random_expense(self):
+        """Random (category, merchant, amount) for manual expenses and installment purchases."""
+        category = random.choice(self.categories)
+        merchant = random.choice(self.merchants[category])
+        return category, merchant, round(random.uniform(2000, 100000), 2)
+
+    def generate_gastos_manuales(self, count: int = 50, months_back: int = 12) -> list:
+        """
+        Generate mock manual expenses in the format stored by LocalStorage.
+
+        Args:
+            count: Number of expenses to generate.
+            months_back: Spread the expenses over this many months up to the current one.
+
+        Returns:
+            List of dicts with the fields saved by the "Carga Manual" page.
+        """
+        current = Periodo.actual()
+        data = []
+        for _ in range(count):
+            period = current - random.randint(0, months_back - 1)
+            category, merchant, amount = self._random_expense()
+            data.append({
+                'id': str(uuid.uuid4()),
+                'period': str(period),
+                'date': period.fecha(random.randint(1, 28)),
+                'description': merchant.upper(),
+                'amount': amount,
+                'currency': 'ARS',
+                'category': category,
+                'pagado': random.random() > 0.5,
+                'tipo': 'manual'
+            })
+        return data
+
+    def generate_cuotas_propagadas(self, count: int = 50, months_back: int = 12) -> list:
+        """
+        Generate mock propagated installments, grouped in purchases like CuotasService does.
+
+        Each purchase gets a random plan (3, 6, 12 or 18 installments) and contributes
+        its remaining installments to the following periods, until `count` is reached.
+
+        Returns:
+            List of dicts in the format of CuotasService.generar_cuotas_futuras.
+        """
+        current = Periodo.actual()
+        data = []
+        while len(data) < count:
+            cuota_total = random.choice([3, 6, 12, 18])
+            cuota_actual = random.randint(1, cuota_total - 1)
+            base = current - random.randint(0, months_back - 1)
+            category, merchant, amount = self._random_expense()
+            original_id = str(uuid.uuid4())
+            bank = random.choice(self.banks)
+            purchase_date = base.fecha(random.randint(1, 28))
+
+            for i in range(1, cuota_total - cuota_actual + 1):
+                if len(data) >= count:
+                    break
+                data.append({
+                    'original_id': original_id,
+                    'period': str(base + i),
+                    'date': purchase_date,
+                    'description': f"{merchant.upper()} C.{cuota_actual + i:02d}/{cuota_total:02d}",
+                    'amount': round(amount / cuota_total, 2),
+                    'currency': 'ARS',
+                    'category': category,
+                    'bank': bank,
+                    'installments': f"{cuota_actual + i}/{cuota_total}",
+                    'cuota_numero': cuota_actual + i,
+                    'cuota_total': cuota_total,
+                    'es_propagada': True,
+                    'encontrada_en_pdf': False
+                })
+        return data
+
+    def generate_sueldos(self, months: int = 24) -> dict:
+        """Generate a salary history ("YYYY-MM" -> amount) with a raise every few months."""
+        start = Periodo.actual() - (months - 1)
+        sueldos = {}
+        amount = random.uniform(800000, 1500000)
+        for offset in range(0, months, 3):
+            sueldos[str(start + offset)] = round(amount, 2)
+            amount *= random.uniform(1.02, 1.10)
+        return sueldos
+
     def get_summary_kpis(self, df: pd.DataFrame):
         """Calculate basic KPIs from dataframe."""
         total_ars = df[df['currency'] == 'ARS']['amount'].sum()
@@ -0,0 +1,111 @@
+"""
+Períodos mensuales como enteros.
+
+Un `Periodo` es la cantidad de meses desde 1970-01 (la misma época que
+`numpy.datetime64[M]`), así que avanzar N meses es sumar N, la diferencia entre
+dos períodos es una resta y la conversión de columnas enteras "YYYY-MM" se hace
+de una vez con numpy, sin parsear fila por fila. Hacia afuera (storage, UI) los
+períodos se siguen guardando como strings "YYYY-MM".
+"""
+import calendar
+from datetime import date, datetime
+from typing import Iterator, Union
+import numpy as np
+import pandas as pd
+
+
+NOMBRES_MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+                 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+
+class Periodo(int):
+    """
+    Mes calendario como meses desde 1970-01.
+
+    Es un int inmutable: se compara, ordena y hashea como entero, y la
+    aritmética devuelve Periodo (`p + 1` es el mes siguiente) salvo la resta de
+    dos períodos, que da la distancia en meses como int.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def desde(cls, valor: Union['Periodo', int, str, date, datetime]) -> 'Periodo':
+        """Construir desde "YYYY-MM" (o "YYYY-MM-DD"), una fecha o un entero."""
+        if isinstance(valor, cls):
+            return valor
+        if isinstance(valor, (date, datetime)):
+            return cls.de_anio_mes(valor.year, valor.month)
+        if isinstance(valor, str):
+            return cls.de_anio_mes(int(valor[:4]), int(valor[5:7]))
+        return cls(valor)
+
+    @classmethod
+    def de_anio_mes(cls, anio: int, mes: int) -> 'Periodo':
+        return cls((anio - 1970) * 12 + mes - 1)
+
+    @classmethod
+    def actual(cls) -> 'Periodo':
+        return cls.desde(date.today())
+
+    @property
+    def anio(self) -> int:
+        return int(self) // 12 + 1970
+
+    @property
+    def mes(self) -> int:
+        return int(self) % 12 + 1
+
+    def fecha(self, dia: int = 1) -> date:
+        """Fecha del período; si el día no existe en el mes, el último día del mes."""
+        anio, mes = self.anio, self.mes
+        return date(anio, mes, min(dia, calendar.monthrange(anio, mes)[1]))
+
+    def nombre(self) -> str:
+        """Nombre para mostrar: "Diciembre 2024"."""
+        return f"{NOMBRES_MESES[self.mes - 1]} {self.anio}"
+
+    def __add__(self, meses: int) -> 'Periodo':
+        if not isinstance(meses, (int, np.integer)):
+            return NotImplemented  # arrays: numpy opera elemento a elemento
+        return Periodo(int(self) + int(meses))
+
+    __radd__ = __add__
+
+    def __sub__(self, otro: int):
+        if isinstance(otro, Periodo):
+            return int(self) - int(otro)
+        if not isinstance(otro, (int, np.integer)):
+            return NotImplemented
+        return Periodo(int(self) - int(otro))
+
+    def __str__(self) -> str:
+        return f"{self.anio}-{self.mes:02d}"
+
+    def __repr__(self) -> str:
+        return f"Periodo('{self}')"
+
+    def __format__(self, spec: str) -> str:
+        return format(str(self), spec)
+
+
+def rango(inicio: Union[Periodo, str], fin: Union[Periodo, str]) -> Iterator[Periodo]:
+    """Períodos de `inicio` a `fin`, ambos incluidos."""
+    inicio, fin = Periodo.desde(inicio), Periodo.desde(fin)
+    return (Periodo(p) for p in range(inicio, fin + 1))
+
+
+def a_meses(periodos: pd.Series) -> np.ndarray:
+    """
+    Columna de períodos "YYYY-MM" (o fechas) -> array int64 de meses desde 1970-01.
+
+    Los vacíos quedan como NaT de numpy (el mínimo de int64).
+    """
+    valores = periodos.astype('string').str[:7].fillna('NaT').to_numpy(dtype='U7')
+    return valores.astype('datetime64[M]').astype('int64')
+
+
+def a_periodos(meses: Union[np.ndarray, pd.Series], index=None) -> pd.Series:
+    """Array de meses desde 1970-01 -> Series de strings "YYYY-MM"."""
+    meses = np.asarray(meses, dtype='int64')
+    return pd.Series(meses.astype('datetime64[M]').astype(str), index=index, dtype=object)
@@ -0,0 +1,272 @@
+"""
+Réplica local (SQLite) de la tabla `transactions` de Supabase, para trabajar offline.
+
+Las lecturas del dashboard salen de acá, con latencia local. Las escrituras se
+aplican primero en la réplica y, en la misma transacción, se anotan en una cola
+de salida durable (`cola_salida`, en la misma base). DataService vacía esa cola
+hacia Supabase en lotes desde un thread en segundo plano y trae los cambios
+remotos, así que el dashboard sigue andando rápido con la red lenta o caída.
+
+Se activa con GASTOS_REPLICA_LOCAL=1.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime, date
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+import pandas as pd
+
+from services.local_storage import DATA_DIR
+
+
+# Columnas con las que se detectan duplicados al insertar (mismo criterio que Supabase)
+COLUMNAS_DUPLICADO = ['bank', 'date', 'description', 'amount']
+
+SCHEMA_COLA = """
+CREATE TABLE IF NOT EXISTS cola_salida (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,                 -- 'insert' | 'update' | 'delete'
+    payload TEXT NOT NULL,            -- JSON: filas, o {valores, ids}, o ids
+    creado TEXT NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    ultimo_error TEXT
+);
+
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+class ReplicaTransacciones:
+    """
+    Copia local de `transactions` más la cola de escrituras pendientes.
+
+    Args:
+        columnas: Columnas a replicar (además de id)
+        db_file: Archivo SQLite (por defecto data/replica_transacciones.db)
+        data_dir: Carpeta de datos
+    """
+
+    def __init__(self, columnas: Iterable[str], db_file: Optional[Path] = None, data_dir: Optional[Path] = None):
+        self.data_dir = Path(data_dir) if data_dir else DATA_DIR
+        self.data_dir.mkdir(exist_ok=True)
+        self.db_file = db_file or (self.data_dir / 'replica_transacciones.db')
+        self.columnas = list(dict.fromkeys(['id'] + list(columnas)))
+
+        # Lo usan los threads de Streamlit y el de sincronización: conexión compartida + lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA_COLA)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS transacciones ("id" TEXT PRIMARY KEY)')
+            existentes = {fila[1] for fila in self._conn.execute("PRAGMA table_info(transacciones)")}
+            for col in self.columnas:
+                if col not in existentes:
+                    self._conn.execute(f'ALTER TABLE transacciones ADD COLUMN "{col}"')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_transacciones_date ON transacciones("date")')
+            if set(COLUMNAS_DUPLICADO) <= set(self.columnas):
+                # No es UNIQUE: las filas que vienen de Supabase se aceptan tal cual
+                self._conn.execute(
+                    'CREATE INDEX IF NOT EXISTS idx_transacciones_duplicado ON transacciones('
+                    + ', '.join(f'"{c}"' for c in COLUMNAS_DUPLICADO) + ')'
+                )
+
+    def cerrar(self):
+        """Cerrar la conexión a la base."""
+        with self._lock:
+            self._conn.close()
+
+    # --- Serialización ---
+    @staticmethod
+    def _valor(valor):
+        """Valor apto para SQLite/JSON: fechas en ISO, NaN/NA -> None, escalares numpy -> Python."""
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        if isinstance(valor, (str, list, tuple, dict)):
+            return valor
+        if pd.isna(valor):
+            return None
+        if hasattr(valor, 'item'):
+            return valor.item()
+        return valor
+
+    def _dumps(self, payload: Any) -> str:
+        return json.dumps(payload, default=self._valor)
+
+    def _fila(self, registro: Dict[str, Any]) -> tuple:
+        return tuple(self._valor(registro.get(col)) for col in self.columnas)
+
+    def _upsert(self, registros: List[Dict[str, Any]]):
+        """INSERT ... ON CONFLICT(id) DO UPDATE (llamar con el lock y la transacción abiertos)."""
+        columnas = ', '.join(f'"{c}"' for c in self.columnas)
+        marcas = ', '.join('?' for _ in self.columnas)
+        asignaciones = ', '.join(f'"{c}" = excluded."{c}"' for c in self.columnas if c != 'id')
+        self._conn.executemany(
+            f'INSERT INTO transacciones ({columnas}) VALUES ({marcas}) '
+            f'ON CONFLICT("id") DO UPDATE SET {asignaciones}',
+            [self._fila(r) for r in registros]
+        )
+
+    # --- Lecturas ---
+    def leer(self) -> pd.DataFrame:
+        """Todas las transacciones replicadas, con fechas como date y montos como float."""
+        with self._lock:
+            df = pd.read_sql_query(
+                'SELECT ' + ', '.join(f'"{c}"' for c in self.columnas) + ' FROM transacciones', self._conn
+            )
+        if df.empty:
+            return df
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date']).dt.date
+        for col in ('amount', 'adjusted_amount'):
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        return df
+
+    def ids(self) -> set:
+        with self._lock:
+            return {fila[0] for fila in self._conn.execute("SELECT id FROM transacciones")}
+
+    def vacia(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM transacciones LIMIT 1").fetchone() is None
+
+    # --- Cambios que vienen de Supabase ---
+    def aplicar_remotos(self, df: pd.DataFrame, eliminados: Iterable[str] = ()):
+        """
+        Guardar filas traídas de Supabase (merge por id) y borrar las eliminadas allá.
+
+        Después se vuelven a aplicar las escrituras locales que siguen en la cola,
+        para que una fila remota vieja no pise un cambio que todavía no se subió.
+        """
+        registros = df.to_dict('records') if not df.empty else []
+        eliminados = list(eliminados)
+        with self._lock, self._conn:
+            if registros:
+                self._upsert(registros)
+            if eliminados:
+                self._conn.executemany("DELETE FROM transacciones WHERE id = ?", [(i,) for i in eliminados])
+            for _, op, payload in self._pendientes():
+                self._aplicar_local(op, payload)
+
+    # --- Escrituras locales (se encolan para Supabase) ---
+    def _encolar(self, op: str, payload: Any):
+        self._conn.execute(
+            "INSERT INTO cola_salida (op, payload, creado) VALUES (?, ?, ?)",
+            (op, self._dumps(payload), datetime.now().isoformat())
+        )
+
+    def _aplicar_local(self, op: str, payload: Any) -> int:
+        """Aplicar una operación de la cola sobre la réplica (con el lock y la transacción abiertos)."""
+        if op == 'insert':
+            columnas = ', '.join(f'"{c}"' for c in self.columnas)
+            marcas = ', '.join('?' for _ in self.columnas)
+            return self._conn.executemany(
+                f'INSERT OR IGNORE INTO transacciones ({columnas}) VALUES ({marcas})',
+                [self._fila(r) for r in payload]
+            ).rowcount
+        ids = payload['ids'] if op == 'update' else payload
+        marcas = ', '.join('?' for _ in ids)
+        if op == 'update':
+            valores = {k: v for k, v in payload['valores'].items() if k in self.columnas and k != 'id'}
+            if not valores:
+                return 0
+            asignaciones = ', '.join(f'"{c}" = ?' for c in valores)
+            return self._conn.execute(
+                f'UPDATE transacciones SET {asignaciones} WHERE id IN ({marcas})',
+                [self._valor(v) for v in valores.values()] + list(ids)
+            ).rowcount
+        return self._conn.execute(f'DELETE FROM transacciones WHERE id IN ({marcas})', list(ids)).rowcount
+
+    def insertar(self, registros: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Insertar transacciones nuevas, salteando duplicados (COLUMNAS_DUPLICADO o id repetido).
+
+        Returns:
+            Para cada registro, True si se insertó (y quedó en la cola) o False si era duplicado
+        """
+        claves = [c for c in COLUMNAS_DUPLICADO if c in self.columnas]
+        existe_sql = 'SELECT 1 FROM transacciones WHERE ' + ' AND '.join(f'"{c}" IS ?' for c in claves) + ' LIMIT 1'
+        insert_sql = (
+            'INSERT OR IGNORE INTO transacciones (' + ', '.join(f'"{c}"' for c in self.columnas) + ') '
+            'VALUES (' + ', '.join('?' for _ in self.columnas) + ')'
+        )
+        insertados, resultado = [], []
+        with self._lock, self._conn:
+            for registro in registros:
+                duplicado = bool(claves) and self._conn.execute(
+                    existe_sql, [self._valor(registro.get(c)) for c in claves]
+                ).fetchone() is not None
+                if not duplicado:
+                    duplicado = self._conn.execute(insert_sql, self._fila(registro)).rowcount == 0
+                resultado.append(not duplicado)
+                if not duplicado:
+                    # En la cola va la fila completa, con las columnas que no se replican
+                    insertados.append({k: self._valor(v) for k, v in registro.items()})
+            if insertados:
+                self._encolar('insert', insertados)
+        return resultado
+
+    def actualizar(self, valores: Dict[str, Any], ids: List[str]) -> int:
+        """Aplicar los mismos `valores` a varias transacciones y encolar el cambio."""
+        with self._lock, self._conn:
+            payload = {'valores': valores, 'ids': list(ids)}
+            n = self._aplicar_local('update', payload)
+            self._encolar('update', payload)
+        return n
+
+    def eliminar(self, ids: List[str]) -> int:
+        """Borrar transacciones de la réplica y encolar el borrado."""
+        with self._lock, self._conn:
+            n = self._aplicar_local('delete', list(ids))
+            self._encolar('delete', list(ids))
+        return n
+
+    # --- Cola de salida ---
+    def _pendientes(self, limite: Optional[int] = None) -> List[Tuple[int, str, Any]]:
+        consulta = "SELECT seq, op, payload FROM cola_salida ORDER BY seq"
+        if limite is not None:
+            consulta += f" LIMIT {int(limite)}"
+        return [(seq, op, json.loads(payload)) for seq, op, payload in self._conn.execute(consulta)]
+
+    def pendientes(self, limite: Optional[int] = None) -> List[Tuple[int, str, Any]]:
+        """Operaciones encoladas, en orden: (seq, op, payload)."""
+        with self._lock:
+            return self._pendientes(limite)
+
+    def cantidad_pendientes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cola_salida").fetchone()[0]
+
+    def confirmar(self, seqs: Iterable[int]):
+        """Sacar de la cola las operaciones ya subidas a Supabase."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM cola_salida WHERE seq = ?", [(s,) for s in seqs])
+
+    def registrar_error(self, seq: int, error: str):
+        """Anotar un intento fallido (la operación queda en la cola para reintentar)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE cola_salida SET intentos = intentos + 1, ultimo_error = ? WHERE seq = ?", (error, seq)
+            )
+
+    def ultimo_error(self) -> Optional[str]:
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT ultimo_error FROM cola_salida WHERE ultimo_error IS NOT NULL ORDER BY seq LIMIT 1"
+            ).fetchone()
+        return fila[0] if fila else None
+
+    # --- Estado de sincronización (watermarks) ---
+    def get_estado(self, clave: str) -> Optional[str]:
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM estado WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def set_estado(self, clave: str, valor: Optional[str]):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO estado (clave, valor) VALUES (?, ?)", (clave, valor))
@@ -0,0 +1,580 @@
+"""
+Backend SQLite para la persistencia local del dashboard.
+
+Misma interfaz que LocalStorage, pero con tablas indexadas por período,
+original_id y key: las consultas por período no deserializan todo el historial.
+
+Migración única desde los JSON existentes:
+    cd dashboard && python -m services.sqlite_storage
+"""
+import bisect
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime, date
+from typing import Dict, List, Any, Iterable, Optional
+import pandas as pd
+
+from services.local_storage import DATA_DIR, LocalStorage
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sueldos (
+    period TEXT PRIMARY KEY,
+    amount REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS gastos_manuales (
+    id TEXT PRIMARY KEY,
+    period TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_gastos_manuales_period ON gastos_manuales(period);
+
+CREATE TABLE IF NOT EXISTS cuotas_propagadas (
+    key TEXT PRIMARY KEY,
+    original_id TEXT,
+    period TEXT NOT NULL,
+    currency TEXT,
+    bank TEXT,
+    amount REAL,
+    adjusted_amount REAL,
+    encontrada_en_pdf INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cuotas_period ON cuotas_propagadas(period);
+CREATE INDEX IF NOT EXISTS idx_cuotas_original_id ON cuotas_propagadas(original_id);
+
+-- Compromiso de cuotas pendientes por período/moneda/banco, mantenido por triggers
+CREATE TABLE IF NOT EXISTS compromiso_cuotas (
+    period TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    bank TEXT NOT NULL,
+    monto REAL NOT NULL,
+    cantidad INTEGER NOT NULL,
+    PRIMARY KEY (period, currency, bank)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_compromiso_insert AFTER INSERT ON cuotas_propagadas
+WHEN NEW.encontrada_en_pdf = 0
+BEGIN
+    INSERT INTO compromiso_cuotas (period, currency, bank, monto, cantidad)
+    VALUES (NEW.period, COALESCE(NEW.currency, 'ARS'), COALESCE(NEW.bank, ''),
+            COALESCE(NEW.adjusted_amount, NEW.amount, 0), 1)
+    ON CONFLICT (period, currency, bank) DO UPDATE
+        SET monto = monto + excluded.monto, cantidad = cantidad + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_compromiso_delete AFTER DELETE ON cuotas_propagadas
+WHEN OLD.encontrada_en_pdf = 0
+BEGIN
+    UPDATE compromiso_cuotas
+        SET monto = monto - COALESCE(OLD.adjusted_amount, OLD.amount, 0), cantidad = cantidad - 1
+        WHERE period = OLD.period AND currency = COALESCE(OLD.currency, 'ARS') AND bank = COALESCE(OLD.bank, '');
+    DELETE FROM compromiso_cuotas WHERE period = OLD.period AND cantidad <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_compromiso_update AFTER UPDATE ON cuotas_propagadas
+BEGIN
+    UPDATE compromiso_cuotas
+        SET monto = monto - COALESCE(OLD.adjusted_amount, OLD.amount, 0), cantidad = cantidad - 1
+        WHERE OLD.encontrada_en_pdf = 0
+          AND period = OLD.period AND currency = COALESCE(OLD.currency, 'ARS') AND bank = COALESCE(OLD.bank, '');
+    DELETE FROM compromiso_cuotas WHERE period = OLD.period AND cantidad <= 0;
+    INSERT INTO compromiso_cuotas (period, currency, bank, monto, cantidad)
+    SELECT NEW.period, COALESCE(NEW.currency, 'ARS'), COALESCE(NEW.bank, ''),
+           COALESCE(NEW.adjusted_amount, NEW.amount, 0), 1
+    WHERE NEW.encontrada_en_pdf = 0
+    ON CONFLICT (period, currency, bank) DO UPDATE
+        SET monto = monto + excluded.monto, cantidad = cantidad + 1;
+END;
+
+CREATE TABLE IF NOT EXISTS compras_cuotas (
+    original_id TEXT PRIMARY KEY,
+    period TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cuotas_overrides (
+    key TEXT PRIMARY KEY,
+    original_id TEXT,
+    period TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cuotas_overrides_period ON cuotas_overrides(period);
+
+CREATE TABLE IF NOT EXISTS config (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+
+
+class SQLiteStorage:
+    """Maneja la persistencia local de datos sobre SQLite."""
+
+    def __init__(self, db_file: Optional[Path] = None, data_dir: Optional[Path] = None):
+        self.data_dir = Path(data_dir) if data_dir else DATA_DIR
+        self.data_dir.mkdir(exist_ok=True)
+        self.db_file = db_file or (self.data_dir / 'gastos.db')
+
+        # Streamlit ejecuta cada sesión en su propio thread: una conexión compartida + lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # INSERT OR REPLACE también dispara el trigger de DELETE (compromiso_cuotas)
+        self._conn.execute("PRAGMA recursive_triggers = ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        # Base creada antes de compromiso_cuotas: calcularlo una vez
+        with self._lock, self._conn:
+            vacio = self._conn.execute("SELECT 1 FROM compromiso_cuotas LIMIT 1").fetchone() is None
+            if vacio and self._conn.execute("SELECT 1 FROM cuotas_propagadas LIMIT 1").fetchone():
+                self._recalcular_compromiso()
+
+    def _serialize_date(self, obj):
+        """Serializar fechas para JSON."""
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        raise TypeError(f"Type {type(obj)} not serializable")
+
+    def _dumps(self, registro: Dict[str, Any]) -> str:
+        return json.dumps(registro, default=self._serialize_date)
+
+    def _loads(self, data: str) -> Dict[str, Any]:
+        registro = json.loads(data)
+        if isinstance(registro.get('date'), str):
+            try:
+                registro['date'] = datetime.fromisoformat(registro['date']).date()
+            except ValueError:
+                pass
+        return registro
+
+    @staticmethod
+    def _monto_o_none(valor) -> Optional[float]:
+        try:
+            return float(valor) if valor not in (None, '') else None
+        except (TypeError, ValueError):
+            return None
+
+    def _fila_cuota(self, cuota: Dict[str, Any]) -> tuple:
+        """Columnas indexadas + JSON completo de una cuota propagada."""
+        return (
+            cuota['key'],
+            cuota.get('original_id'),
+            cuota['period'],
+            cuota.get('currency'),
+            cuota.get('bank'),
+            self._monto_o_none(cuota.get('amount')),
+            self._monto_o_none(cuota.get('adjusted_amount')),
+            int(bool(cuota.get('encontrada_en_pdf', False))),
+            self._dumps(cuota)
+        )
+
+    def _recalcular_compromiso(self):
+        """Reconstruir compromiso_cuotas desde cuotas_propagadas (llamar con el lock y la transacción abiertos)."""
+        self._conn.execute("DELETE FROM compromiso_cuotas")
+        self._conn.execute("""
+            INSERT INTO compromiso_cuotas (period, currency, bank, monto, cantidad)
+            SELECT period, COALESCE(currency, 'ARS'), COALESCE(bank, ''),
+                   SUM(COALESCE(adjusted_amount, amount, 0)), COUNT(*)
+            FROM cuotas_propagadas
+            WHERE encontrada_en_pdf = 0
+            GROUP BY period, COALESCE(currency, 'ARS'), COALESCE(bank, '')
+        """)
+
+    def cerrar(self):
+        """Cerrar la conexión a la base."""
+        with self._lock:
+            self._conn.close()
+
+    # --- SUELDOS ---
+    def save_sueldo(self, period: str, amount: float):
+        """Guardar sueldo de un período."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sueldos (period, amount) VALUES (?, ?)",
+                (period, amount)
+            )
+
+    def load_sueldos(self) -> Dict[str, float]:
+        """Cargar todos los sueldos guardados."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT period, amount FROM sueldos"))
+
+    def get_sueldo_vigente(self, period: str) -> float:
+        """
+        Obtener el sueldo vigente para un período.
+        Si no hay sueldo específico para ese período, busca el último sueldo anterior.
+        """
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT amount FROM sueldos WHERE period <= ? ORDER BY period DESC LIMIT 1",
+                (period,)
+            ).fetchone()
+        return fila[0] if fila else 0.0
+
+    def get_sueldos_vigentes(self, periods: List[str]) -> Dict[str, float]:
+        """Obtener el sueldo vigente de varios períodos con una sola consulta."""
+        with self._lock:
+            filas = self._conn.execute("SELECT period, amount FROM sueldos ORDER BY period").fetchall()
+        periodos = [p for p, _ in filas]
+        montos = [m for _, m in filas]
+
+        resultado = {}
+        for period in periods:
+            i = bisect.bisect_right(periodos, period)
+            resultado[period] = montos[i - 1] if i > 0 else 0.0
+        return resultado
+
+    # --- GASTOS MANUALES ---
+    def save_gasto_manual(self, gasto: Dict[str, Any]):
+        """Agregar un gasto manual."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gastos_manuales (id, period, data) VALUES (?, ?, ?)",
+                (gasto['id'], gasto.get('period'), self._dumps(gasto))
+            )
+
+    def save_gastos_manuales_bulk(self, gastos: List[Dict[str, Any]]) -> int:
+        """
+        Agregar varios gastos manuales en una sola transacción.
+        Descarta los que ya existen (por id).
+
+        Returns:
+            Cantidad de gastos guardados
+        """
+        with self._lock, self._conn:
+            antes = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO gastos_manuales (id, period, data) VALUES (?, ?, ?)",
+                [(g['id'], g.get('period'), self._dumps(g)) for g in gastos]
+            )
+            return self._conn.total_changes - antes
+
+    def load_gastos_manuales(self) -> List[Dict[str, Any]]:
+        """Cargar todos los gastos manuales."""
+        with self._lock:
+            filas = self._conn.execute("SELECT data FROM gastos_manuales ORDER BY rowid").fetchall()
+        return [self._loads(data) for (data,) in filas]
+
+    def load_gastos_manuales_df(self) -> pd.DataFrame:
+        """Cargar todos los gastos manuales como DataFrame."""
+        return pd.DataFrame(self.load_gastos_manuales())
+
+    def get_gastos_manuales_por_periodo(self, period: str) -> List[Dict[str, Any]]:
+        """Obtener gastos manuales de un período específico."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT data FROM gastos_manuales WHERE period = ? ORDER BY rowid", (period,)
+            ).fetchall()
+        return [self._loads(data) for (data,) in filas]
+
+    def update_gasto_manual(self, gasto_id: str, updates: Dict[str, Any]):
+        """Actualizar un gasto manual (ej: marcar como pagado)."""
+        with self._lock, self._conn:
+            fila = self._conn.execute(
+                "SELECT data FROM gastos_manuales WHERE id = ?", (gasto_id,)
+            ).fetchone()
+            if fila:
+                gasto = self._loads(fila[0])
+                gasto.update(updates)
+                self._conn.execute(
+                    "UPDATE gastos_manuales SET period = ?, data = ? WHERE id = ?",
+                    (gasto.get('period'), self._dumps(gasto), gasto_id)
+                )
+
+    def delete_gasto_manual(self, gasto_id: str):
+        """Eliminar un gasto manual."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM gastos_manuales WHERE id = ?", (gasto_id,))
+
+    # --- MESES OCULTOS ---
+    def save_meses_ocultos(self, meses: set):
+        """Guardar set de meses ocultos."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO config (clave, valor) VALUES ('meses_ocultos', ?)",
+                (json.dumps(list(meses)),)
+            )
+
+    def load_meses_ocultos(self) -> set:
+        """Cargar set de meses ocultos."""
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT valor FROM config WHERE clave = 'meses_ocultos'"
+            ).fetchone()
+        return set(json.loads(fila[0])) if fila else set()
+
+    # --- CUOTAS PROPAGADAS ---
+    def save_cuota_propagada(self, cuota: Dict[str, Any]):
+        """Guardar una cuota propagada a un período futuro."""
+        self.save_cuotas_propagadas_bulk([cuota])
+
+    def save_cuotas_propagadas_bulk(self, cuotas: List[Dict[str, Any]]) -> int:
+        """
+        Guardar varias cuotas propagadas en una sola transacción.
+        Descarta las que ya existen (por original_id + período).
+
+        Returns:
+            Cantidad de cuotas guardadas
+        """
+        for cuota in cuotas:
+            cuota['key'] = f"{cuota['original_id']}_{cuota['period']}"
+
+        with self._lock, self._conn:
+            # La PK sobre key descarta duplicados. rowcount (no total_changes): no
+            # cuenta lo que escriben los triggers de compromiso_cuotas
+            return self._conn.executemany(
+                "INSERT OR IGNORE INTO cuotas_propagadas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._fila_cuota(c) for c in cuotas]
+            ).rowcount
+
+    def load_cuotas_propagadas(self) -> List[Dict[str, Any]]:
+        """Cargar cuotas propagadas."""
+        with self._lock:
+            filas = self._conn.execute("SELECT data FROM cuotas_propagadas ORDER BY rowid").fetchall()
+        return [self._loads(data) for (data,) in filas]
+
+    def load_cuotas_propagadas_df(self) -> pd.DataFrame:
+        """Cargar cuotas propagadas como DataFrame."""
+        return pd.DataFrame(self.load_cuotas_propagadas())
+
+    def get_cuotas_por_periodo(self, period: str) -> List[Dict[str, Any]]:
+        """Obtener cuotas de un período específico."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT data FROM cuotas_propagadas WHERE period = ? ORDER BY rowid", (period,)
+            ).fetchall()
+        return [self._loads(data) for (data,) in filas]
+
+    def get_cuotas_de_compra(self, original_id: str) -> List[Dict[str, Any]]:
+        """Obtener todas las cuotas propagadas de una misma compra."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT data FROM cuotas_propagadas WHERE original_id = ? ORDER BY period", (original_id,)
+            ).fetchall()
+        return [self._loads(data) for (data,) in filas]
+
+    def marcar_cuota_como_real(self, original_id: str, period: str):
+        """
+        Marcar que una cuota propagada ya fue detectada en un PDF real.
+        Esto evita duplicados cuando importamos el PDF del mes.
+        """
+        self.update_cuota_propagada(original_id, period, {'encontrada_en_pdf': True})
+
+    def marcar_cuotas_como_reales_bulk(self, original_ids: Iterable[str], period: str) -> int:
+        """
+        Marcar varias cuotas de un período como encontradas en el PDF real, en una sola transacción.
+
+        Returns:
+            Cantidad de cuotas marcadas
+        """
+        with self._lock, self._conn:
+            # rowcount: solo las cuotas, sin las filas de compromiso_cuotas que ajusta el trigger
+            return self._conn.executemany(
+                """
+                UPDATE cuotas_propagadas
+                SET encontrada_en_pdf = 1, data = json_set(data, '$.encontrada_en_pdf', json('true'))
+                WHERE key = ?
+                """,
+                [(f"{original_id}_{period}",) for original_id in original_ids]
+            ).rowcount
+
+    def update_cuota_propagada(self, original_id: str, period: str, updates: Dict[str, Any]) -> bool:
+        """
+        Actualizar una cuota propagada (ej: agregar nota).
+        Identificamos la cuota por original_id + period.
+        """
+        key = f"{original_id}_{period}"
+        with self._lock, self._conn:
+            fila = self._conn.execute(
+                "SELECT data FROM cuotas_propagadas WHERE key = ?", (key,)
+            ).fetchone()
+            if not fila:
+                return False
+
+            cuota = self._loads(fila[0])
+            cuota.update(updates)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cuotas_propagadas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._fila_cuota(cuota)
+            )
+            return True
+
+    def delete_cuota_propagada(self, original_id: str, period: str) -> bool:
+        """
+        Eliminar una cuota propagada específica (ej: anular solo esta cuota).
+        """
+        key = f"{original_id}_{period}"
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM cuotas_propagadas WHERE key = ?", (key,))
+            return cursor.rowcount > 0
+
+    def get_compromiso_por_periodo(self) -> List[Dict[str, Any]]:
+        """
+        Compromiso de cuotas pendientes por (período, moneda, banco), precalculado.
+
+        Returns:
+            Lista de dicts con period, currency, bank, monto y cantidad, ordenada por período
+        """
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT period, currency, bank, monto, cantidad FROM compromiso_cuotas ORDER BY period, currency, bank"
+            ).fetchall()
+        return [
+            {'period': p, 'currency': c, 'bank': b, 'monto': round(m, 2), 'cantidad': n}
+            for p, c, b, m, n in filas
+        ]
+
+    # --- COMPRAS EN CUOTAS (modo virtual) ---
+    def save_compras_en_cuotas_bulk(self, compras: List[Dict[str, Any]]) -> int:
+        """
+        Guardar compras en cuotas (origen de las proyecciones virtuales) en una sola transacción.
+        Descarta las que ya existen (por original_id).
+
+        Returns:
+            Cantidad de compras guardadas
+        """
+        with self._lock, self._conn:
+            antes = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO compras_cuotas (original_id, period, data) VALUES (?, ?, ?)",
+                [(c['original_id'], c['period'], self._dumps(c)) for c in compras]
+            )
+            return self._conn.total_changes - antes
+
+    def load_compras_en_cuotas(self) -> List[Dict[str, Any]]:
+        """Cargar compras en cuotas."""
+        with self._lock:
+            filas = self._conn.execute("SELECT data FROM compras_cuotas ORDER BY rowid").fetchall()
+        return [self._loads(data) for (data,) in filas]
+
+    def load_compras_en_cuotas_df(self) -> pd.DataFrame:
+        """Cargar compras en cuotas como DataFrame."""
+        return pd.DataFrame(self.load_compras_en_cuotas())
+
+    def get_compra_en_cuotas(self, original_id: str) -> Optional[Dict[str, Any]]:
+        """Obtener una compra en cuotas por id, o None si no existe."""
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT data FROM compras_cuotas WHERE original_id = ?", (original_id,)
+            ).fetchone()
+        return self._loads(fila[0]) if fila else None
+
+    def get_overrides_cuotas(self, period: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Ajustes puntuales (monto, notas, baja) de cuotas virtuales, por clave original_id_período.
+
+        Args:
+            period: Si se indica, solo los ajustes de ese período
+        """
+        with self._lock:
+            if period is None:
+                filas = self._conn.execute("SELECT key, data FROM cuotas_overrides").fetchall()
+            else:
+                filas = self._conn.execute(
+                    "SELECT key, data FROM cuotas_overrides WHERE period = ?", (period,)
+                ).fetchall()
+        return {key: self._loads(data) for key, data in filas}
+
+    def save_override_cuota(self, original_id: str, period: str, cambios: Dict[str, Any]):
+        """Guardar (o combinar con el existente) el ajuste de una cuota virtual."""
+        self.save_overrides_cuotas_bulk([{'original_id': original_id, 'period': period, **cambios}])
+
+    def save_overrides_cuotas_bulk(self, overrides: List[Dict[str, Any]]):
+        """
+        Guardar varios ajustes de cuotas virtuales (cada uno con original_id, period y los cambios).
+        Los que ya existen se combinan con el ajuste anterior.
+        """
+        registros = {}
+        for override in overrides:
+            key = f"{override['original_id']}_{override['period']}"
+            registros.setdefault(key, {'key': key}).update(override)
+        if not registros:
+            return
+
+        with self._lock, self._conn:
+            claves = list(registros)
+            existentes = {}
+            # Lotes por debajo del límite de parámetros de SQLite
+            for i in range(0, len(claves), 500):
+                lote = claves[i:i + 500]
+                existentes.update(self._conn.execute(
+                    f"SELECT key, data FROM cuotas_overrides WHERE key IN ({','.join('?' * len(lote))})", lote
+                ).fetchall())
+
+            filas = []
+            for key, registro in registros.items():
+                override = {**self._loads(existentes[key]), **registro} if key in existentes else registro
+                filas.append((key, override['original_id'], override['period'], self._dumps(override)))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cuotas_overrides (key, original_id, period, data) VALUES (?, ?, ?, ?)",
+                filas
+            )
+
+
+def migrar_desde_json(db_file: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Migrar los datos de dashboard/data/*.json (snapshot + journal) a SQLite.
+
+    Es idempotente: volver a correrla reemplaza los registros por clave.
+
+    Returns:
+        Cantidad de registros migrados por tabla
+    """
+    origen = LocalStorage()
+    destino = SQLiteStorage(db_file)
+
+    sueldos = origen.load_sueldos()
+    gastos = origen.load_gastos_manuales()
+    cuotas = origen.load_cuotas_propagadas()
+    compras = origen.load_compras_en_cuotas()
+    overrides = list(origen.get_overrides_cuotas().values())
+    meses_ocultos = origen.load_meses_ocultos()
+
+    with destino._lock, destino._conn:
+        destino._conn.executemany(
+            "INSERT OR REPLACE INTO sueldos (period, amount) VALUES (?, ?)",
+            list(sueldos.items())
+        )
+        destino._conn.executemany(
+            "INSERT OR REPLACE INTO gastos_manuales (id, period, data) VALUES (?, ?, ?)",
+            [(g['id'], g.get('period'), destino._dumps(g)) for g in gastos if g.get('id')]
+        )
+        for c in cuotas:
+            c['key'] = LocalStorage._clave_cuota(c)
+        destino._conn.executemany(
+            "INSERT OR REPLACE INTO cuotas_propagadas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [destino._fila_cuota(c) for c in cuotas]
+        )
+        destino._conn.executemany(
+            "INSERT OR REPLACE INTO compras_cuotas (original_id, period, data) VALUES (?, ?, ?)",
+            [(c['original_id'], c['period'], destino._dumps(c)) for c in compras]
+        )
+        destino._conn.executemany(
+            "INSERT OR REPLACE INTO cuotas_overrides (key, original_id, period, data) VALUES (?, ?, ?, ?)",
+            [(o['key'], o.get('original_id'), o['period'], destino._dumps(o)) for o in overrides]
+        )
+        destino._conn.execute(
+            "INSERT OR REPLACE INTO config (clave, valor) VALUES ('meses_ocultos', ?)",
+            (json.dumps(list(meses_ocultos)),)
+        )
+
+    return {
+        'sueldos': len(sueldos),
+        'gastos_manuales': len(gastos),
+        'cuotas_propagadas': len(cuotas),
+        'compras_cuotas': len(compras),
+        'cuotas_overrides': len(overrides),
+        'meses_ocultos': len(meses_ocultos)
+    }
+
+
+if __name__ == "__main__":
+    resultado = migrar_desde_json()
+    print("✅ Migración a SQLite completada:")
+    for tabla, cantidad in resultado.items():
+        print(f"   {tabla}: {cantidad}")
@@ -0,0 +1,18 @@
+"""
+Fixtures compartidas de los tests del dashboard.
+"""
+import pytest
+
+
+@pytest.fixture
+def cuota():
+    """Fábrica de cuotas propagadas: cuota(original_id, period, **campos)."""
+    def _cuota(original_id, period, **campos):
+        return {
+            'original_id': original_id, 'period': period, 'date': '2025-01-05', 'description': 'ZARA',
+            'amount': 1000.0, 'currency': 'ARS', 'category': 'Ropa', 'bank': 'Galicia',
+            'installments': '2/3', 'cuota_numero': 2, 'cuota_total': 3,
+            'es_propagada': True, 'encontrada_en_pdf': False,
+            **campos,
+        }
+    return _cuota
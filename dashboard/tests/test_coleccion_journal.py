@@ -0,0 +1,107 @@
+"""
+Tests de ColeccionJournal: snapshot + journal, compactación y escritores concurrentes.
+"""
+import json
+import multiprocessing
+
+import pytest
+
+from services.local_storage import ColeccionJournal, fcntl
+
+
+def _clave(registro):
+    return registro.get('id')
+
+
+def _coleccion(tmp_path, umbral_compactacion=500):
+    return ColeccionJournal(
+        tmp_path / 'gastos.json',
+        clave_fn=_clave,
+        serializar=str,
+        deserializar=lambda registro: registro,
+        umbral_compactacion=umbral_compactacion,
+    )
+
+
+def _gasto(id_, monto=100.0):
+    return {'id': id_, 'description': f'Gasto {id_}', 'amount': monto}
+
+
+def test_journal_se_reaplica_sobre_el_snapshot(tmp_path):
+    coleccion = _coleccion(tmp_path)
+    coleccion.agregar([_gasto('a'), _gasto('b')])
+    coleccion.compactar()
+    coleccion.actualizar('a', {'amount': 250.0})
+    coleccion.eliminar('b')
+    coleccion.agregar([_gasto('c')])
+
+    # El snapshot quedó como antes de los últimos cambios: están solo en el journal
+    with open(coleccion.snapshot_file) as f:
+        assert [r['id'] for r in json.load(f)] == ['a', 'b']
+
+    registros = _coleccion(tmp_path).cargar()
+
+    assert list(registros) == ['a', 'c']
+    assert registros['a']['amount'] == 250.0
+
+
+def test_reaplicar_journal_tras_compactacion_cortada(tmp_path):
+    coleccion = _coleccion(tmp_path)
+    coleccion.agregar([_gasto('a'), _gasto('b'), _gasto('c')])
+    coleccion.actualizar('a', {'amount': 250.0})
+    coleccion.eliminar('b')
+    esperado = {clave: dict(registro) for clave, registro in coleccion.cargar().items()}
+
+    # Compactación cortada entre escribir el snapshot y truncar el journal
+    coleccion._escribir_snapshot(list(coleccion.cargar().values()))
+    assert coleccion.journal_file.stat().st_size > 0
+
+    reabierta = _coleccion(tmp_path)
+    assert reabierta.cargar() == esperado
+
+    # La compactación siguiente termina el trabajo sin cambiar el contenido
+    reabierta.compactar()
+    assert reabierta.journal_file.stat().st_size == 0
+    assert _coleccion(tmp_path).cargar() == esperado
+
+
+def test_compactacion_en_segundo_plano(tmp_path):
+    coleccion = _coleccion(tmp_path, umbral_compactacion=5)
+    for i in range(7):
+        coleccion.agregar([_gasto(f'g{i}')])
+    coleccion.esperar_compactacion()
+
+    with open(coleccion.snapshot_file) as f:
+        volcados = [r['id'] for r in json.load(f)]
+    assert volcados == [f'g{i}' for i in range(len(volcados))]
+    assert len(volcados) >= 5
+    assert list(_coleccion(tmp_path).cargar()) == [f'g{i}' for i in range(7)]
+
+
+def _escribir_desde_proceso(tmp_path, proceso, cantidad):
+    coleccion = _coleccion(tmp_path, umbral_compactacion=20)
+    for i in range(cantidad):
+        coleccion.agregar([_gasto(f'p{proceso}-{i}')])
+        if i % 10 == 0:
+            coleccion.actualizar(f'p{proceso}-{i}', {'amount': float(i)})
+    coleccion.esperar_compactacion()
+
+
+@pytest.mark.skipif(fcntl is None, reason='sin flock: el lock entre procesos no está disponible')
+def test_escrituras_concurrentes_de_varios_procesos(tmp_path):
+    procesos, cantidad = 4, 60
+    contexto = multiprocessing.get_context('fork')
+    hijos = [
+        contexto.Process(target=_escribir_desde_proceso, args=(tmp_path, p, cantidad))
+        for p in range(procesos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    for hijo in hijos:
+        hijo.join(timeout=60)
+        assert hijo.exitcode == 0
+
+    registros = _coleccion(tmp_path).cargar()
+
+    assert len(registros) == procesos * cantidad
+    assert all(registros[f'p{p}-10']['amount'] == 10.0 for p in range(procesos))
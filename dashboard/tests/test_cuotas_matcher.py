@@ -0,0 +1,66 @@
+"""
+Tests de CuotasMatcher: normalización, bloqueo por (banco, cuota, monto) y similitud.
+"""
+import pandas as pd
+
+from services.cuotas_matcher import CuotasMatcher, normalizar_descripciones
+
+
+def _lineas(*filas):
+    return pd.DataFrame(filas, columns=CuotasMatcher.COLUMNAS)
+
+
+def test_normalizar_descripciones():
+    descripciones = pd.Series(['MERPAGO*ZARA ', 'Café Martínez C.03/12', None])
+
+    assert normalizar_descripciones(descripciones).tolist() == ['ZARA', 'CAFE MARTINEZ', '']
+
+
+def test_candidatos_solo_dentro_del_bloque():
+    matcher = CuotasMatcher()
+    lineas = _lineas(('ZARA', 'Galicia', 3, 12, 1000.0))
+    proyecciones = _lineas(
+        ('ZARA', 'Galicia', 3, 12, 1000.4),  # mismo bloque (monto a menos de paso_monto)
+        ('ZARA', 'BBVA', 3, 12, 1000.0),     # otro banco
+        ('ZARA', 'Galicia', 4, 12, 1000.0),  # otra cuota
+        ('ZARA', 'Galicia', 3, 12, 1003.0),  # otro monto
+    )
+
+    candidatos = matcher.candidatos(lineas, proyecciones)
+
+    assert candidatos['fila_proyeccion'].tolist() == [0]
+    assert candidatos['similitud'].tolist() == [1.0]
+
+
+def test_similitud_descarta_descripciones_distintas():
+    matcher = CuotasMatcher(umbral_similitud=0.8)
+
+    assert matcher.similitud('ZARA', 'ZARA') == 1.0
+    assert matcher.similitud('ZARA HOME', 'ZARA HOME SA') >= 0.8
+    assert matcher.similitud('ZARA', 'NETFLIX') == 0.0
+
+
+def test_emparejar_uno_a_uno_priorizando_similitud():
+    matcher = CuotasMatcher()
+    lineas = _lineas(
+        ('MERPAGO*ZARA HOME', 'Galicia', 3, 12, 1000.0),
+        ('ZARA HOME SA', 'Galicia', 3, 12, 1000.0),
+    )
+    proyecciones = _lineas(
+        ('ZARA HOME SA', 'Galicia', 3, 12, 1000.0),
+        ('ZARA HOME', 'Galicia', 3, 12, 1000.0),
+    )
+
+    pares = matcher.emparejar(lineas, proyecciones)
+
+    # Cada línea con la proyección idéntica, aunque la otra también supere el umbral
+    assert sorted(zip(pares['fila_linea'], pares['fila_proyeccion'])) == [(0, 1), (1, 0)]
+    assert pares['similitud'].tolist() == [1.0, 1.0]
+
+
+def test_emparejar_sin_candidatos():
+    matcher = CuotasMatcher()
+    lineas = _lineas(('ZARA', 'Galicia', None, None, 1000.0))
+
+    assert matcher.emparejar(lineas, _lineas(('ZARA', 'Galicia', 3, 12, 1000.0))).empty
+    assert matcher.emparejar(lineas.iloc[:0], lineas).empty
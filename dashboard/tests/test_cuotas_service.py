@@ -0,0 +1,50 @@
+"""
+Tests de CuotasService con resúmenes donde no todas las filas son cuotas.
+"""
+import pandas as pd
+
+from services.cuotas_service import CuotasService
+from services.local_storage import LocalStorage
+
+
+def _servicio(tmp_path, modo='materializado'):
+    return CuotasService(storage=LocalStorage(data_dir=tmp_path), modo=modo)
+
+
+def _resumen():
+    # Como lo deja el parser de Galicia: installments None en las filas sin cuota
+    return pd.DataFrame({
+        'id': ['a', 'b', 'c', 'd'],
+        'date': ['2025-01-05', '2025-01-06', '2025-01-07', '2025-01-08'],
+        'description': ['ZARA', 'SUPERMERCADO', 'FARMACIA', 'NETFLIX'],
+        'amount': [1000.0, 250.0, 80.0, 15.0],
+        'bank': ['Galicia'] * 4,
+        'installments': ['02/03', None, '', 'sin cuota'],
+    })
+
+
+def test_propagar_cuotas_df_con_installments_vacios(tmp_path):
+    cuotas = _servicio(tmp_path).propagar_cuotas_df(_resumen(), '2025-01')
+
+    assert cuotas['original_id'].tolist() == ['a']
+    assert cuotas['period'].tolist() == ['2025-02']
+    assert cuotas['installments'].tolist() == ['3/3']
+
+
+def test_procesar_transacciones_importadas_con_installments_vacios(tmp_path):
+    servicio = _servicio(tmp_path)
+    # El resumen anterior trajo la cuota 1/3 de ZARA: la 2/3 queda proyectada para 2025-01
+    anterior = _resumen().assign(installments=['01/03', None, None, None])
+    servicio.procesar_transacciones_importadas(anterior, '2024-12')
+
+    resultado = servicio.procesar_transacciones_importadas(_resumen(), '2025-01')
+
+    assert resultado == {'cuotas_conciliadas': 1, 'compras_en_cuotas': 0}
+
+
+def test_parsear_cuotas_sin_na():
+    actual, total = CuotasService._parsear_cuotas(_resumen()['installments'])
+
+    assert actual.tolist() == [2, 0, 0, 0]
+    assert total.tolist() == [3, 0, 0, 0]
+    assert actual.dtype == 'int64' and total.dtype == 'int64'
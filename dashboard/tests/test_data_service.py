@@ -0,0 +1,348 @@
+"""
+Tests de DataService contra un cliente de Supabase falso en memoria: formas de
+consulta, invalidación del cache, sincronización por deltas con tombstones,
+ediciones y borrados en lote, y la cola de la réplica local.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('streamlit')
+pytest.importorskip('supabase')
+
+from services import data_service  # noqa: E402
+from services.data_service import DataService, TRANSACTION_SHAPES  # noqa: E402
+from services.replica_local import ReplicaTransacciones  # noqa: E402
+
+
+# --- Cliente falso ---
+def _comparar(op, a, b):
+    return {'gt': a > b, 'gte': a >= b, 'lt': a < b, 'lte': a <= b, 'eq': a == b}[op]
+
+
+class _Consulta:
+    """Subconjunto del query builder de postgrest-py que usa DataService."""
+
+    def __init__(self, db, tabla):
+        self.db, self.tabla = db, tabla
+        self.filtros, self.orden, self.limite = [], [], None
+        self.columnas, self.accion = '*', ('select',)
+
+    def select(self, columnas):
+        self.columnas = columnas
+        return self
+
+    def _filtro(self, col, op, valor):
+        self.filtros.append(lambda fila: _comparar(op, str(fila.get(col)), str(valor)))
+        return self
+
+    def gte(self, col, valor):
+        return self._filtro(col, 'gte', valor)
+
+    def gt(self, col, valor):
+        return self._filtro(col, 'gt', valor)
+
+    def eq(self, col, valor):
+        return self._filtro(col, 'eq', valor)
+
+    def in_(self, col, valores):
+        valores = {str(v) for v in valores}
+        self.filtros.append(lambda fila: str(fila.get(col)) in valores)
+        return self
+
+    def or_(self, expresion):
+        # "a.op.x,and(a.eq.x,b.op.y)": el keyset de DataService
+        a, op, x, a2, x2, b, op_b, y = re.fullmatch(
+            r'(\w+)\.(\w+)\.(.*?),and\((\w+)\.eq\.(.*?),(\w+)\.(\w+)\.(.*)\)', expresion
+        ).groups()
+        self.filtros.append(lambda fila: _comparar(op, str(fila[a]), x) or (
+            str(fila[a2]) == x2 and _comparar(op_b, str(fila[b]), y)
+        ))
+        return self
+
+    def order(self, col, desc=False):
+        self.orden.append((col, desc))
+        return self
+
+    def limit(self, n):
+        self.limite = n
+        return self
+
+    def update(self, valores):
+        self.accion = ('update', valores)
+        return self
+
+    def delete(self):
+        self.accion = ('delete',)
+        return self
+
+    def insert(self, fila):
+        self.accion = ('upsert', [fila], ['id'])
+        return self
+
+    def upsert(self, filas, on_conflict='id', ignore_duplicates=False):
+        self.accion = ('upsert', filas, on_conflict.split(','))
+        return self
+
+    def execute(self):
+        self.db.llamar(self.tabla, self.accion[0])
+        if self.tabla not in self.db.tablas:
+            raise Exception(f'relation "{self.tabla}" does not exist')
+        filas = [f for f in self.db.tablas[self.tabla] if all(filtro(f) for filtro in self.filtros)]
+
+        if self.accion[0] == 'update':
+            for fila in filas:
+                fila.update(self.accion[1], updated_at=self.db.ahora())
+            return SimpleNamespace(data=[dict(f) for f in filas])
+        if self.accion[0] == 'delete':
+            for fila in filas:
+                self.db.borrar(fila)
+            return SimpleNamespace(data=[dict(f) for f in filas])
+        if self.accion[0] == 'upsert':
+            claves = self.accion[2]
+            existentes = {tuple(str(f.get(c)) for c in claves) for f in self.db.tablas[self.tabla]}
+            insertadas = []
+            for fila in self.accion[1]:
+                fila = {'user_id': 'u1', **fila}  # default auth.uid()
+                clave = tuple(str(fila.get(c)) for c in claves)
+                if clave not in existentes:
+                    existentes.add(clave)
+                    insertadas.append(self.db.insertar(fila))
+            return SimpleNamespace(data=[dict(f) for f in insertadas])
+
+        for col, desc in reversed(self.orden):
+            filas = sorted(filas, key=lambda f: str(f.get(col)), reverse=desc)
+        # Como PostgREST con max-rows: ninguna respuesta trae más de max_filas
+        filas = filas[:min(self.limite or self.db.max_filas, self.db.max_filas)]
+        columnas = None if self.columnas == '*' else self.columnas.split(',')
+        return SimpleNamespace(data=[
+            dict(f) if columnas is None else {c: f.get(c) for c in columnas} for f in filas
+        ])
+
+
+class SupabaseFalso:
+    """Tablas en memoria con updated_at/tombstones como los mantienen los triggers."""
+
+    def __init__(self, tombstones=True):
+        self.tablas = {'transactions': []}
+        if tombstones:
+            self.tablas['transactions_tombstones'] = []
+        self.llamadas = []
+        self.sin_conexion = False
+        self.reloj = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.rpc_bulk = True
+        self.max_filas = 1000
+
+    def ahora(self):
+        self.reloj += timedelta(seconds=1)
+        return self.reloj.isoformat()
+
+    def llamar(self, tabla, accion):
+        if self.sin_conexion:
+            raise ConnectionError('sin conexión')
+        self.llamadas.append((tabla, accion))
+
+    def insertar(self, fila):
+        fila = {**fila, 'updated_at': self.ahora()}
+        self.tablas['transactions'].append(fila)
+        return fila
+
+    def borrar(self, fila):
+        self.tablas['transactions'].remove(fila)
+        if 'transactions_tombstones' in self.tablas:
+            self.tablas['transactions_tombstones'].append({'id': fila['id'], 'deleted_at': self.ahora()})
+
+    def fila(self, id_):
+        return next(f for f in self.tablas['transactions'] if f['id'] == id_)
+
+    def table(self, tabla):
+        return _Consulta(self, tabla)
+
+    def rpc(self, funcion, parametros):
+        self.llamar(funcion, 'rpc')
+        if funcion != 'update_transactions_bulk' or not self.rpc_bulk:
+            raise Exception(f'function {funcion} does not exist')
+        actualizadas = 0
+        for cambio in parametros['changes']:
+            filas = [f for f in self.tablas['transactions'] if f['id'] == cambio['id']]
+            for fila in filas:
+                fila.update({k: v for k, v in cambio.items() if k != 'id'}, updated_at=self.ahora())
+            actualizadas += len(filas)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=actualizadas))
+
+
+def _transaccion(i, **campos):
+    return {
+        'id': f't{i:03d}', 'date': f'2025-01-{i % 28 + 1:02d}', 'description': f'Compra {i}',
+        'amount': 100.0 * i, 'adjusted_amount': None, 'currency': 'ARS', 'bank': 'Galicia',
+        'card_name': None, 'category': 'Varios', 'installments': None, 'notes': None,
+        'statement_period': '2025-01', 'user_id': 'u1', **campos,
+    }
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    db = SupabaseFalso()
+    for i in range(1, 13):
+        db.insertar(_transaccion(i))
+    monkeypatch.setattr(data_service, 'get_supabase_client', lambda: db)
+    monkeypatch.delenv('GASTOS_REPLICA_LOCAL', raising=False)
+    return db
+
+
+# --- Lecturas ---
+def test_formas_de_consulta(supabase):
+    service = DataService()
+
+    resumen = service.get_transactions(shape='summary')
+    assert list(resumen.columns) == list(TRANSACTION_SHAPES['summary'])
+    assert resumen['bank'].dtype == 'category'
+    assert resumen['amount'].dtype == 'float64'
+    # Más nuevas primero, con fechas como date
+    assert resumen['date'].is_monotonic_decreasing
+    assert resumen['date'].iloc[0] == max(pd.to_datetime([f['date'] for f in supabase.tablas['transactions']])).date()
+
+    assert len(service.get_transactions(shape='budget', limit=5)) == 5
+    assert 'updated_at' not in service.get_transactions().columns
+
+
+def test_cache_se_invalida_con_las_escrituras_que_lo_afectan(supabase):
+    service = DataService()
+    service.get_transactions(shape='budget')
+    supabase.llamadas.clear()
+
+    service.get_transactions(shape='budget')
+    assert supabase.llamadas == []
+
+    # 'budget' no lee category: la lectura sigue saliendo del cache
+    service.update_transactions([{'id': 't001', 'category': 'Ropa'}])
+    supabase.llamadas.clear()
+    service.get_transactions(shape='budget')
+    assert supabase.llamadas == []
+
+    service.update_transactions([{'id': 't001', 'adjusted_amount': 0}])
+    assert service.get_transactions(shape='budget').set_index('id').loc['t001', 'adjusted_amount'] == 0
+    assert supabase.llamadas
+
+
+# --- Sincronización por deltas ---
+def test_sync_trae_cambios_y_borrados_paginados(supabase):
+    service = DataService()
+    assert len(service.sync_transactions(chunk_size=5)) == 12
+
+    supabase.fila('t002').update(category='Remota', updated_at=supabase.ahora())
+    supabase.insertar(_transaccion(20))
+    for id_ in ('t003', 't004', 't005', 't006', 't007'):
+        supabase.borrar(supabase.fila(id_))
+
+    # Más tombstones que chunk_size y que max-rows: hacen falta varias páginas
+    supabase.max_filas = 3
+    replica = service.sync_transactions(chunk_size=2)
+
+    assert sorted(replica.index) == ['t001', 't002', 't008', 't009', 't010', 't011', 't012', 't020']
+    assert replica.loc['t002', 'category'] == 'Remota'
+    assert service.sync_transactions(chunk_size=2).equals(replica)
+
+
+def test_sync_sin_tabla_de_tombstones(monkeypatch):
+    db = SupabaseFalso(tombstones=False)
+    for i in range(1, 6):
+        db.insertar(_transaccion(i))
+    monkeypatch.setattr(data_service, 'get_supabase_client', lambda: db)
+    monkeypatch.delenv('GASTOS_REPLICA_LOCAL', raising=False)
+    service = DataService()
+    service.sync_transactions()
+
+    db.borrar(db.fila('t001'))
+
+    assert sorted(service.sync_transactions().index) == ['t002', 't003', 't004', 't005']
+
+
+# --- Escrituras en lote ---
+def test_update_transactions_cuenta_filas_actualizadas(supabase):
+    service = DataService()
+    supabase.llamadas.clear()
+
+    # Mismos valores: un solo update().in_(); el id inexistente no cuenta
+    assert service.update_transactions([
+        {'id': 't001', 'category': 'Ropa'}, {'id': 't002', 'category': 'Ropa'}, {'id': 'x', 'category': 'Ropa'},
+    ]) == 2
+    assert supabase.llamadas == [('transactions', 'update')]
+
+    # Valores distintos: una sola llamada a la RPC
+    supabase.llamadas.clear()
+    assert service.update_transactions([
+        {'id': 't003', 'category': 'Comida'}, {'id': 't004', 'notes': 'compartido', 'adjusted_amount': 50.0},
+    ]) == 2
+    assert supabase.llamadas == [('update_transactions_bulk', 'rpc')]
+    assert supabase.fila('t004')['notes'] == 'compartido'
+    assert supabase.fila('t004')['category'] == 'Varios'
+
+
+def test_update_transactions_sin_rpc_agrupa_por_valores(supabase):
+    supabase.rpc_bulk = False
+    service = DataService()
+
+    assert service.update_transactions([
+        {'id': 't001', 'category': 'A'}, {'id': 't002', 'category': 'B'}, {'id': 't003', 'category': 'A'},
+    ]) == 3
+    assert [supabase.fila(i)['category'] for i in ('t001', 't002', 't003')] == ['A', 'B', 'A']
+
+
+def test_delete_transactions_en_lote(supabase):
+    service = DataService()
+    service.get_transactions()
+    supabase.llamadas.clear()
+
+    assert service.delete_transactions(['t001', 't002', 't002']) == 2
+    assert supabase.llamadas == [('transactions', 'delete')]
+    assert {'t001', 't002'}.isdisjoint(service.get_transactions()['id'])
+
+
+def test_add_transactions_bulk_descarta_duplicados(supabase):
+    service = DataService()
+    nuevas = pd.DataFrame([
+        {k: v for k, v in _transaccion(30).items() if k not in ('id', 'user_id')},
+        {k: v for k, v in _transaccion(1).items() if k not in ('id', 'user_id')},
+    ])
+
+    resultado = service.add_transactions_bulk(nuevas)
+
+    assert resultado['status'].tolist() == ['inserted', 'duplicate']
+    assert len(service.get_transactions()) == 13
+
+
+# --- Réplica local (GASTOS_REPLICA_LOCAL=1) ---
+def test_replica_local_encola_sin_conexion(supabase, monkeypatch, tmp_path):
+    monkeypatch.setenv('GASTOS_REPLICA_LOCAL', '1')
+    monkeypatch.setattr(data_service, 'ReplicaTransacciones',
+                        lambda columnas: ReplicaTransacciones(columnas, data_dir=tmp_path))
+    monkeypatch.setattr(DataService, 'SYNC_INTERVAL_SECONDS', 3600)
+    service = DataService()
+    try:
+        assert len(service.get_transactions()) == 12
+
+        supabase.sin_conexion = True
+        nueva = {k: v for k, v in _transaccion(40).items() if k != 'id'}
+        assert service.add_manual_transaction(nueva)
+        assert service.update_transactions([{'id': 't001', 'category': 'Ropa'}]) == 1
+        assert service.delete_transactions(['t002']) == 1
+
+        # Las lecturas ya ven los cambios; Supabase todavía no
+        local = service.get_transactions().set_index('id')
+        assert nueva['id'] in local.index and 't002' not in local.index
+        assert local.loc['t001', 'category'] == 'Ropa'
+        assert service.sync_status()['pending'] == 3
+
+        supabase.sin_conexion = False
+        service.sync_local_replica()
+
+        assert service.sync_status()['pending'] == 0
+        assert supabase.fila('t001')['category'] == 'Ropa'
+        assert supabase.fila(nueva['id'])['description'] == 'Compra 40'
+        assert 't002' not in {f['id'] for f in supabase.tablas['transactions']}
+    finally:
+        service.close()
@@ -0,0 +1,77 @@
+"""
+Tests de LocalStorage: pasaje de JSON a Parquet y particiones de cuotas.
+"""
+import json
+
+import pytest
+
+from services.cuotas_service import CuotasService
+from services.local_storage import LocalStorage
+
+
+def test_parquet_lee_snapshots_json_existentes(tmp_path, cuota):
+    pytest.importorskip('pyarrow')
+    json_storage = LocalStorage(formato='json', data_dir=tmp_path)
+    json_storage.save_gastos_manuales_bulk([
+        {'id': 'g1', 'date': '2025-01-10', 'description': 'Alquiler', 'amount': 500.0, 'currency': 'ARS'},
+    ])
+    json_storage.save_cuotas_propagadas_bulk([cuota('a', '2025-02'), cuota('a', '2025-03')])
+    # Instalación existente: todo volcado a los snapshots JSON
+    json_storage.gastos_manuales.compactar()
+    for period in ('2025-02', '2025-03'):
+        json_storage.cuotas.particion(period).compactar()
+
+    storage = LocalStorage(formato='parquet', data_dir=tmp_path)
+
+    assert storage.load_gastos_manuales_df()['id'].tolist() == ['g1']
+    assert len(storage.load_cuotas_propagadas_df()) == 2
+    cuotas = CuotasService(storage=storage, modo='materializado')
+    assert len(cuotas.get_todas_las_cuotas_activas()) == 2
+
+
+def test_parquet_cargar_df_no_compacta_el_journal(tmp_path):
+    pytest.importorskip('pyarrow')
+    storage = LocalStorage(formato='parquet', data_dir=tmp_path)
+    storage.save_gastos_manuales_bulk([
+        {'id': 'g1', 'date': '2025-01-10', 'description': 'Alquiler', 'amount': 500.0, 'currency': 'ARS'},
+    ])
+    storage.gastos_manuales.compactar()
+    storage.save_gasto_manual({'id': 'g2', 'date': '2025-01-11', 'description': 'Luz', 'amount': '', 'currency': 'ARS'})
+
+    df = storage.load_gastos_manuales_df()
+
+    assert df['id'].tolist() == ['g1', 'g2']
+    assert df['amount'].isna().tolist() == [False, True]
+    assert storage.gastos_manuales.journal_file.stat().st_size > 0
+
+
+def test_parquet_rechaza_montos_no_numericos(tmp_path):
+    pytest.importorskip('pyarrow')
+    storage = LocalStorage(formato='parquet', data_dir=tmp_path)
+
+    with pytest.raises(ValueError, match='amount'):
+        storage.save_gasto_manual({'id': 'g1', 'date': '2025-01-10', 'description': 'Luz', 'amount': '1.000,50'})
+    assert storage.load_gastos_manuales() == []
+
+
+def test_migracion_saltea_cuotas_sin_periodo(tmp_path, cuota):
+    with open(tmp_path / 'cuotas_propagadas.json', 'w') as f:
+        json.dump([{**cuota('a', '2025-02'), 'key': 'a_2025-02'}, {**cuota('b', None), 'key': 'b_None'}], f)
+
+    storage = LocalStorage(data_dir=tmp_path)
+
+    assert [c['original_id'] for c in storage.load_cuotas_propagadas()] == ['a']
+    assert (tmp_path / 'cuotas_propagadas.json.migrado').exists()
+
+
+def test_particion_sin_anotar_en_el_manifest(tmp_path, cuota):
+    storage = LocalStorage(data_dir=tmp_path)
+    storage.save_cuotas_propagadas_bulk([cuota('a', '2025-02')])
+    # Proceso cortado entre la escritura de la partición y la del manifest
+    storage.cuotas.particion('2025-05').agregar([{**cuota('z', '2025-05'), 'key': 'z_2025-05'}])
+
+    storage = LocalStorage(data_dir=tmp_path)
+
+    assert storage.cuotas.periodos() == ['2025-02', '2025-05']
+    assert len(storage.get_cuotas_por_periodo('2025-05')) == 1
+    assert storage.marcar_cuotas_como_reales_bulk(['z'], '2025-05') == 1
@@ -0,0 +1,52 @@
+"""
+Tests de Periodo y de la conversión vectorizada de columnas "YYYY-MM".
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from services.periodo import Periodo, a_meses, a_periodos, rango
+
+
+def test_periodo_desde_strings_y_fechas():
+    assert Periodo.desde('2025-03') == Periodo.desde('2025-03-31') == Periodo.desde(date(2025, 3, 5))
+    assert Periodo.desde('1970-01') == 0
+    assert str(Periodo.de_anio_mes(2024, 12)) == '2024-12'
+    assert Periodo.desde('2024-12').nombre() == 'Diciembre 2024'
+
+
+def test_aritmetica_de_periodos():
+    diciembre = Periodo.desde('2024-12')
+
+    assert str(diciembre + 1) == '2025-01'
+    assert str(diciembre - 12) == '2023-12'
+    assert Periodo.desde('2025-03') - diciembre == 3
+    assert isinstance(diciembre + 1, Periodo)
+    assert type(Periodo.desde('2025-03') - diciembre) is int
+
+
+def test_fecha_recorta_al_ultimo_dia_del_mes():
+    assert Periodo.desde('2024-02').fecha(31) == date(2024, 2, 29)
+    assert Periodo.desde('2025-02').fecha(31) == date(2025, 2, 28)
+    assert Periodo.desde('2025-04').fecha() == date(2025, 4, 1)
+
+
+def test_rango_incluye_ambos_extremos():
+    assert [str(p) for p in rango('2024-11', '2025-02')] == ['2024-11', '2024-12', '2025-01', '2025-02']
+    assert list(rango('2025-02', '2025-01')) == []
+
+
+def test_a_meses_y_a_periodos_ida_y_vuelta():
+    periodos = pd.Series(['2024-12', '2025-01-15', None], index=[10, 11, 12])
+
+    meses = a_meses(periodos)
+
+    assert meses.dtype == np.int64
+    assert meses[:2].tolist() == [Periodo.desde('2024-12'), Periodo.desde('2025-01')]
+    # Vacíos como NaT de numpy
+    assert meses[2] == np.iinfo(np.int64).min
+
+    vuelta = a_periodos(meses[:2] + 1, index=periodos.index[:2])
+    assert vuelta.tolist() == ['2025-01', '2025-02']
+    assert vuelta.index.tolist() == [10, 11]
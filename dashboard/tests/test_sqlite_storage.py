@@ -0,0 +1,12 @@
+"""
+Tests de SQLiteStorage: los conteos de las escrituras bulk no incluyen lo que escriben los triggers.
+"""
+from services.sqlite_storage import SQLiteStorage
+
+
+def test_conteos_bulk_de_cuotas(tmp_path, cuota):
+    storage = SQLiteStorage(data_dir=tmp_path)
+
+    assert storage.save_cuotas_propagadas_bulk([cuota('a', '2025-02'), cuota('b', '2025-02')]) == 2
+    assert storage.save_cuotas_propagadas_bulk([cuota('a', '2025-02')]) == 0
+    assert storage.marcar_cuotas_como_reales_bulk(['a'], '2025-02') == 1
@@ -0,0 +1,44 @@
+-- =========================================
+-- MIGRACIÓN: Totales por período del lado del servidor
+-- =========================================
+-- Fecha: 2026-10-18
+-- Propósito: Los encabezados del Resumen (total ARS/USD y cantidad por mes)
+-- se calculan en Postgres en lugar de descargar todas las transacciones.
+-- Usado por DataService.get_period_totals.
+
+-- Vista: totales por período de resumen, moneda y banco
+-- Usa adjusted_amount si existe (gastos compartidos o anulados), sino amount.
+-- Las transacciones sin statement_period se agrupan por el mes de la fecha.
+-- security_invoker (Postgres 15+): la vista corre con los permisos de quien la
+-- consulta, así que respeta el RLS de transactions y cada usuario ve sus totales.
+CREATE OR REPLACE VIEW period_totals WITH (security_invoker = true) AS
+SELECT
+    COALESCE(statement_period, TO_CHAR(date, 'YYYY-MM')) AS period,
+    currency,
+    bank,
+    SUM(COALESCE(adjusted_amount, amount)) AS total,
+    COUNT(*) AS count
+FROM transactions
+GROUP BY 1, currency, bank;
+
+-- RPC: mismos totales, opcionalmente filtrados por banco
+-- (se filtra antes de agrupar; con el RLS por user_id, idx_transactions_dedup
+-- cubre user_id + bank). SECURITY INVOKER: nunca ve filas de otros usuarios.
+CREATE OR REPLACE FUNCTION get_period_totals(p_bank TEXT DEFAULT NULL)
+RETURNS TABLE (period TEXT, currency TEXT, bank TEXT, total NUMERIC, count BIGINT)
+LANGUAGE sql STABLE SECURITY INVOKER
+AS $$
+    SELECT
+        COALESCE(t.statement_period, TO_CHAR(t.date, 'YYYY-MM')) AS period,
+        t.currency,
+        t.bank,
+        SUM(COALESCE(t.adjusted_amount, t.amount)) AS total,
+        COUNT(*) AS count
+    FROM transactions t
+    WHERE p_bank IS NULL OR t.bank = p_bank
+    GROUP BY 1, t.currency, t.bank
+    ORDER BY 1 DESC;
+$$;
+
+COMMENT ON VIEW period_totals IS 'Totales y cantidad de transacciones por período, moneda y banco';
+COMMENT ON FUNCTION get_period_totals(TEXT) IS 'Totales por período/moneda/banco (adjusted_amount sobre amount), filtro opcional por banco';
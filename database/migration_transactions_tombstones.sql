@@ -0,0 +1,60 @@
+-- =========================================
+-- MIGRACIÓN: Tombstones de transacciones borradas
+-- =========================================
+-- Fecha: 2026-10-18
+-- Propósito: DataService mantiene una réplica local de transactions y la
+-- actualiza trayendo solo las filas con updated_at posterior a la última
+-- sincronización. Los borrados no dejan fila, así que se registran acá para
+-- que la réplica los pueda aplicar sin comparar el set completo de ids.
+
+CREATE TABLE IF NOT EXISTS transactions_tombstones (
+    id UUID PRIMARY KEY,
+    user_id UUID,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Tablas creadas por una versión anterior de esta migración
+ALTER TABLE transactions_tombstones ADD COLUMN IF NOT EXISTS user_id UUID;
+
+-- DataService pagina por (deleted_at, id)
+DROP INDEX IF EXISTS idx_transactions_tombstones_deleted_at;
+CREATE INDEX IF NOT EXISTS idx_transactions_tombstones_deleted_at
+ON transactions_tombstones(deleted_at, id);
+
+-- Registrar cada borrado (si el id se vuelve a borrar, se actualiza la fecha).
+-- SECURITY DEFINER: los usuarios no tienen policy de INSERT sobre los tombstones,
+-- solo los escribe este trigger.
+CREATE OR REPLACE FUNCTION record_transaction_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO transactions_tombstones (id, user_id, deleted_at)
+    VALUES (OLD.id, OLD.user_id, NOW())
+    ON CONFLICT (id) DO UPDATE SET user_id = EXCLUDED.user_id, deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS transactions_tombstone ON transactions;
+CREATE TRIGGER transactions_tombstone
+AFTER DELETE ON transactions
+FOR EACH ROW
+EXECUTE FUNCTION record_transaction_tombstone();
+
+-- RLS: cada usuario solo ve los borrados de sus propias transacciones.
+-- Los tombstones anteriores a esta versión (sin user_id) no los ve nadie.
+ALTER TABLE transactions_tombstones ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own tombstones" ON transactions_tombstones;
+CREATE POLICY "Users can view their own tombstones"
+ON transactions_tombstones FOR SELECT
+USING (auth.uid() = user_id);
+
+-- Índice para la sincronización incremental por updated_at
+CREATE INDEX IF NOT EXISTS idx_transactions_updated_at
+ON transactions(updated_at, id);
+
+COMMENT ON TABLE transactions_tombstones IS 'Ids de transacciones borradas, para la sincronización incremental del dashboard';
+
+-- Los tombstones viejos se pueden limpiar cuando ya no haya réplicas tan
+-- desactualizadas (una réplica sin tombstones recientes cae al diff de ids):
+-- DELETE FROM transactions_tombstones WHERE deleted_at < NOW() - INTERVAL '90 days';
@@ -0,0 +1,43 @@
+-- =========================================
+-- MIGRACIÓN: Índice único para importación en lote
+-- =========================================
+-- Fecha: 2026-10-18
+-- Propósito: DataService.add_transactions_bulk inserta los resúmenes con
+-- upsert(on_conflict='user_id,bank,card_name,date,description,amount',
+-- ignore_duplicates=True). Es la misma clave que unique_transaction, pero ese
+-- constraint trata los NULL como distintos y card_name es NULL en las
+-- transacciones importadas (fix_nullable_columns.sql), así que no detecta
+-- duplicados. Este índice usa NULLS NOT DISTINCT (Postgres 15+).
+--
+-- La migración no borra nada: si ya hay filas que chocan con la clave, las
+-- lista y aborta antes de crear el índice. Resolverlas a mano y volver a correrla.
+
+-- Paso 1: Reportar duplicados existentes
+DO $$
+DECLARE
+    colision RECORD;
+    cantidad INTEGER := 0;
+BEGIN
+    FOR colision IN
+        SELECT user_id, bank, card_name, date, description, amount,
+               COUNT(*) AS filas, ARRAY_AGG(id ORDER BY created_at, id) AS ids
+        FROM transactions
+        GROUP BY user_id, bank, card_name, date, description, amount
+        HAVING COUNT(*) > 1
+    LOOP
+        cantidad := cantidad + 1;
+        RAISE NOTICE 'Duplicado (% filas, ids %): user_id=%, bank=%, card_name=%, date=%, description=%, amount=%',
+            colision.filas, colision.ids, colision.user_id, colision.bank, colision.card_name,
+            colision.date, colision.description, colision.amount;
+    END LOOP;
+
+    IF cantidad > 0 THEN
+        RAISE EXCEPTION '% grupos de transacciones duplicadas (ver NOTICE); resolverlos antes de crear idx_transactions_dedup', cantidad;
+    END IF;
+END $$;
+
+-- Paso 2: Índice único usado por el upsert
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_dedup
+ON transactions(user_id, bank, card_name, date, description, amount) NULLS NOT DISTINCT;
+
+COMMENT ON INDEX idx_transactions_dedup IS 'Evita duplicados al reimportar un resumen (clave de unique_transaction, con NULLs iguales)';
@@ -0,0 +1,37 @@
+-- =========================================
+-- MIGRACIÓN: Edición en lote de transacciones con valores distintos
+-- =========================================
+-- Fecha: 2026-10-18
+-- Propósito: DataService.update_transactions manda los cambios que ponen los
+-- mismos valores como un solo update().in_('id', ...). Cuando cada transacción
+-- recibe valores distintos, en lugar de un request por transacción llama a esta
+-- función con todos los cambios juntos (un request cada 500).
+
+-- Recibe un array JSON de objetos {"id": ..., campo: valor, ...}. Cada fila
+-- toma de su objeto solo los campos presentes (jsonb_populate_record completa
+-- el resto con los valores actuales). Devuelve la cantidad de filas actualizadas.
+-- SECURITY INVOKER: respeta el RLS de transactions, así que los ids de otros
+-- usuarios (o inexistentes) no se cuentan ni se tocan.
+CREATE OR REPLACE FUNCTION update_transactions_bulk(changes JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql SECURITY INVOKER
+AS $$
+DECLARE
+    actualizadas INTEGER;
+BEGIN
+    UPDATE transactions t
+    SET (date, description, amount, adjusted_amount, currency, bank, card_name,
+         category, installments, notes, statement_period) = (
+        SELECT r.date, r.description, r.amount, r.adjusted_amount, r.currency, r.bank, r.card_name,
+               r.category, r.installments, r.notes, r.statement_period
+        FROM jsonb_populate_record(t, c.change) r
+    )
+    FROM jsonb_array_elements(changes) AS c(change)
+    WHERE t.id = (c.change->>'id')::UUID;
+
+    GET DIAGNOSTICS actualizadas = ROW_COUNT;
+    RETURN actualizadas;
+END;
+$$;
+
+COMMENT ON FUNCTION update_transactions_bulk(JSONB) IS 'Actualiza varias transacciones con valores distintos en un solo request; devuelve las filas actualizadas';